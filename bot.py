@@ -8,12 +8,17 @@ from dotenv import load_dotenv
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from core.logger_config import setup_logging
+from core.migrations import run_migrations
+from core.data_import import recover_imports
+from core.atomic_io import recover_interrupted_writes
+from core.data_manager import check_data_format
 from scheduler import setup_scheduler
 from commands import (
     game_commands, voting_commands, 
     results_commands, admin_commands, user_commands,
     schedule_commands, config_commands
 )
+from views.persistent import setup_persistent_views
 
 # Set up logging
 logger = setup_logging()
@@ -100,6 +105,9 @@ user_commands.setup_user_commands(bot)
 schedule_commands.setup_schedule_commands(bot)
 config_commands.setup_config_commands(bot)
 
+# Register persistent UI components (buttons and menus survive restarts)
+setup_persistent_views(bot)
+
 
 # Run the bot
 if __name__ == "__main__":
@@ -109,6 +117,17 @@ if __name__ == "__main__":
         print("❌ DISCORD_TOKEN not found in environment variables!")
         print("Please set it or create a .env file with DISCORD_TOKEN=your_token")
     else:
+        # Refuse to start rather than write data files in another format than the configured one
+        try:
+            check_data_format()
+        except RuntimeError as e:
+            logger.error(str(e))
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        # Finish interrupted imports and writes, then upgrade server data files to the current schema before serving commands
+        recover_imports()
+        recover_interrupted_writes()
+        run_migrations()
         logger.info("Starting bot...")
         try:
             bot.run(token)
@@ -0,0 +1,464 @@
+"""Offline maintenance of the bot data, run from the bot folder.
+
+Bulk operations run on every server in a process pool, out of the bot's event
+loop (the bot can keep running, but prefer stopping it for migrate and restore):
+
+    python cli.py check [--repair] [--report fsck.jsonl]
+    python cli.py reindex
+    python cli.py compact
+    python cli.py prune --keep-days 30
+    python cli.py migrate [--layout sharded]
+    python cli.py export backups/ [--all-games] [--compress]
+    python cli.py restore backups/ [--overwrite]
+    python cli.py bench-formats [--guilds 100] [--repeat 20]
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from core.config import GUILD_LAYOUTS, list_guild_ids, rebuild_guild_index, guild_dir_exists, get_votes_file
+from core.data_manager import compact_shared_games, upsert_shared_games, get_current_period, load_shared_games
+from core.data_manager import get_available_data_formats, check_data_format, dumps_data, loads_data, read_data_file
+from core.data_manager import rebuild_vote_archive_index, collect_vote_periods, prune_vote_archive, write_guild_export
+from core.atomic_io import flush_staged_writes, recover_interrupted_writes
+from core.data_import import recover_guild_import, import_guild_data, read_export_games, get_catalog_changes
+from core.fsck import check_catalog, check_user_profiles, check_guild
+from core.models import encode_ratings
+from core.migrations import migrate_guild, migrate_guild_layout
+
+logger = logging.getLogger(__name__)
+
+
+def fsck_guild(guild_id: int, options: dict) -> list:
+    """Check (and with --repair, fix) a server's files, see core.fsck."""
+    return check_guild(guild_id, repair=options["repair"])
+
+
+def reindex_guild(guild_id: int, options: dict) -> str:
+    """Rebuild the vote archive index of a server."""
+    return f"{len(rebuild_vote_archive_index(guild_id))} archived period(s)"
+
+
+def compact_guild(guild_id: int, options: dict) -> str:
+    """Move the closed voting periods of a server into its archive."""
+    return f"{collect_vote_periods(guild_id)} period(s) archived"
+
+
+def prune_guild(guild_id: int, options: dict) -> str:
+    """Drop the archived periods of a server older than --keep-days."""
+    return f"{prune_vote_archive(guild_id, options['keep_days'])} period(s) pruned"
+
+
+def migrate_guild_data(guild_id: int, options: dict) -> str:
+    """Finish an interrupted import, then upgrade a server's data to the current schema."""
+    recover_guild_import(guild_id)
+    return f"{migrate_guild(guild_id)} migration(s) applied"
+
+
+def export_guild(guild_id: int, options: dict) -> str:
+    """Export a server to a file in the output folder (same format as /exportdata)."""
+    suffix = ".json.gz" if options["compress"] else ".json"
+    path = Path(options["directory"]) / f"tatiBot_export_{guild_id}_{options['timestamp']}{suffix}"
+    try:
+        with (gzip.open(path, 'wb') if options["compress"] else open(path, 'wb')) as f:
+            write_guild_export(guild_id, f, all_games=options["all_games"])
+    except Exception:
+        path.unlink(missing_ok=True)  # Don't leave a truncated export behind
+        raise
+    return path.name
+
+
+# Per-server operations run in the worker processes
+GUILD_TASKS = {
+    "check": fsck_guild,
+    "reindex": reindex_guild,
+    "compact": compact_guild,
+    "prune": prune_guild,
+    "migrate": migrate_guild_data,
+    "export": export_guild,
+}
+
+
+def _run_guild_task(task: str, guild_id: int, options: dict) -> tuple:
+    """Run one operation on one server (in a worker process), never raising.
+    
+    Returns:
+        Tuple of (guild_id, result, error message or None)
+    """
+    try:
+        result = GUILD_TASKS[task](guild_id, options)
+        # Worker processes don't run exit handlers: commit the staged writes now
+        flush_staged_writes()
+        return guild_id, result, None
+    except Exception as e:
+        # The traceback only goes to the log file, the report lists the failure
+        logger.debug(f"{task} failed for guild {guild_id}: {e}", exc_info=True)
+        return guild_id, None, f"{type(e).__name__}: {e}"
+
+
+def iter_guild_tasks(task: str, options: dict, guild_ids: list, jobs: int = None):
+    """Run an operation on servers using a process pool, yielding outcomes as they complete.
+    
+    Args:
+        task: Name of the operation (key of GUILD_TASKS)
+        options: Options passed to the operation
+        guild_ids: Servers to process
+        jobs: Number of worker processes (defaults to the number of CPUs)
+    
+    Yields:
+        Tuples of (guild_id, result, error message or None), in guild order
+    """
+    if not guild_ids:
+        return
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=min(jobs, len(guild_ids))) as executor:
+        yield from executor.map(
+            _run_guild_task, [task] * len(guild_ids), guild_ids, [options] * len(guild_ids),
+            chunksize=max(1, len(guild_ids) // (jobs * 4))
+        )
+
+
+def run_on_all_guilds(task: str, options: dict, jobs: int = None, guild_ids: list = None) -> dict:
+    """Run an operation on every server using a process pool.
+    
+    Args:
+        task: Name of the operation (key of GUILD_TASKS)
+        options: Options passed to the operation
+        jobs: Number of worker processes (defaults to the number of CPUs)
+        guild_ids: Servers to process (defaults to the guild index)
+    
+    Returns:
+        Dictionary with results (guild ID -> result), failed (guild ID -> error) and seconds
+    """
+    guild_ids = list_guild_ids() if guild_ids is None else guild_ids
+    start = time.perf_counter()
+    report = {"results": {}, "failed": {}, "seconds": 0.0}
+    for guild_id, result, error in iter_guild_tasks(task, options, guild_ids, jobs):
+        if error is None:
+            report["results"][guild_id] = result
+        else:
+            report["failed"][guild_id] = error
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def check_all_guilds(report_file, repair: bool = False, jobs: int = None, guild_ids: list = None) -> dict:
+    """Check every server, the shared catalog and the user profiles, writing each issue as a JSON line as soon as it is found.
+    
+    Only counters are kept, so memory doesn't grow with the number of servers or issues.
+    
+    Args:
+        report_file: Text file the JSON lines are written to
+        repair: If True, repair what can be repaired (see core.fsck.check_guild)
+        jobs: Number of worker processes (defaults to the number of CPUs)
+        guild_ids: Servers to check (defaults to the guild index)
+    
+    Returns:
+        Dictionary with guilds (checked), unhealthy (guilds with issues), issues
+        (count per check), repaired (issues repaired), failed (guild ID -> error) and seconds
+    """
+    guild_ids = list_guild_ids() if guild_ids is None else guild_ids
+    start = time.perf_counter()
+    summary = {"guilds": 0, "unhealthy": 0, "issues": {}, "repaired": 0, "failed": {}, "seconds": 0.0}
+    
+    def write_issues(issues):
+        for issue in issues:
+            report_file.write(json.dumps(issue, ensure_ascii=False) + "\n")
+            summary["issues"][issue["check"]] = summary["issues"].get(issue["check"], 0) + 1
+            summary["repaired"] += issue["repaired"]
+    
+    # The shared catalog and the user profiles are checked once, the servers' files by the workers
+    write_issues(check_catalog())
+    write_issues(check_user_profiles(repair))
+    for guild_id, issues, error in iter_guild_tasks("check", {"repair": repair}, guild_ids, jobs):
+        summary["guilds"] += 1
+        if error is not None:
+            summary["failed"][guild_id] = error
+            continue
+        summary["unhealthy"] += bool(issues)
+        write_issues(issues)
+        report_file.flush()
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def find_latest_exports(directory: Path) -> dict:
+    """Get the newest export file of each server in a folder.
+    
+    Returns:
+        Dictionary of guild ID -> path, oldest export first
+    """
+    latest = {}
+    for path in directory.glob("tatiBot_export_*.json*"):
+        # tatiBot_export_{guild_id}_{YYYYmmdd}_{HHMMSS}.json[.gz]
+        parts = path.name.split(".")[0].split("_")
+        if len(parts) != 5 or not parts[2].isdigit():
+            continue
+        guild_id, timestamp = int(parts[2]), parts[3] + parts[4]
+        if guild_id not in latest or timestamp > latest[guild_id][0]:
+            latest[guild_id] = (timestamp, path)
+    return {guild_id: path for guild_id, (_, path) in sorted(latest.items(), key=lambda item: item[1])}
+
+
+def _read_export_games(guild_id: int, path: str) -> tuple:
+    """Read the games of an export (in a worker process), never raising.
+    
+    Returns:
+        Tuple of (guild_id, games, error message or None)
+    """
+    try:
+        with open(path, 'rb') as f:
+            games, _ = read_export_games(f)
+        return guild_id, games, None
+    except Exception as e:
+        logger.debug(f"Could not read the games of {path}: {e}", exc_info=True)
+        return guild_id, None, f"{type(e).__name__}: {e}"
+
+
+def _restore_guild(guild_id: int, path: str, overwrite: bool) -> tuple:
+    """Import the server data of an export, without its games (in a worker process), never raising.
+    
+    Returns:
+        Tuple of (guild_id, result, error message or None)
+    """
+    try:
+        with open(path, 'rb') as f:
+            result = import_guild_data(guild_id, f, overwrite=overwrite, include_games=False)
+        return guild_id, f"{Path(path).name} ({len(result['errors'])} record(s) skipped)", None
+    except Exception as e:
+        logger.debug(f"Could not restore {path}: {e}", exc_info=True)
+        return guild_id, None, f"{type(e).__name__}: {e}"
+
+
+def restore_guilds(directory: Path, overwrite: bool = False, jobs: int = None) -> dict:
+    """Restore every server of a folder of exports (the newest export of each) using a process pool.
+    
+    The games of all exports are read first and merged into the shared catalog
+    in a single write (newer exports win when definitions differ), then the
+    servers' own data is imported in parallel.
+    
+    Args:
+        directory: Folder of tatiBot_export_*.json[.gz] files
+        overwrite: If True, replace the servers' data (and update existing games). If False, merge.
+        jobs: Number of worker processes (defaults to the number of CPUs)
+    
+    Returns:
+        Dictionary with results (guild ID -> result), failed (guild ID -> error),
+        games (catalog added/updated counts), bytes (size of the exports read) and seconds
+    """
+    exports = {guild_id: str(path) for guild_id, path in find_latest_exports(directory).items()}
+    start = time.perf_counter()
+    report = {"results": {}, "failed": {}, "games": {"added": 0, "updated": 0}, "seconds": 0.0}
+    report["bytes"] = sum(os.path.getsize(path) for path in exports.values())
+    if exports:
+        jobs = jobs or os.cpu_count() or 1
+        chunksize = max(1, len(exports) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=min(jobs, len(exports))) as executor:
+            # Games of every export, deduplicated and written to the catalog once
+            games = {}
+            for guild_id, export_games, error in executor.map(_read_export_games, exports.keys(), exports.values(), chunksize=chunksize):
+                if error is None:
+                    games.update(export_games)
+                else:
+                    report["failed"][guild_id] = error
+            changes, report["games"] = get_catalog_changes(games, overwrite)
+            if changes:
+                upsert_shared_games(changes)
+                compact_shared_games()
+            
+            # Then the servers' own files, which don't depend on each other
+            guild_ids = [guild_id for guild_id in exports if guild_id not in report["failed"]]
+            outcomes = executor.map(
+                _restore_guild, guild_ids, [exports[guild_id] for guild_id in guild_ids], [overwrite] * len(guild_ids),
+                chunksize=chunksize
+            )
+            for guild_id, result, error in outcomes:
+                if error is None:
+                    report["results"][guild_id] = result
+                else:
+                    report["failed"][guild_id] = error
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def load_benchmark_votes(guild_ids: list, limit: int) -> list:
+    """Get the votes of the current period of up to `limit` servers, as stored.
+    
+    Without any votes on disk, synthetic votes of the same shape are made up:
+    ratings strings over the whole shared catalog for a few dozen users.
+    """
+    samples = []
+    for guild_id in guild_ids:
+        period = get_current_period(guild_id)
+        votes_file = get_votes_file(guild_id, period) if period is not None else None
+        if votes_file is not None and votes_file.exists():
+            samples.append(read_data_file(votes_file))
+            if len(samples) >= limit:
+                break
+    if not samples:
+        rng = random.Random(0)
+        game_count = max(len(load_shared_games()), 1)
+        for _ in range(limit):
+            samples.append({
+                str(rng.randrange(10**17, 10**18)): {"ratings": encode_ratings({game_id: rng.choice((0, 0, 1, 2, 3, 4, 5)) for game_id in range(1, game_count + 1)})}
+                for _ in range(rng.randint(5, 60))
+            })
+    return samples
+
+
+def benchmark_data_formats(samples: list, repeat: int = 20) -> dict:
+    """Compare the data formats (and the former indent=2 JSON) on votes files and archive records.
+    
+    Args:
+        samples: Votes of several servers (see load_benchmark_votes)
+        repeat: Number of times each sample is encoded and decoded
+    
+    Returns:
+        Dictionary of format -> bytes (votes files), gzip_bytes (archive records),
+        encode and decode (milliseconds for all the samples, once)
+    """
+    formats = {"json (indent=2)": (lambda data: json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8'), json.loads)}
+    for name in get_available_data_formats():
+        formats[name] = (lambda data, name=name: dumps_data(data, name), loads_data)
+    
+    results = {}
+    for name, (dumps, loads) in formats.items():
+        encoded = [dumps(votes) for votes in samples]
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for votes in samples:
+                dumps(votes)
+        encode = (time.perf_counter() - start) * 1000 / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for data in encoded:
+                loads(data)
+        decode = (time.perf_counter() - start) * 1000 / repeat
+        results[name] = {
+            "bytes": sum(len(data) for data in encoded),
+            "gzip_bytes": sum(len(gzip.compress(dumps({"period": "2000-01-01", "votes": votes}))) for votes in samples),
+            "encode": encode,
+            "decode": decode,
+        }
+    return results
+
+
+def print_report(task: str, report: dict, verbose: bool = False):
+    """Print the outcome of a bulk operation."""
+    results = report["results"]
+    if verbose:
+        for guild_id, result in results.items():
+            print(f"{guild_id}: {result}")
+    print(f"{task}: {len(results)} guild(s) done in {report['seconds']:.2f}s")
+    if task == "restore":
+        seconds = max(report["seconds"], 1e-6)
+        print(f"restore: {report['games']['added']} game(s) added to the shared catalog, {report['games']['updated']} updated")
+        print(f"restore: {(len(results) + len(report['failed'])) / seconds:.1f} guild(s)/s, {report['bytes'] / seconds / (1024 * 1024):.1f} MB/s")
+    for name, error in report["failed"].items():
+        print(f"FAILED {name}: {error}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline maintenance of the bot data (run from the bot folder).")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print the result of every guild")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    check_parser = subparsers.add_parser("check", help="Check every guild's files and their references to the shared catalog")
+    check_parser.add_argument("--repair", action="store_true", help="Repair what can be repaired (corrupt files are kept as *.corrupt)")
+    check_parser.add_argument("--report", type=Path, help="Write the JSON lines report to this file (default: standard output)")
+    subparsers.add_parser("reindex", help="Rebuild the guild index and the vote archive indexes")
+    subparsers.add_parser("compact", help="Compact the shared catalog journal and archive closed voting periods")
+    prune_parser = subparsers.add_parser("prune", help="Drop archived voting periods older than --keep-days")
+    prune_parser.add_argument("--keep-days", type=int, default=30)
+    migrate_parser = subparsers.add_parser("migrate", help="Upgrade every guild to the current schema (and directory layout)")
+    migrate_parser.add_argument("--layout", choices=GUILD_LAYOUTS, help="Also move guild folders to this layout")
+    export_parser = subparsers.add_parser("export", help="Export every guild to a folder")
+    export_parser.add_argument("directory", type=Path)
+    export_parser.add_argument("--all-games", action="store_true", help="Include the whole shared catalog in every export")
+    export_parser.add_argument("--compress", action="store_true", help="Gzip the exports")
+    restore_parser = subparsers.add_parser("restore", help="Restore every guild from a folder of exports (the newest export of each)")
+    restore_parser.add_argument("directory", type=Path)
+    restore_parser.add_argument("--overwrite", action="store_true", help="Replace the guilds' data instead of merging")
+    bench_parser = subparsers.add_parser("bench-formats", help="Compare the data formats of the votes files on the guilds' votes")
+    bench_parser.add_argument("--guilds", type=int, default=100, help="Number of guilds whose votes are used")
+    bench_parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+    
+    from core.logger_config import setup_logging
+    setup_logging()
+    options = {}
+    
+    # bench-formats only uses the installed formats, every other command may write votes files
+    if args.command != "bench-formats":
+        try:
+            check_data_format()
+        except RuntimeError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 2
+    
+    # Steps on shared files run once, in this process, before the per-guild work
+    if args.command == "reindex":
+        rebuild_guild_index()
+    elif args.command == "compact":
+        print(f"compact: {compact_shared_games()} shared catalog journal entries folded")
+    elif args.command == "prune":
+        options["keep_days"] = args.keep_days
+    elif args.command == "migrate":
+        print(f"migrate: {recover_interrupted_writes()} temporary file(s) of interrupted writes removed")
+        if args.layout:
+            print(f"migrate: {asyncio.run(migrate_guild_layout(args.layout))} guild folder(s) moved to the {args.layout} layout")
+    elif args.command == "export":
+        args.directory.mkdir(parents=True, exist_ok=True)
+        options.update(
+            directory=str(args.directory), all_games=args.all_games, compress=args.compress,
+            timestamp=datetime.now().strftime("%Y%m%d_%H%M%S")
+        )
+    
+    if args.command == "check":
+        report_file = open(args.report, 'w', encoding='utf-8') if args.report else sys.stdout
+        try:
+            summary = check_all_guilds(report_file, repair=args.repair, jobs=args.jobs)
+        finally:
+            if args.report:
+                report_file.close()
+        issues = sum(summary["issues"].values())
+        details = ", ".join(f"{check}: {count}" for check, count in sorted(summary["issues"].items()))
+        print(
+            f"check: {summary['guilds']} guild(s) checked in {summary['seconds']:.2f}s, {summary['unhealthy']} with issues, "
+            f"{issues} issue(s){f' ({details})' if details else ''}, {summary['repaired']} repaired",
+            file=sys.stderr
+        )
+        for guild_id, error in summary["failed"].items():
+            print(f"FAILED {guild_id}: {error}", file=sys.stderr)
+        return 1 if summary["failed"] or issues > summary["repaired"] else 0
+    
+    if args.command == "bench-formats":
+        samples = load_benchmark_votes(list_guild_ids(), args.guilds)
+        print(f"bench-formats: votes of {len(samples)} guild(s), {sum(map(len, samples))} user(s), {args.repeat} run(s)")
+        print(f"{'format':<16}{'size':>12}{'archived':>12}{'encode':>12}{'decode':>12}")
+        for name, result in benchmark_data_formats(samples, args.repeat).items():
+            print(
+                f"{name:<16}{result['bytes'] / 1024:>10.1f}KB{result['gzip_bytes'] / 1024:>10.1f}KB"
+                f"{result['encode']:>10.2f}ms{result['decode']:>10.2f}ms"
+            )
+        return 0
+    
+    if args.command == "restore":
+        report = restore_guilds(args.directory, overwrite=args.overwrite, jobs=args.jobs)
+    else:
+        guild_ids = [guild_id for guild_id in list_guild_ids() if guild_dir_exists(guild_id)]
+        report = run_on_all_guilds(args.command, options, jobs=args.jobs, guild_ids=guild_ids)
+    print_report(args.command, report, verbose=args.verbose)
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,10 +2,12 @@
 import discord
 from discord import app_commands
 import logging
-import json
 import io
+import tempfile
 from datetime import datetime
-from core.data_manager import save_old_votes, clear_votes, export_guild_data, import_guild_data
+from core.data_manager import clear_votes, export_guild_data, EXPORT_SPOOL_SIZE
+from core.data_import import import_guild_data, InvalidExportError, MAX_REPORTED_ERRORS
+from core.guild_actors import run_task
 from core.helpers import require_admin, require_guild, send_guild_only_error, send_admin_error
 
 logger = logging.getLogger(__name__)
@@ -24,16 +26,15 @@ def setup_admin_commands(bot: discord.ext.commands.Bot):
         
         guild_id, user_id, t = result
         
-        old_file = save_old_votes(guild_id)
-        clear_votes(guild_id, save_backup=False)
+        period = await run_task(guild_id, clear_votes, guild_id)
         
         logger.info(f"Votes cleared manually by {interaction.user} (ID: {interaction.user.id}) in guild {guild_id}")
-        if old_file:
-            logger.info(f"Votes backed up to: {old_file}")
+        if period:
+            logger.info(f"Votes kept as past period {period}")
         
         message = t("clearvotes_success")
-        if old_file:
-            message += f"\n{t('clearvotes_backup', file=old_file.split('/')[-1])}"
+        if period:
+            message += f"\n{t('clearvotes_backup', period=period)}"
         
         await interaction.response.send_message(message)
     
@@ -72,7 +73,11 @@ def setup_admin_commands(bot: discord.ext.commands.Bot):
     
     
     @bot.tree.command(name="exportdata", description="Export all server data (games, votes, config, schedules)")
-    async def exportdata(interaction: discord.Interaction):
+    @app_commands.describe(
+        all_games="Include the whole shared game catalog instead of this server's games only",
+        compress="Compress the export (gzip), done automatically when the file is too large to upload"
+    )
+    async def exportdata(interaction: discord.Interaction, all_games: bool = False, compress: bool = False):
         """Export all server data as a JSON file."""
         result = require_admin(interaction)
         if result is None:
@@ -87,28 +92,35 @@ def setup_admin_commands(bot: discord.ext.commands.Bot):
         try:
             guild_id, user_id, t = result
             
-            # Export all data
-            export_data = export_guild_data(guild_id)
-            
-            # Create JSON file in memory
-            json_str = json.dumps(export_data, indent=2, ensure_ascii=False)
-            json_bytes = json_str.encode('utf-8')
+            # Stream the export to a temporary file, compressed if it doesn't fit in an attachment
+            file_obj = await run_task(guild_id, export_guild_data, guild_id, all_games=all_games, compress=compress)
+            size = file_obj.seek(0, io.SEEK_END)
+            if size > interaction.guild.filesize_limit and not compress:
+                file_obj.close()
+                compress = True
+                file_obj = await run_task(guild_id, export_guild_data, guild_id, all_games=all_games, compress=True)
+                size = file_obj.seek(0, io.SEEK_END)
+            if size > interaction.guild.filesize_limit:
+                file_obj.close()
+                await interaction.followup.send(
+                    t("export_too_large", size=size // (1024 * 1024), limit=interaction.guild.filesize_limit // (1024 * 1024)),
+                    ephemeral=True
+                )
+                return
+            file_obj.seek(0)
             
-            # Create file-like object
-            file_obj = io.BytesIO(json_bytes)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"tatiBot_export_{guild_id}_{timestamp}.json"
+            filename = f"tatiBot_export_{guild_id}_{timestamp}.json{'.gz' if compress else ''}"
             
             # Send as file attachment
-            file = discord.File(file_obj, filename=filename)
-            
-            await interaction.followup.send(
-                t("export_success", filename=filename),
-                file=file,
-                ephemeral=True
-            )
+            with file_obj:
+                await interaction.followup.send(
+                    t("export_success", filename=filename),
+                    file=discord.File(file_obj, filename=filename),
+                    ephemeral=True
+                )
             
-            logger.info(f"Data exported by {interaction.user} (ID: {user_id}) in guild {guild_id}")
+            logger.info(f"Data exported by {interaction.user} (ID: {user_id}) in guild {guild_id} ({size} bytes, all_games={all_games}, compress={compress})")
             
         except Exception as e:
             guild_id = interaction.guild.id if interaction.guild else None
@@ -125,9 +137,10 @@ def setup_admin_commands(bot: discord.ext.commands.Bot):
     @bot.tree.command(name="importdata", description="Import server data from a JSON file")
     @app_commands.describe(
         file="The JSON export file to import",
-        overwrite="If true, completely replace existing data. If false, merge with existing data."
+        overwrite="If true, completely replace existing data. If false, merge with existing data.",
+        dry_run="If true, only show what the import would change"
     )
-    async def importdata(interaction: discord.Interaction, file: discord.Attachment, overwrite: bool = False):
+    async def importdata(interaction: discord.Interaction, file: discord.Attachment, overwrite: bool = False, dry_run: bool = False):
         """Import server data from an exported JSON file."""
         result = require_admin(interaction)
         if result is None:
@@ -143,56 +156,59 @@ def setup_admin_commands(bot: discord.ext.commands.Bot):
             guild_id, user_id, t = result
             
             # Check file type
-            if not file.filename.endswith('.json'):
+            if not file.filename.endswith(('.json', '.json.gz')):
                 await interaction.followup.send(
                     t("import_error_invalid_file"),
                     ephemeral=True
                 )
                 return
             
-            # Download and parse JSON
-            file_content = await file.read()
-            try:
-                data = json.loads(file_content.decode('utf-8'))
-            except json.JSONDecodeError as e:
-                await interaction.followup.send(
-                    t("import_error_invalid_json", error=str(e)),
-                    ephemeral=True
-                )
-                return
-            
-            # Validate data structure
-            if not isinstance(data, dict):
-                await interaction.followup.send(
-                    t("import_error_invalid_format"),
-                    ephemeral=True
-                )
-                return
-            
-            # Import data
-            results = import_guild_data(guild_id, data, overwrite=overwrite)
+            # Download to a temporary file, parsed section by section
+            with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as file_obj:
+                await file.save(file_obj)
+                file_obj.seek(0)
+                try:
+                    # In the guild's mailbox: no vote or setting change is applied in the middle of the import
+                    results = await run_task(guild_id, import_guild_data, guild_id, file_obj, overwrite=overwrite, dry_run=dry_run)
+                except InvalidExportError as e:
+                    await interaction.followup.send(
+                        t("import_error_invalid_json", error=str(e)),
+                        ephemeral=True
+                    )
+                    return
             
             # Build result message
             mode = t("import_mode_overwrite") if overwrite else t("import_mode_merge")
-            message_parts = [
-                t("import_success", mode=mode),
-                f"• {t('import_games', count=results['games'])}",
-                f"• {t('import_votes', count=results['votes'])}",
-                f"• {t('import_config', success='✅' if results['config'] else '❌')}",
-                f"• {t('import_schedules', count=results['schedules'])}"
-            ]
-            
-            if results["errors"]:
-                message_parts.append(f"\n⚠️ {t('import_warnings', count=len(results['errors']))}")
-                for error in results["errors"]:
+            diff = results["diff"]
+            if not diff:
+                await interaction.followup.send(t("import_error_invalid_format"), ephemeral=True)
+                return
+            message_parts = [t("import_dry_run", mode=mode) if dry_run else t("import_success", mode=mode)]
+            if "games" in diff:
+                message_parts.append(f"• {t('import_diff_games', **diff['games'])}")
+            if "server_game_list" in diff:
+                message_parts.append(f"• {t('import_diff_game_list', **diff['server_game_list'])}")
+            if "votes" in diff:
+                message_parts.append(f"• {t('import_diff_votes', **diff['votes'])}")
+            if "config" in diff:
+                message_parts.append(f"• {t('import_diff_config', **diff['config'])}")
+            if "schedules" in diff:
+                message_parts.append(f"• {t('import_diff_schedules', **diff['schedules'])}")
+            
+            errors = results["errors"]
+            if errors:
+                message_parts.append(f"\n{t('import_warnings', count=len(errors))}")
+                for error in errors[:MAX_REPORTED_ERRORS]:
                     message_parts.append(f"  • {error}")
+                if len(errors) > MAX_REPORTED_ERRORS:
+                    message_parts.append("  • …")
             
             await interaction.followup.send(
                 "\n".join(message_parts),
                 ephemeral=True
             )
             
-            logger.info(f"Data imported by {interaction.user} (ID: {user_id}) in guild {guild_id} (overwrite={overwrite})")
+            logger.info(f"Data imported by {interaction.user} (ID: {user_id}) in guild {guild_id} (overwrite={overwrite}, dry_run={dry_run}, {len(errors)} skipped record(s))")
             
         except Exception as e:
             guild_id = interaction.guild.id if interaction.guild else None
@@ -2,7 +2,8 @@
 import discord
 from discord import app_commands
 import logging
-from core.data_manager import load_server_config, save_server_config
+from core.data_manager import load_server_config
+from core.guild_actors import mutate_config
 from core.helpers import require_admin, send_guild_only_error, send_admin_error, require_guild
 
 logger = logging.getLogger(__name__)
@@ -56,11 +57,12 @@ def setup_config_commands(bot: discord.ext.commands.Bot):
             return
         
         # Update config
-        config = load_server_config(guild_id)
-        config["reminder_day"] = day
-        config["reminder_hour"] = hour
-        config["reminder_minute"] = minute
-        save_server_config(config, guild_id)
+        def set_reminder(config):
+            config.reminder_day = day
+            config.reminder_hour = hour
+            config.reminder_minute = minute
+        
+        await mutate_config(guild_id, set_reminder)
         
         logger.info(f"Reminder schedule updated: {day} {hour:02d}:{minute:02d} by {interaction.user} (ID: {user_id}) in guild {guild_id}")
         
@@ -94,13 +96,14 @@ def setup_config_commands(bot: discord.ext.commands.Bot):
             return
         
         guild_id, user_id, t = result
-        config = load_server_config(guild_id)
         
         if day == "none":
-            config["game_night_day"] = None
-            config["game_night_hour"] = None
-            config["game_night_minute"] = None
-            save_server_config(config, guild_id)
+            def disable_game_night(config):
+                config.game_night_day = None
+                config.game_night_hour = None
+                config.game_night_minute = None
+            
+            await mutate_config(guild_id, disable_game_night)
             
             logger.info(f"Recurring game night disabled by {interaction.user} (ID: {user_id}) in guild {guild_id}")
             await interaction.response.send_message(t("configgamenight_disabled"), ephemeral=True)
@@ -120,10 +123,12 @@ def setup_config_commands(bot: discord.ext.commands.Bot):
             return
         
         # Update config
-        config["game_night_day"] = day
-        config["game_night_hour"] = hour
-        config["game_night_minute"] = minute
-        save_server_config(config, guild_id)
+        def set_game_night(config):
+            config.game_night_day = day
+            config.game_night_hour = hour
+            config.game_night_minute = minute
+        
+        await mutate_config(guild_id, set_game_night)
         
         logger.info(f"Game night schedule updated: {day} {hour:02d}:{minute:02d} by {interaction.user} (ID: {user_id}) in guild {guild_id}")
         
@@ -150,9 +155,9 @@ def setup_config_commands(bot: discord.ext.commands.Bot):
         embed = discord.Embed(title=t("config_title"), color=discord.Color.blue())
         
         # Reminder schedule
-        reminder_day = DAY_NAMES.get(config.get("reminder_day", "sun"), "Sunday")
-        reminder_hour = config.get("reminder_hour", 20)
-        reminder_minute = config.get("reminder_minute", 0)
+        reminder_day = DAY_NAMES.get(config.reminder_day, "Sunday")
+        reminder_hour = config.reminder_hour
+        reminder_minute = config.reminder_minute
         embed.add_field(
             name=t("config_reminder"),
             value=f"{reminder_day} at {reminder_hour:02d}:{reminder_minute:02d}",
@@ -160,10 +165,10 @@ def setup_config_commands(bot: discord.ext.commands.Bot):
         )
         
         # Game night schedule
-        game_night_day = config.get("game_night_day")
+        game_night_day = config.game_night_day
         if game_night_day:
-            game_night_hour = config.get("game_night_hour", 20)
-            game_night_minute = config.get("game_night_minute", 0)
+            game_night_hour = config.game_night_hour if config.game_night_hour is not None else 20
+            game_night_minute = config.game_night_minute if config.game_night_minute is not None else 0
             game_night_day_name = DAY_NAMES.get(game_night_day, game_night_day)
             embed.add_field(
                 name=t("config_gamenight"),
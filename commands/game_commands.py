@@ -1,11 +1,13 @@
 """Game management commands (add, remove, update, list, configure)."""
+import asyncio
 import discord
 from discord import app_commands
 import logging
 import re
-from core.data_manager import load_games, save_games, load_server_config, save_server_config
-from core.helpers import require_game_permission, require_admin, send_guild_only_error, send_permission_error, send_admin_error
-from views.game_views import UpdateGameView, AddGameModal, RemoveGameView, GameListPaginationView
+from core.data_manager import load_games, update_shared_game, get_sorted_games, filter_games, find_game_key
+from core.guild_actors import mutate_config
+from core.helpers import require_game_permission, require_admin, send_guild_only_error, send_permission_error, send_admin_error, game_autocomplete, tag_autocomplete
+from views.game_views import UpdateGameView, AddGameModal, RemoveGameView, GameListPaginationView, create_game_list_embed, get_game_list_total_pages
 
 logger = logging.getLogger(__name__)
 
@@ -88,7 +90,18 @@ def setup_game_commands(bot: discord.ext.commands.Bot):
     
     
     @bot.tree.command(name="listgames", description="Show all available games")
-    async def listgames(interaction: discord.Interaction):
+    @app_commands.describe(
+        sort="How to sort the list (default: by ID)",
+        tag="Only show games with this tag",
+        remote_play="Only show games supporting Steam Remote Play Together"
+    )
+    @app_commands.choices(sort=[
+        app_commands.Choice(name="ID", value="id"),
+        app_commands.Choice(name="Name", value="name"),
+        app_commands.Choice(name="Player count", value="players")
+    ])
+    @app_commands.autocomplete(tag=tag_autocomplete)
+    async def listgames(interaction: discord.Interaction, sort: str = "id", tag: str = None, remote_play: bool = False):
         """List all available games."""
         from core.helpers import require_guild
         
@@ -104,17 +117,23 @@ def setup_game_commands(bot: discord.ext.commands.Bot):
             await interaction.response.send_message(t("error_no_games"))
             return
         
-        # Prepare game list as tuples (game_key, game_data) sorted by ID and name
-        games_list = sorted(
-            [(key, game_data) for key, game_data in games.items()],
-            key=lambda x: (x[1].get("id", 9999), x[1]["name"])
-        )
+        # Filter by tag / Remote Play Together with the tag bitmaps
+        games = filter_games(games, tag=tag, remote_play=remote_play, guild_id=guild_id)
+        if not games:
+            await interaction.response.send_message(t("error_no_games_filter"), ephemeral=True)
+            return
         
-        # Create pagination view
-        view = GameListPaginationView(games_list, guild_id, user_id)
-        embed = view.create_embed()
+        # Game list as tuples (game_key, game_data) from the server's order index
+        games_list = get_sorted_games(guild_id, order=sort, games=games)
         
-        await interaction.response.send_message(embed=embed, view=view)
+        # Create pagination view
+        embed = create_game_list_embed(games_list, 0, guild_id, user_id)
+        total_pages = get_game_list_total_pages(games_list)
+        if total_pages > 1:
+            view = GameListPaginationView(guild_id, 0, total_pages, order=sort, tag=tag, remote_play=remote_play)
+            await interaction.response.send_message(embed=embed, view=view)
+        else:
+            await interaction.response.send_message(embed=embed)
     
     # ========== Game Configuration Commands ==========
     
@@ -123,6 +142,7 @@ def setup_game_commands(bot: discord.ext.commands.Bot):
         game="The name or ID of the game",
         emoji="The emoji/emote to use for this game"
     )
+    @app_commands.autocomplete(game=game_autocomplete)
     async def setgameemoji(interaction: discord.Interaction, game: str, emoji: str):
         """Change the emoji for an existing game."""
         result = require_game_permission(interaction)
@@ -136,39 +156,28 @@ def setup_game_commands(bot: discord.ext.commands.Bot):
         guild_id, user_id, t = result
         games = load_games(guild_id)
         
-        # Try to find by ID first, then by name
-        game_key = None
-        game_name = None
-        
-        try:
-            game_id = int(game)
-            for key, game_data in games.items():
-                if game_data.get("id") == game_id:
-                    game_key = key
-                    game_name = game_data["name"]
-                    break
-        except ValueError:
-            game_key = game.lower()
-            if game_key in games:
-                game_name = games[game_key]["name"]
-        
-        if game_key is None or game_key not in games:
+        # Find by ID first, then by name (index lookups)
+        game_key = find_game_key(game, games)
+        
+        if game_key is None:
             await interaction.response.send_message(t("error_game_not_found", game=game), ephemeral=True)
             return
         
-        old_emoji = games[game_key].get("emoji", "🎮")
-        games[game_key]["emoji"] = emoji
-        save_games(games, guild_id)
+        game_name = games[game_key]["name"]
+        old_emoji = games[game_key].emoji
+        # Patch only this game's emoji field in the shared catalog
+        await asyncio.to_thread(update_shared_game, game_key, {"emoji": emoji})
+        games = load_games(guild_id)
         
         logger.info(f"Game emoji changed: '{game_name}' from {old_emoji} to {emoji} by {interaction.user} (ID: {interaction.user.id}) in guild {guild_id}")
         
         # Show list of games
         embed = discord.Embed(title="🎮 Available Games", color=discord.Color.green())
         game_list = []
-        for game_data in sorted(games.values(), key=lambda x: (x.get("id", 9999), x["name"])):
-            emoji_display = game_data.get("emoji", "🎮")
+        for _, game_data in get_sorted_games(guild_id, games=games):
+            emoji_display = game_data.emoji
             line = f"{emoji_display} **{game_data['name']}** - Players: {game_data['min_players']}-{game_data['max_players']}"
-            store_links = game_data.get("store_links", "")
+            store_links = game_data.store_links
             if store_links:
                 line += f"\n   🔗 {store_links}"
             game_list.append(line)
@@ -192,11 +201,14 @@ def setup_game_commands(bot: discord.ext.commands.Bot):
             return
         
         guild_id, user_id, t = result
-        config = load_server_config(guild_id)
+        
+        def set_roles(role_ids):
+            def update(config):
+                config.game_management_roles = role_ids
+            return update
         
         if not roles or not roles.strip():
-            config["game_management_roles"] = []
-            save_server_config(config, guild_id)
+            await mutate_config(guild_id, set_roles([]))
             await interaction.response.send_message(t("gameroles_cleared"), ephemeral=True)
             return
         
@@ -229,8 +241,7 @@ def setup_game_commands(bot: discord.ext.commands.Bot):
             await interaction.response.send_message(t("gameroles_invalid"), ephemeral=True)
             return
         
-        config["game_management_roles"] = role_ids
-        save_server_config(config, guild_id)
+        await mutate_config(guild_id, set_roles(role_ids))
         
         logger.info(f"Game management roles updated: {role_names} by {interaction.user} (ID: {user_id}) in guild {guild_id}")
         
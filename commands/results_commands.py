@@ -1,13 +1,22 @@
 """Results command."""
 import discord
-from core.data_manager import load_votes, load_games
-from core.helpers import require_guild, send_guild_only_error
+from discord import app_commands
+from datetime import datetime
+from core.data_manager import load_votes_in_period, load_games, filter_games, get_period_at
+from core.helpers import require_guild, send_guild_only_error, tag_autocomplete
+from views.results_view import ResultsPaginationView, compute_results, create_results_embed, get_total_pages
 
 def setup_results_commands(bot: discord.ext.commands.Bot):
     """Register results command."""
     
     @bot.tree.command(name="results", description="Show voting results and recommended game")
-    async def results(interaction: discord.Interaction):
+    @app_commands.describe(
+        tag="Only rank games with this tag",
+        remote_play="Only rank games supporting Steam Remote Play Together",
+        date="Show the results of the voting period running on this date (YYYY-MM-DD)"
+    )
+    @app_commands.autocomplete(tag=tag_autocomplete)
+    async def results(interaction: discord.Interaction, tag: str = None, remote_play: bool = False, date: str = None):
         """Show voting results and the most wanted game based on votes and player count."""
         result = require_guild(interaction)
         if result is None:
@@ -15,39 +24,35 @@ def setup_results_commands(bot: discord.ext.commands.Bot):
             return
         
         guild_id, user_id, t = result
-        votes = load_votes(guild_id)
+        period = None
+        if date:
+            try:
+                datetime.strptime(date, "%Y-%m-%d")
+            except ValueError:
+                await interaction.response.send_message(t("schedule_invalid_date"), ephemeral=True)
+                return
+            period = get_period_at(guild_id, date)
+            if period is None:
+                await interaction.response.send_message(t("history_no_period", date=date), ephemeral=True)
+                return
+        
+        votes = load_votes_in_period(guild_id, period)
         games = load_games(guild_id)
         
         if not votes:
             await interaction.response.send_message(t("results_no_votes"), ephemeral=True)
             return
         
-        # Count available players
-        available_users = {
-            uid: user_data for uid, user_data in votes.items()
-            if not user_data.get("unavailable", False)
-        }
-        available_players = len(available_users)
-        
-        # Calculate game scores
-        game_scores = {}
-        for game_key in games.keys():
-            game_scores[game_key] = 0
-        
-        for user_data in available_users.values():
-            user_game_votes = user_data.get("votes", {})
-            for game_key in games.keys():
-                rating = user_game_votes.get(game_key, 0)
-                game_scores[game_key] += rating
+        games = filter_games(games, tag=tag, remote_play=remote_play, guild_id=guild_id)
+        if not games:
+            await interaction.response.send_message(t("error_no_games_filter"), ephemeral=True)
+            return
         
-        # Filter games by player count compatibility
-        compatible_games = {}
-        for game_key, score in game_scores.items():
-            game = games[game_key]
-            if game["min_players"] <= available_players <= game["max_players"]:
-                compatible_games[game_key] = score
+        results_data = compute_results(games, votes)
+        available_players = results_data["available_players"]
+        game_scores = results_data["game_scores"]
         
-        if not compatible_games:
+        if not results_data["games_data"]:
             embed = discord.Embed(
                 title=t("results_title"),
                 description=t("results_available_players", count=available_players),
@@ -61,70 +66,22 @@ def setup_results_commands(bot: discord.ext.commands.Bot):
             embed.add_field(
                 name="Available Games",
                 value="\n".join([
-                    f"{games[k].get('emoji', '🎮')} **{games[k]['name']}** - Needs {games[k]['min_players']}-{games[k]['max_players']} players (Score: {game_scores[k]})"
+                    f"{games[k].emoji} **{games[k]['name']}** - Needs {games[k]['min_players']}-{games[k]['max_players']} players (Score: {game_scores[k]})"
                     for k in sorted(game_scores.keys(), key=lambda x: game_scores[x], reverse=True)
                 ]) or "None",
                 inline=False
             )
+            if period:
+                embed.set_footer(text=t("history_period", period=period))
             await interaction.response.send_message(embed=embed)
             return
         
-        # Find the best game
-        best_game_key = max(compatible_games.items(), key=lambda x: x[1])[0]
-        best_game = games[best_game_key]
-        best_score = compatible_games[best_game_key]
-        
-        # Create results embed
-        embed = discord.Embed(
-            title=t("results_title"),
-            description=t("results_available_players", count=available_players),
-            color=discord.Color.gold()
-        )
-        
-        # Show the winner
-        best_emoji = best_game.get('emoji', '🎮')
-        embed.add_field(
-            name=t("results_recommended"),
-            value=f"{best_emoji} **{best_game['name']}**\n"
-                  f"{t('results_recommended_score', score=best_score)}\n"
-                  f"{t('results_recommended_players', min=best_game['min_players'], max=best_game['max_players'])}",
-            inline=False
-        )
-        
-        # Show all compatible games sorted by score with pagination
-        sorted_games = sorted(compatible_games.items(), key=lambda x: x[1], reverse=True)
-        games_data = [(game_key, games[game_key], score) for game_key, score in sorted_games]
-        
-        # Show who voted
-        voters = [available_users[uid]["username"] for uid in available_users.keys()]
-        embed.add_field(
-            name=t("results_voters"),
-            value=", ".join(voters) if voters else "None",
-            inline=False
-        )
+        embed = create_results_embed(results_data, 0, guild_id, user_id, period=period)
         
         # Use pagination view if there are many games
-        if len(games_data) > 10:
-            from views.results_view import ResultsPaginationView
-            view = ResultsPaginationView(games_data, available_players, guild_id, user_id, best_game_key, best_game, best_score, voters)
-            first_page_embed = view.create_embed(best_game_key, best_game, best_score, voters)
-            await interaction.response.send_message(embed=first_page_embed, view=view)
+        total_pages = get_total_pages(results_data["games_data"])
+        if total_pages > 1:
+            view = ResultsPaginationView(guild_id, 0, total_pages, tag=tag, remote_play=remote_play, period=period)
+            await interaction.response.send_message(embed=embed, view=view)
         else:
-            # Show all games if 10 or fewer
-            game_list = []
-            for game_key, game, score in games_data:
-                game_emoji = game.get('emoji', '🎮')
-                marker = "•"
-                line = f"{marker} {game_emoji} **{game['name']}** - {score} points (Players: {game['min_players']}-{game['max_players']})"
-                store_links = game.get("store_links", "")
-                if store_links:
-                    line += f"\n   🔗 {store_links}"
-                game_list.append(line)
-            
-            embed.add_field(
-                name=t("results_all_games"),
-                value="\n".join(game_list) if game_list else "None",
-                inline=False
-            )
-            
             await interaction.response.send_message(embed=embed)
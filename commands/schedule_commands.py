@@ -3,7 +3,9 @@ import discord
 from discord import app_commands
 import logging
 from datetime import datetime
-from core.data_manager import add_schedule, load_schedules
+from core.data_manager import load_schedules
+from core.guild_actors import add_schedule
+from core.user_profiles import get_user_timezone
 from core.helpers import require_guild, send_guild_only_error
 
 logger = logging.getLogger(__name__)
@@ -56,7 +58,7 @@ def setup_schedule_commands(bot: discord.ext.commands.Bot):
             return
         
         # Add the schedule
-        schedule_id = add_schedule(guild_id, schedule_datetime, description)
+        await add_schedule(guild_id, schedule_datetime, description)
         
         logger.info(f"Game night scheduled: {schedule_datetime} by {interaction.user} (ID: {user_id}) in guild {guild_id}")
         
@@ -84,7 +86,7 @@ def setup_schedule_commands(bot: discord.ext.commands.Bot):
         # Filter to only upcoming schedules
         upcoming = [
             s for s in all_schedules
-            if datetime.fromisoformat(s["datetime"]) > now
+            if s.datetime > now
         ]
         
         if not upcoming:
@@ -93,13 +95,19 @@ def setup_schedule_commands(bot: discord.ext.commands.Bot):
         
         embed = discord.Embed(title=t("schedules_title"), color=discord.Color.blue())
         
+        # Times are stored in the bot's local time, shown in the user's timezone if set
+        timezone = get_user_timezone(user_id)
         schedule_list = []
         for schedule in upcoming[:10]:  # Limit to 10 upcoming
-            schedule_dt = datetime.fromisoformat(schedule["datetime"])
-            desc = schedule.get("description", "")
+            schedule_dt = schedule.datetime
+            time_format = '%Y-%m-%d %H:%M'
+            if timezone is not None:
+                schedule_dt = schedule_dt.astimezone(timezone)
+                time_format += ' %Z'
+            desc = schedule.description
             if desc:
                 desc = f" - {desc}"
-            schedule_list.append(f"📅 **{schedule_dt.strftime('%Y-%m-%d %H:%M')}**{desc}")
+            schedule_list.append(f"📅 **{schedule_dt.strftime(time_format)}**{desc}")
         
         embed.description = "\n".join(schedule_list) if schedule_list else t("schedules_none")
         
@@ -1,9 +1,10 @@
-"""User commands (language, help)."""
+"""User commands (language, timezone, help)."""
+import asyncio
 import discord
 from discord import app_commands
 import logging
-from core.data_manager import set_user_language, get_user_language
-from core.helpers import require_guild, send_guild_only_error
+from core.user_profiles import set_user_language, set_user_timezone
+from core.helpers import require_guild, send_guild_only_error, timezone_autocomplete
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +34,7 @@ def setup_user_commands(bot: discord.ext.commands.Bot):
             )
             return
         
-        success = set_user_language(user_id, lang, guild_id)
+        success = await asyncio.to_thread(set_user_language, user_id, lang)
         
         if success:
             lang_names = {"en": "English", "fr": "Français"}
@@ -50,6 +51,29 @@ def setup_user_commands(bot: discord.ext.commands.Bot):
                 ephemeral=True
             )
     
+    @bot.tree.command(name="timezone", description="Set your timezone (game night times are shown in it)")
+    @app_commands.describe(timezone="Timezone name, e.g. Europe/Paris (leave empty to remove it)")
+    @app_commands.autocomplete(timezone=timezone_autocomplete)
+    async def timezone(interaction: discord.Interaction, timezone: str = None):
+        """Set the user's timezone (for all servers)."""
+        result = require_guild(interaction)
+        if result is None:
+            await send_guild_only_error(interaction)
+            return
+        
+        guild_id, user_id, t = result
+        timezone = timezone.strip() if timezone else None
+        
+        if not await asyncio.to_thread(set_user_timezone, user_id, timezone):
+            await interaction.response.send_message(t("timezone_invalid", timezone=timezone), ephemeral=True)
+            return
+        
+        await interaction.response.send_message(
+            t("timezone_set", timezone=timezone) if timezone else t("timezone_cleared"),
+            ephemeral=True
+        )
+        logger.info(f"Timezone set to {timezone} for user {interaction.user} (ID: {user_id}) in guild {guild_id}")
+    
     @bot.tree.command(name="help", description="Show how to use the bot and all available commands")
     async def help_command(interaction: discord.Interaction):
         """Display help information about the bot and its commands."""
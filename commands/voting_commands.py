@@ -1,84 +1,21 @@
 """Voting commands."""
+import asyncio
 import discord
 from discord import app_commands
 import logging
-from core.data_manager import load_games, load_votes
-from views.voting_view import VotingView, _generate_vote_table_fields
+from datetime import date, timedelta
+from core.data_manager import load_games, get_sorted_games, find_game_key, assign_game_id
+from core.data_manager import get_period_at, load_votes_in_period
+from core.guild_actors import set_user_vote, mutate_votes
+from core.models import UserVotes
+from core.user_profiles import update_user_profile
+from core.helpers import require_guild, send_guild_only_error, game_autocomplete
+from views.voting_view import build_voting_message
 from core.translations import get_translation
 
 logger = logging.getLogger(__name__)
 
 
-def generate_vote_table_fields(games, user_votes_data):
-    """Generate embed table fields for the voting table. Re-exported from views."""
-    return _generate_vote_table_fields(games, user_votes_data)
-    """Generate embed table fields for the voting table.
-    
-    Args:
-        games: Dictionary of games
-        user_votes_data: Dictionary of user's votes {game_key: rating}
-    
-    Returns:
-        List of tuples (field_name, field_value) for embed.add_field()
-    """
-    sorted_games = sorted(games.items(), key=lambda x: (x[1].get("id", 9999), x[1]["name"]))
-    MAX_FIELD_LENGTH = 1000  # Leave some buffer under 1024
-    
-    # Build compact table format
-    table_chunks = []
-    current_chunk = []
-    current_length = 0
-    
-    # Add header
-    header = "```\nGame" + " " * 25 + "Rating  Players\n" + "─" * 50 + "\n"
-    current_chunk.append(header)
-    current_length = len(header)
-    
-    for game_key, game_data in sorted_games:
-        game_name = game_data["name"]
-        game_id = game_data.get("id", "?")
-        emoji = game_data.get("emoji", "🎮")
-        rating = user_votes_data.get(game_key, 0)
-        players = f"{game_data['min_players']}-{game_data['max_players']}"
-        
-        # More compact format - shorter game names, simpler rating
-        # Include emoji only (no ID)
-        display_name = f"{emoji} {game_name}"
-        if len(display_name) > 25:
-            display_name = display_name[:22] + "..."
-        
-        if rating > 0:
-            rating_display = f"{rating}/5"
-        else:
-            rating_display = "0/5"
-        
-        line = f"{display_name:<25} {rating_display:<8} {players}\n"
-        
-        # Check if adding this line would exceed the limit
-        if current_length + len(line) + 3 > MAX_FIELD_LENGTH:  # +3 for closing ```
-            # Close current chunk and start new one
-            current_chunk.append("```")
-            table_chunks.append("".join(current_chunk))
-            current_chunk = [header]  # Start new chunk with header
-            current_length = len(header)
-        
-        current_chunk.append(line)
-        current_length += len(line)
-    
-    # Close the last chunk
-    if current_chunk:
-        current_chunk.append("```")
-        table_chunks.append("".join(current_chunk))
-    
-    # Return list of (field_name, field_value) tuples
-    fields = []
-    for i, chunk in enumerate(table_chunks):
-        field_name = "📊 Your Votes" if i == 0 else f"📊 Your Votes (cont.)"
-        fields.append((field_name, chunk))
-    
-    return fields
-
-
 def setup_voting_commands(bot: discord.ext.commands.Bot):
     """Register voting commands."""
     
@@ -101,30 +38,49 @@ def setup_voting_commands(bot: discord.ext.commands.Bot):
             )
             return
         
-        votes = load_votes(guild_id)
-        user_votes_data = votes.get(user_id, {}).get("votes", {})
+        embed, view = build_voting_message(guild_id, user_id, games=games)
         
-        # Create embed with table of games and ratings
-        embed = discord.Embed(
-            title=t("vote_title"),
-            description=t("vote_description"),
-            color=discord.Color.blue()
-        )
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+    
+    
+    @bot.tree.command(name="rate", description="Quickly rate a game (1-5 stars)")
+    @app_commands.describe(
+        game="The name or ID of the game",
+        stars="Your rating from 1 to 5"
+    )
+    @app_commands.autocomplete(game=game_autocomplete)
+    async def rate(interaction: discord.Interaction, game: str, stars: app_commands.Range[int, 1, 5]):
+        """Rate a single game without opening the voting menu."""
+        result = require_guild(interaction)
+        if result is None:
+            await send_guild_only_error(interaction)
+            return
         
-        # Generate table fields using helper function
-        table_fields = generate_vote_table_fields(games, user_votes_data)
-        for field_name, field_value in table_fields:
-            embed.add_field(name=field_name, value=field_value, inline=False)
+        guild_id, user_id, t = result
+        games = load_games(guild_id)
+        game_key = find_game_key(game, games)
         
-        view = VotingView(games, votes, guild_id, user_id)
-        view.embed = embed  # Store embed reference for updates
+        if game_key is None:
+            await interaction.response.send_message(t("error_game_not_found", game=game), ephemeral=True)
+            return
         
-        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+        # Acknowledge first: the vote is only saved once its group commit is on disk
+        await interaction.response.defer(ephemeral=True)
+        game_id = games[game_key].id or await asyncio.to_thread(assign_game_id, game_key)
+        await set_user_vote(guild_id, user_id, str(interaction.user), game_id, stars)
+        
+        logger.info(f"Vote saved: {interaction.user} (ID: {user_id}) rated {stars}/5 for '{games[game_key]['name']}' in guild {guild_id}")
+        
+        await interaction.followup.send(
+            t("vote_modal_success", game=games[game_key]['name'], rating=stars, stars="⭐" * stars),
+            ephemeral=True
+        )
     
     
     @bot.tree.command(name="myvotes", description="View your current votes")
-    async def myvotes(interaction: discord.Interaction):
-        """Show your current votes."""
+    @app_commands.describe(weeks_ago="Show your votes of the voting period running this many weeks ago")
+    async def myvotes(interaction: discord.Interaction, weeks_ago: app_commands.Range[int, 0, 520] = 0):
+        """Show your current votes, or those of a past voting period."""
         if not interaction.guild:
             await interaction.response.send_message("❌ This command can only be used in a server!", ephemeral=True)
             return
@@ -132,7 +88,14 @@ def setup_voting_commands(bot: discord.ext.commands.Bot):
         guild_id = interaction.guild.id
         user_id = str(interaction.user.id)
         t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=guild_id, **kw)
-        votes = load_votes(guild_id)
+        period = None
+        if weeks_ago:
+            day = (date.today() - timedelta(weeks=weeks_ago)).isoformat()
+            period = get_period_at(guild_id, day)
+            if period is None:
+                await interaction.response.send_message(t("history_no_period", date=day), ephemeral=True)
+                return
+        votes = load_votes_in_period(guild_id, period)
         games = load_games(guild_id)
         
         if not games:
@@ -142,8 +105,8 @@ def setup_voting_commands(bot: discord.ext.commands.Bot):
             )
             return
         
-        user_votes = votes.get(user_id, {}).get("votes", {}) if user_id in votes else {}
-        is_unavailable = votes.get(user_id, {}).get("unavailable", False) if user_id in votes else False
+        user_votes = votes.get(user_id) or UserVotes()
+        is_unavailable = user_votes.unavailable
         
         embed = discord.Embed(
             title=t("myvotes_title"),
@@ -152,10 +115,9 @@ def setup_voting_commands(bot: discord.ext.commands.Bot):
         )
         
         vote_list = []
-        for game_key, game_data in sorted(games.items(), key=lambda x: (x[1].get("id", 9999), x[1]["name"])):
-            emoji = game_data.get("emoji", "🎮")
-            game_id = game_data.get("id", "?")
-            rating = user_votes.get(game_key, 0)
+        for game_key, game_data in get_sorted_games(guild_id, games=games):
+            emoji = game_data.emoji
+            rating = user_votes.get_rating(game_data.id)
             if rating > 0:
                 rating_emoji = "⭐" * rating
                 vote_list.append(
@@ -168,10 +130,12 @@ def setup_voting_commands(bot: discord.ext.commands.Bot):
         
         embed.description = "\n".join(vote_list)
         
-        # Show availability status
-        if is_unavailable:
+        # Show availability status (or the period for past votes)
+        if period:
+            embed.set_footer(text=t("history_period", period=period))
+        elif is_unavailable:
             embed.set_footer(text="❌ You are marked as unavailable (use /available to mark yourself available)")
-        elif user_votes:
+        elif user_votes.ratings:
             embed.set_footer(text=t("myvotes_available"))
         else:
             embed.set_footer(text=t("myvotes_unavailable"))
@@ -189,36 +153,33 @@ def setup_voting_commands(bot: discord.ext.commands.Bot):
         guild_id = interaction.guild.id
         user_id = str(interaction.user.id)
         t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=guild_id, **kw)
-        votes = load_votes(guild_id)
-        
-        from core.data_manager import save_votes
         
-        # Initialize user entry if it doesn't exist
-        if user_id not in votes:
-            votes[user_id] = {
-                "username": str(interaction.user),
-                "votes": {},
-                "unavailable": True,
-                "language": "en"
-            }
-        else:
+        def mark_unavailable(votes):
+            # Initialize user entry if it doesn't exist
+            if user_id not in votes:
+                votes[user_id] = UserVotes(unavailable=True)
+                return True
             # Check if already unavailable
-            if votes[user_id].get("unavailable", False):
-                await interaction.response.send_message(
-                    t("unavailable_already"),
-                    ephemeral=True
-                )
-                return
-            
+            if votes[user_id].unavailable:
+                return False
             # Mark as unavailable but keep votes
-            votes[user_id]["unavailable"] = True
-            votes[user_id]["username"] = str(interaction.user)
+            votes[user_id].unavailable = True
+            return True
+        
+        # Acknowledge first: the change is only saved once its group commit is on disk
+        await interaction.response.defer(ephemeral=True)
+        if not await mutate_votes(guild_id, mark_unavailable):
+            await interaction.followup.send(
+                t("unavailable_already"),
+                ephemeral=True
+            )
+            return
         
-        save_votes(votes, guild_id)
+        await asyncio.to_thread(update_user_profile, user_id, username=str(interaction.user))
         
         logger.info(f"User marked as unavailable: {interaction.user} (ID: {user_id}) in guild {guild_id}")
         
-        await interaction.response.send_message(
+        await interaction.followup.send(
             t("unavailable_success"),
             ephemeral=True
         )
@@ -233,41 +194,40 @@ def setup_voting_commands(bot: discord.ext.commands.Bot):
         guild_id = interaction.guild.id
         user_id = str(interaction.user.id)
         t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=guild_id, **kw)
-        votes = load_votes(guild_id)
         
-        from core.data_manager import save_votes
-        
-        # Initialize user entry if it doesn't exist
-        if user_id not in votes:
-            votes[user_id] = {
-                "username": str(interaction.user),
-                "votes": {},
-                "unavailable": False,
-                "language": "en"
-            }
-            save_votes(votes, guild_id)
-            await interaction.response.send_message(
-                t("available_no_votes"),
+        def mark_available(votes):
+            # Initialize user entry if it doesn't exist
+            if user_id not in votes:
+                votes[user_id] = UserVotes()
+                return "available_no_votes"
+            # Check if already available
+            if not votes[user_id].unavailable:
+                return "available_already"
+            # Mark as available (votes are already preserved)
+            votes[user_id].unavailable = False
+            return "available_success"
+        
+        # Acknowledge first: the change is only saved once its group commit is on disk
+        await interaction.response.defer(ephemeral=True)
+        result = await mutate_votes(guild_id, mark_available)
+        if result == "available_already":
+            await interaction.followup.send(
+                t("available_already"),
                 ephemeral=True
             )
             return
         
-        # Check if already available
-        if not votes[user_id].get("unavailable", False):
-            await interaction.response.send_message(
-                t("available_already"),
+        await asyncio.to_thread(update_user_profile, user_id, username=str(interaction.user))
+        if result == "available_no_votes":
+            await interaction.followup.send(
+                t("available_no_votes"),
                 ephemeral=True
             )
             return
         
-        # Mark as available (votes are already preserved)
-        votes[user_id]["unavailable"] = False
-        votes[user_id]["username"] = str(interaction.user)
-        save_votes(votes, guild_id)
-        
         logger.info(f"User marked as available: {interaction.user} (ID: {user_id}) in guild {guild_id}")
         
-        await interaction.response.send_message(
+        await interaction.followup.send(
             t("available_success"),
             ephemeral=True
         )
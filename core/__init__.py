@@ -1,6 +1,9 @@
 """Core utilities for the bot."""
 from .config import *
+from .models import *
+from .game_index import *
 from .data_manager import *
+from .user_profiles import *
 from .helpers import *
 from .permissions import *
 from .logger_config import *
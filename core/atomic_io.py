@@ -0,0 +1,292 @@
+"""Crash-safe file writes.
+
+Files are never rewritten in place: the new content goes to a temporary file
+in the same folder, is flushed to disk (fsync) and then renamed over the old
+file, so a crash or a full disk leaves either the old or the new version, never
+a truncated one.
+
+Frequent writes (the votes files) can use a group commit instead: the content
+is kept in memory (and served to readers) for a short window, then all the
+files written meanwhile are committed together, with one fsync per file and
+per folder however many times they were rewritten. Set the window with
+TATIBOT_COMMIT_WINDOW_MS (0 commits every write immediately). A writer that
+waits for its commit (wait_for_commit) is only acknowledged once its content is
+on disk, so the window delays writes but loses none that were acknowledged.
+
+Appended files (journals, archives, indexes) use append_durably, which syncs
+the appended bytes before returning.
+
+Writes of different files run in parallel: a file is only locked while it is
+written, and folders are synced outside the locks.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from .config import DATA_DIR, USERS_DIR, get_commit_window, get_guild_dir, list_guild_ids
+
+logger = logging.getLogger(__name__)
+
+# Temporary files older than this are leftovers of interrupted writes
+# (a write in progress in another process is never that old)
+STALE_TMP_SECONDS = 60
+
+# Content of the files waiting for the next group commit, by path
+_staged_writes = {}
+_staged_lock = threading.Lock()
+# Notified when a group commit is finished
+_commit_done = threading.Condition(_staged_lock)
+_commit_timer = None
+# Number of the next group commit (a file staged now is written by it) and of the last one finished
+_next_commit = 1
+_finished_commit = 0
+# Error of the last commit of each file that failed to commit (cleared once it is written)
+_commit_errors = {}
+# Held while staged files are written (one group commit at a time)
+_flush_lock = threading.Lock()
+# Held while a file is written (two writes of the same file never interleave)
+_path_locks = {}
+_path_locks_lock = threading.Lock()
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+
+def _path_lock(path: Path) -> threading.Lock:
+    with _path_locks_lock:
+        lock = _path_locks.get(path)
+        if lock is None:
+            lock = _path_locks[path] = threading.Lock()
+        return lock
+
+
+def _fsync_dir(directory: Path):
+    """Flush a folder's entries (the renames) to disk (not supported on Windows)."""
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_file(path: Path, data: bytes) -> Path:
+    """Write a file's new content next to it and swap it in (the folder is not synced).
+    
+    Returns:
+        Folder of the file, to sync once the batch is written
+    """
+    tmp_file = _tmp_path(path)
+    try:
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+    return path.parent
+
+
+def atomic_write(path: Path, data: bytes):
+    """Replace a file's content atomically and durably (temporary file, fsync, rename).
+    
+    Args:
+        path: File to write (its folder must exist)
+        data: New content
+    
+    Raises:
+        OSError: If the write fails (e.g. disk full); the file keeps its old content
+    """
+    path = Path(path)
+    with _path_lock(path):
+        directory = _write_file(path, data)
+    _fsync_dir(directory)
+
+
+def atomic_write_text(path: Path, text: str):
+    """Replace a text file's content atomically and durably (UTF-8), see atomic_write."""
+    atomic_write(path, text.encode('utf-8'))
+
+
+def append_durably(path: Path, data: bytes) -> int:
+    """Append bytes to a file and flush them to disk before returning.
+    
+    A crash can leave a partial last line or record (readers of appended files
+    skip it), never lose an append that returned.
+    
+    Args:
+        path: File to append to (created if missing, its folder must exist)
+        data: Bytes to append
+    
+    Returns:
+        Offset of the appended bytes in the file
+    """
+    path = Path(path)
+    with _path_lock(path):
+        created = not path.exists()
+        with open(path, 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    if created:
+        _fsync_dir(path.parent)
+    return offset
+
+
+def stage_write(path: Path, data: bytes):
+    """Write a file with the next group commit (immediately if the window is 0).
+    
+    Until it is committed, read_staged returns the new content, so readers of
+    this process see it at once. The write is not durable yet when this returns:
+    pass the returned ticket to wait_for_commit before acknowledging it.
+    
+    Returns:
+        Ticket of the group commit writing the file (None if already written)
+    """
+    global _commit_timer
+    window = get_commit_window()
+    if window <= 0:
+        atomic_write(path, data)
+        return None
+    with _staged_lock:
+        _staged_writes[Path(path)] = data
+        if _commit_timer is None:
+            _commit_timer = threading.Timer(window, flush_staged_writes)
+            _commit_timer.daemon = True
+            _commit_timer.start()
+        return _next_commit
+
+
+def wait_for_commit(path: Path, ticket):
+    """Wait until a staged write is on disk (see stage_write).
+    
+    Args:
+        path: The staged file
+        ticket: What stage_write returned
+    
+    Raises:
+        OSError: If the group commit could not write the file (it stays staged
+            and is retried with the next commit)
+    """
+    if ticket is None:
+        return
+    with _commit_done:
+        while _finished_commit < ticket:
+            _commit_done.wait()
+        error = _commit_errors.get(Path(path))
+    if error is not None:
+        raise error
+
+
+def read_staged(path: Path):
+    """Get the content of a file waiting for the group commit, or None if it has none."""
+    with _staged_lock:
+        return _staged_writes.get(Path(path))
+
+
+def has_staged_write(path: Path) -> bool:
+    """Check whether a file has content waiting for the group commit."""
+    with _staged_lock:
+        return Path(path) in _staged_writes
+
+
+def has_staged_writes_in(directory: Path) -> bool:
+    """Check whether a file of a folder (or its subfolders) is waiting for the group commit."""
+    directory = Path(directory)
+    with _staged_lock:
+        return any(directory in path.parents for path in _staged_writes)
+
+
+def flush_staged_writes() -> int:
+    """Commit the staged writes now (called by the commit timer, before bulk file operations and at exit).
+    
+    Files stay staged until they are on disk, and are only unstaged if they
+    weren't written again meanwhile. A file that fails to commit stays staged
+    for the next commit.
+    
+    Returns:
+        Number of files committed
+    """
+    global _commit_timer, _next_commit, _finished_commit
+    with _flush_lock:
+        with _staged_lock:
+            _commit_timer = None
+            batch = dict(_staged_writes)
+            commit = _next_commit
+            _next_commit += 1
+        
+        directories = {}
+        committed = {}
+        failed = {}
+        try:
+            for path, data in batch.items():
+                try:
+                    with _path_lock(path):
+                        directories.setdefault(_write_file(path, data), []).append(path)
+                    committed[path] = data
+                except OSError as e:
+                    logger.error(f"Could not write {path}: {e}")
+                    failed[path] = e
+            for directory, paths in directories.items():
+                try:
+                    _fsync_dir(directory)
+                except OSError as e:
+                    logger.error(f"Could not sync {directory}: {e}")
+                    for path in paths:
+                        failed[path] = e
+                        del committed[path]
+        finally:
+            with _staged_lock:
+                for path, data in committed.items():
+                    _commit_errors.pop(path, None)
+                    if _staged_writes.get(path) is data:
+                        del _staged_writes[path]
+                for path in batch.keys() - committed.keys():
+                    # Not written (an unexpected error fails the whole batch)
+                    _commit_errors[path] = failed.get(path) or OSError(f"Group commit of {path} failed")
+                _finished_commit = commit
+                _commit_done.notify_all()
+                if _staged_writes and _commit_timer is None:
+                    _commit_timer = threading.Timer(get_commit_window(), flush_staged_writes)
+                    _commit_timer.daemon = True
+                    _commit_timer.start()
+    if committed:
+        logger.debug(f"Group commit: {len(committed)} file(s) in {len(directories)} folder(s)")
+    return len(committed)
+
+
+def recover_interrupted_writes() -> int:
+    """Remove the temporary files left by writes interrupted by a crash (run at startup).
+    
+    The files they were meant to replace still hold their previous content.
+    
+    Returns:
+        Number of temporary files removed
+    """
+    directories = [DATA_DIR, USERS_DIR] + [get_guild_dir(guild_id) for guild_id in list_guild_ids()]
+    cutoff = time.time() - STALE_TMP_SECONDS
+    removed = 0
+    for directory in directories:
+        if not directory.is_dir():
+            continue
+        for tmp_file in directory.glob("*.tmp"):
+            try:
+                if tmp_file.stat().st_mtime < cutoff:
+                    tmp_file.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+    if removed:
+        logger.warning(f"Removed {removed} temporary file(s) of interrupted writes")
+    return removed
+
+
+# Staged writes are committed when the process exits normally
+atexit.register(flush_staged_writes)
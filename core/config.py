@@ -1,43 +1,349 @@
 """Configuration constants for the bot."""
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 
-# Data directory structure: data/guilds/{guild_id}/
+try:
+    import fcntl
+except ImportError:  # Not on Windows: the guild index is then only locked within the process
+    fcntl = None
+
+# Data directory structure: data/guilds/{guild_id}/ ("flat" layout, default)
+# or data/guilds/ab/cd/{guild_id}/ ("sharded" layout, set TATIBOT_GUILD_LAYOUT=sharded)
+# (directories are created on first write, see ensure_guild_dir / ensure_data_dir)
 DATA_DIR = Path("data")
 GUILDS_DIR = DATA_DIR / "guilds"
+GUILD_LAYOUTS = ("flat", "sharded")
+
+# Format the votes files and the vote archive records are written in (set
+# TATIBOT_DATA_FORMAT): compact JSON ("json", default), the same JSON encoded by
+# orjson ("orjson") or MessagePack ("msgpack"). Files are read whatever format
+# they were written in, so the setting can change at any time.
+DATA_FORMATS = ("json", "orjson", "msgpack")
+
+# Votes files written within this window are flushed to disk together (group
+# commit, see core.atomic_io), set in milliseconds with TATIBOT_COMMIT_WINDOW_MS
+DEFAULT_COMMIT_WINDOW_MS = 50
+
+# User profiles shared by all guilds: data/users/{xx}.json, 256 files keyed by
+# the first byte of the MD5 of the user ID
+USERS_DIR = DATA_DIR / "users"
+
+# One guild ID per line, appended when a guild directory is created
+# (lets maintenance jobs list guilds without walking the directory tree)
+GUILD_INDEX_FILE = GUILDS_DIR / "index.txt"
+
+# Guild directories known to exist (a missing one is checked again on every call,
+# since another process, e.g. a cli.py restore, may create it)
+_guild_dir_exists = set()
+
+# Guild IDs from the index file, loaded on first use
+_guild_index = None
+_guild_index_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_guild_layout() -> str:
+    """Get the configured guild directory layout ("flat" or "sharded")."""
+    layout = os.getenv("TATIBOT_GUILD_LAYOUT", "flat").strip().lower()
+    return layout if layout in GUILD_LAYOUTS else "flat"
+
+
+@lru_cache(maxsize=None)
+def get_data_format() -> str:
+    """Get the configured format of the votes files ("json", "orjson" or "msgpack")."""
+    data_format = os.getenv("TATIBOT_DATA_FORMAT", "json").strip().lower()
+    return data_format if data_format in DATA_FORMATS else "json"
+
+
+@lru_cache(maxsize=None)
+def get_commit_window() -> float:
+    """Get the group commit window in seconds (0 writes every file immediately)."""
+    try:
+        return max(int(os.getenv("TATIBOT_COMMIT_WINDOW_MS", DEFAULT_COMMIT_WINDOW_MS)), 0) / 1000
+    except ValueError:
+        return DEFAULT_COMMIT_WINDOW_MS / 1000
+
 
-# Ensure directories exist
-DATA_DIR.mkdir(exist_ok=True)
-GUILDS_DIR.mkdir(exist_ok=True)
+def get_guild_path(guild_id: int, layout: str) -> Path:
+    """Get where a guild's directory lives in a given layout.
+    
+    The sharded layout spreads guilds over 65536 folders using the first
+    two bytes of the MD5 of the guild ID.
+    """
+    if layout == "sharded":
+        digest = hashlib.md5(str(guild_id).encode('utf-8')).hexdigest()
+        return GUILDS_DIR / digest[:2] / digest[2:4] / str(guild_id)
+    return GUILDS_DIR / str(guild_id)
 
 
+@lru_cache(maxsize=None)
 def get_guild_dir(guild_id: int) -> Path:
-    """Get the directory for a specific guild."""
-    guild_dir = GUILDS_DIR / str(guild_id)
-    guild_dir.mkdir(exist_ok=True)
+    """Get the directory for a specific guild (not created - see ensure_guild_dir).
+    
+    Uses the configured layout, or the other layout's directory if the guild
+    has not been moved yet (see move_guild_dir).
+    """
+    guild_dir = get_guild_path(guild_id, get_guild_layout())
+    if not guild_dir.is_dir():
+        for layout in GUILD_LAYOUTS:
+            other_dir = get_guild_path(guild_id, layout)
+            if other_dir != guild_dir and other_dir.is_dir():
+                return other_dir
     return guild_dir
 
 
+def guild_dir_exists(guild_id: int) -> bool:
+    """Check if a guild has a data directory (only a directory found is cached).
+    
+    Lets read paths skip the file checks of guilds that never saved anything.
+    """
+    if guild_id in _guild_dir_exists:
+        return True
+    if not get_guild_dir(guild_id).is_dir():
+        return False
+    _guild_dir_exists.add(guild_id)
+    return True
+
+
+def forget_guild_paths(guild_id: int):
+    """Resolve a guild's directory and file paths again on next use (after its folder moved or was replaced)."""
+    _guild_dir_exists.discard(guild_id)
+    for cached in (get_guild_dir, get_games_file, get_votes_file, get_period_file, get_config_file, get_schedules_file,
+                   get_meta_file, get_vote_archive_file, get_vote_archive_index_file, get_import_journal_file):
+        cached.cache_clear()
+
+
+def ensure_guild_dir(guild_id: int) -> Path:
+    """Get the directory for a specific guild, creating it if needed (call before writing).
+    
+    The directory is checked on every call: if another process moved it to the
+    other layout (cli.py migrate --layout), the guild's paths are resolved again
+    instead of creating a second directory at the old place.
+    """
+    guild_dir = get_guild_dir(guild_id)
+    if guild_dir.is_dir():
+        _guild_dir_exists.add(guild_id)
+        return guild_dir
+    forget_guild_paths(guild_id)
+    guild_dir = get_guild_dir(guild_id)
+    if not guild_dir.is_dir():
+        guild_dir.mkdir(parents=True, exist_ok=True)
+        if guild_id not in _load_guild_index():
+            _append_guild_index(guild_id)
+    _guild_dir_exists.add(guild_id)
+    return guild_dir
+
+
+@contextmanager
+def _locked_guild_index():
+    """Hold the guild index lock, also across processes (e.g. cli.py workers) where fcntl is available.
+    
+    Appends and rebuilds happen under it: a rebuild walking the tree while
+    another worker creates a guild folder would otherwise replace the index
+    without that worker's append.
+    """
+    with _guild_index_lock:
+        if fcntl is None:
+            yield
+            return
+        GUILDS_DIR.mkdir(parents=True, exist_ok=True)
+        with open(GUILD_INDEX_FILE.with_name(GUILD_INDEX_FILE.name + ".lock"), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_guild_index():
+    """Read the guild IDs of the index file, or None if it doesn't exist."""
+    try:
+        with open(GUILD_INDEX_FILE, 'r', encoding='utf-8') as f:
+            # The last line is empty, or cut by a crash in the middle of an append
+            lines = f.read().split("\n")[:-1]
+    except FileNotFoundError:
+        return None
+    return {int(line) for line in lines if line.strip().isdigit()}
+
+
+def _load_guild_index() -> set:
+    """Load the guild index (rebuilt from the directory tree if the file is missing)."""
+    global _guild_index
+    if _guild_index is None:
+        guild_ids = _read_guild_index()
+        if guild_ids is None:
+            with _locked_guild_index():
+                # Another process may have rebuilt it meanwhile
+                guild_ids = _read_guild_index()
+                if guild_ids is None:
+                    guild_ids = _rebuild_guild_index()
+        _guild_index = guild_ids
+    return _guild_index
+
+
+def _append_guild_index(guild_id: int):
+    """Add a new guild to the index file and the loaded index."""
+    from .atomic_io import append_durably  # atomic_io imports this module
+    with _locked_guild_index():
+        line = f"{guild_id}\n".encode('utf-8')
+        try:
+            with open(GUILD_INDEX_FILE, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                if size:
+                    f.seek(size - 1)
+                    if f.read(1) != b"\n":
+                        # Last line cut by a crash: start a new one rather than extending it
+                        line = b"\n" + line
+        except FileNotFoundError:
+            pass
+        append_durably(GUILD_INDEX_FILE, line)
+        _guild_index.add(guild_id)
+
+
+def rebuild_guild_index() -> list:
+    """Rebuild the guild index by walking data/guilds/ (both layouts).
+    
+    Returns:
+        Sorted list of guild IDs found
+    """
+    global _guild_index
+    with _locked_guild_index():
+        _guild_index = _rebuild_guild_index()
+    return sorted(_guild_index)
+
+
+def _rebuild_guild_index() -> set:
+    """Walk data/guilds/ and write the guild index (the index lock must be held)."""
+    guild_ids = set()
+    if GUILDS_DIR.is_dir():
+        for entry in GUILDS_DIR.iterdir():
+            if not entry.is_dir():
+                continue
+            if entry.name.isdigit() and len(entry.name) > 2:
+                guild_ids.add(int(entry.name))
+            elif len(entry.name) == 2:
+                # Shard folder: ab/cd/{guild_id}
+                for sub_shard in entry.iterdir():
+                    if sub_shard.is_dir():
+                        guild_ids.update(int(d.name) for d in sub_shard.iterdir() if d.is_dir() and d.name.isdigit())
+        from .atomic_io import atomic_write_text  # atomic_io imports this module
+        atomic_write_text(GUILD_INDEX_FILE, "".join(f"{guild_id}\n" for guild_id in sorted(guild_ids)))
+    return guild_ids
+
+
+def list_guild_ids() -> list:
+    """Get the IDs of all guilds with a data directory, from the guild index."""
+    return sorted(_load_guild_index())
+
+
+def move_guild_dir(guild_id: int, layout: str) -> bool:
+    """Move a guild's directory to its place in another layout.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        layout: Target layout ("flat" or "sharded")
+        
+    Returns:
+        True if the directory was moved, False if already there or missing
+    """
+    source = get_guild_dir(guild_id)
+    target = get_guild_path(guild_id, layout)
+    if source == target or not source.is_dir():
+        return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    source.rename(target)
+    
+    # Remove shard folders left empty
+    for parent in (source.parent, source.parent.parent):
+        if parent == GUILDS_DIR:
+            break
+        try:
+            parent.rmdir()
+        except OSError:
+            break
+    
+    # Paths of this guild were memoized: resolve them again
+    forget_guild_paths(guild_id)
+    return True
+
+
+@lru_cache(maxsize=None)
+def ensure_data_dir() -> Path:
+    """Get the data directory, creating it if needed (call before writing shared files)."""
+    DATA_DIR.mkdir(exist_ok=True)
+    return DATA_DIR
+
+
 def get_shared_games_file() -> Path:
     """Get the shared games file path (centralized for all servers)."""
     return DATA_DIR / "shared_games.json"
 
 
+def get_shared_games_journal_file() -> Path:
+    """Get the shared games journal path (per-game patches not yet folded into shared_games.json)."""
+    return DATA_DIR / "shared_games.journal.jsonl"
+
+
+def get_user_profiles_file(user_id: str) -> Path:
+    """Get the file holding a user's profile (shared with the other users of its shard)."""
+    digest = hashlib.md5(str(user_id).encode('utf-8')).hexdigest()
+    return USERS_DIR / f"{digest[:2]}.json"
+
+
+@lru_cache(maxsize=None)
 def get_games_file(guild_id: int) -> Path:
-    """Get the games file path for a specific guild (legacy - for backward compatibility)."""
+    """Get the enabled game list file path for a specific guild."""
     return get_guild_dir(guild_id) / "games.json"
 
 
-def get_votes_file(guild_id: int) -> Path:
-    """Get the votes file path for a specific guild."""
-    return get_guild_dir(guild_id) / "votes.json"
+@lru_cache(maxsize=None)
+def get_votes_file(guild_id: int, period: str) -> Path:
+    """Get the votes file path of a voting period for a specific guild."""
+    return get_guild_dir(guild_id) / f"votes.{period}.json"
+
 
+@lru_cache(maxsize=None)
+def get_period_file(guild_id: int) -> Path:
+    """Get the file holding the current voting period ID for a specific guild."""
+    return get_guild_dir(guild_id) / "period.json"
 
+
+@lru_cache(maxsize=None)
 def get_config_file(guild_id: int) -> Path:
     """Get the server config file path for a specific guild."""
     return get_guild_dir(guild_id) / "config.json"
 
 
+@lru_cache(maxsize=None)
 def get_schedules_file(guild_id: int) -> Path:
     """Get the scheduled game nights file path for a specific guild."""
     return get_guild_dir(guild_id) / "schedules.json"
 
+
+@lru_cache(maxsize=None)
+def get_meta_file(guild_id: int) -> Path:
+    """Get the metadata file path (schema version) for a specific guild."""
+    return get_guild_dir(guild_id) / "meta.json"
+
+
+@lru_cache(maxsize=None)
+def get_vote_archive_file(guild_id: int) -> Path:
+    """Get the vote archive path for a specific guild (one gzip member per past voting period)."""
+    return get_guild_dir(guild_id) / "votes.archive.jsonl.gz"
+
+
+@lru_cache(maxsize=None)
+def get_vote_archive_index_file(guild_id: int) -> Path:
+    """Get the vote archive index path (offset and length of each period) for a specific guild."""
+    return get_guild_dir(guild_id) / "votes.archive.index.json"
+
+
+@lru_cache(maxsize=None)
+def get_import_journal_file(guild_id: int) -> Path:
+    """Get the path of the pending import transaction (files staged by an import) for a specific guild."""
+    return get_guild_dir(guild_id) / "import.txn.json"
+
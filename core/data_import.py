@@ -0,0 +1,662 @@
+"""Validated, transactional import of server exports (/importdata).
+
+Exports are parsed one top-level section at a time (incrementally with ijson,
+the votes and users sections one user at a time), every record is checked
+against compiled schemas, and
+the changes are computed before anything is written so they can be shown as a
+dry run. Applying an import stages every server file next to its target and
+writes a transaction file listing them with the catalog and user profile
+changes, which are then applied and the files swapped in, so a crash never
+leaves a server half-restored: the next startup finishes the transaction.
+"""
+import gzip
+import json
+import logging
+import os
+from .config import get_games_file, get_votes_file, get_period_file, get_config_file, get_schedules_file
+from .config import get_guild_dir, get_import_journal_file, ensure_guild_dir, guild_dir_exists, list_guild_ids
+from .data_manager import get_shared_game, upsert_shared_games, load_server_game_list, load_votes, load_server_config, load_schedules
+from .data_manager import get_current_period, new_period_id, invalidate_guild_cache, get_game_key_by_id, get_next_game_id
+from .data_manager import dumps_data
+from .models import UserVotes, encode_ratings, decode_ratings, iter_ratings
+from .game_index import freeze_game
+from .atomic_io import atomic_write, flush_staged_writes
+from .user_profiles import LANGUAGES, get_user_profile, update_user_profiles, is_valid_timezone
+
+try:
+    import ijson
+except ImportError:  # Listed in requirements.txt; without it each export is parsed in one go
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Sections holding game definitions ("games" in exports made before the shared catalog)
+GAMES_SECTIONS = ("shared_games", "games")
+
+# Invalid records listed in the import report (the others are only counted)
+MAX_REPORTED_ERRORS = 10
+
+# Per-user sections, read one member at a time instead of as a whole object
+STREAMED_SECTIONS = ("votes", "users")
+
+
+class InvalidExportError(ValueError):
+    """The file is not a TatiBot export (not JSON, or not a JSON object)."""
+
+
+_MISSING = object()
+
+
+def _compile_record(fields: dict, required: tuple = (), check=None):
+    """Compile a record schema into a validation function.
+    
+    Args:
+        fields: Field name -> tuple of accepted types, or a validation function
+            (from the _compile_* helpers) for nested values
+        required: Names of the fields that must be present
+        check: Optional function run on the whole record once its fields are valid
+    
+    Returns:
+        Function taking a value and returning an error message, or None if it is valid
+    """
+    checks = tuple(
+        (name, types if isinstance(types, tuple) else None, None if isinstance(types, tuple) else types, name in required)
+        for name, types in fields.items()
+    )
+    
+    def validate(record):
+        if not isinstance(record, dict):
+            return "not an object"
+        for name, types, validator, is_required in checks:
+            value = record.get(name, _MISSING)
+            if value is _MISSING:
+                if is_required:
+                    return f"missing {name}"
+            elif validator is not None:
+                error = validator(value)
+                if error:
+                    return f"invalid {name} ({error})"
+            # bool is an int subclass: only accept it where it is listed
+            elif not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+                return f"invalid {name}"
+        return check(record) if check else None
+    return validate
+
+
+def _compile_list(item_types: tuple):
+    """Compile a validation function for a list of values of the given types (tuples from frozen records accepted)."""
+    def validate(value):
+        if not isinstance(value, (list, tuple)):
+            return "not a list"
+        if not all(isinstance(item, item_types) and not isinstance(item, bool) for item in value):
+            return "invalid item"
+        return None
+    return validate
+
+
+def _compile_ratings(low: int, high: int):
+    """Compile a validation function for a game key -> rating mapping."""
+    def validate(value):
+        if not isinstance(value, dict):
+            return "not an object"
+        for rating in value.values():
+            if not isinstance(rating, int) or isinstance(rating, bool) or not low <= rating <= high:
+                return f"rating out of {low}-{high}"
+        return None
+    return validate
+
+
+def _compile_ratings_string(low: int, high: int):
+    """Compile a validation function for a ratings string (runs of one digit per game ID, see models.iter_ratings)."""
+    digits = {str(rating) for rating in range(low, high + 1)}
+    def validate(value):
+        if not isinstance(value, str):
+            return "not a string"
+        try:
+            if any(digit not in digits for _, digit in iter_ratings(value)):
+                return f"rating out of {low}-{high}"
+        except ValueError as e:
+            return str(e)
+        return None
+    return validate
+
+
+def _check_player_range(game: dict):
+    if not 1 <= game["min_players"] <= game["max_players"]:
+        return "invalid player range"
+    return None
+
+
+validate_game = _compile_record(
+    {
+        "name": (str,),
+        "min_players": (int,),
+        "max_players": (int,),
+        "id": (int,),
+        "emoji": (str,),
+        "store_links": (str,),
+        "tags": _compile_list((str,)),
+        "remote_play_together": (bool,),
+    },
+    required=("name", "min_players", "max_players"),
+    check=_check_player_range,
+)
+
+validate_game_keys = _compile_list((str,))
+
+# "votes" (game key -> rating) is the format of exports made before ratings were indexed by game ID,
+# username and language that of exports made before the user profiles
+validate_user_votes = _compile_record({
+    "username": (str,),
+    "ratings": _compile_ratings_string(0, 5),
+    "votes": _compile_ratings(0, 5),
+    "unavailable": (bool,),
+    "language": (str,),
+})
+
+validate_user_profile = _compile_record({
+    "username": (str,),
+    "language": (str,),
+    "timezone": (str,),
+})
+
+validate_config = _compile_record({
+    "reminder_day": (str,),
+    "reminder_hour": (int,),
+    "reminder_minute": (int,),
+    "game_night_day": (str, type(None)),
+    "game_night_hour": (int, type(None)),
+    "game_night_minute": (int, type(None)),
+    "game_management_roles": _compile_list((int,)),
+})
+
+validate_schedule = _compile_record(
+    {
+        "id": (int,),
+        "datetime": (str,),
+        "description": (str, type(None)),
+        "created_at": (str,),
+    },
+    required=("id", "datetime"),
+)
+
+
+def open_export(fp):
+    """Wrap an export file so it reads as plain JSON (gzipped exports are detected by their header).
+    
+    Args:
+        fp: Binary file object positioned at the start of the export
+    """
+    magic = fp.read(2)
+    fp.seek(0)
+    return gzip.GzipFile(fileobj=fp, mode='rb') if magic == GZIP_MAGIC else fp
+
+
+_PARSE_ERRORS = (UnicodeDecodeError, OSError, EOFError) + ((ijson.JSONError,) if ijson is not None else ())
+
+
+def _next_event(events) -> tuple:
+    try:
+        return next(events)
+    except StopIteration:
+        raise InvalidExportError("unexpected end of file") from None
+
+
+def _build_value(event: str, value, events):
+    """Build the JSON value starting with a parser event, reading the rest of it from events."""
+    builder = ijson.ObjectBuilder()
+    depth = 0
+    while True:
+        builder.event(event, value)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+        if depth == 0:
+            return builder.value
+        _, event, value = _next_event(events)
+
+
+class _StreamedObject:
+    """Object section of an export whose members are built one at a time as items() is
+    iterated (like ijson.kvitems, but on the events of the single pass over the file).
+    """
+    
+    __slots__ = ("_events", "_done")
+    
+    def __init__(self, events):
+        self._events = events
+        self._done = False
+    
+    def items(self):
+        """Yield the (key, value) members not read yet.
+        
+        Raises:
+            InvalidExportError: If the file is not valid JSON
+        """
+        try:
+            while not self._done:
+                _, event, key = _next_event(self._events)
+                if event == "end_map":
+                    self._done = True
+                    return
+                _, event, value = _next_event(self._events)
+                yield key, _build_value(event, value, self._events)
+        except _PARSE_ERRORS as e:
+            raise InvalidExportError(str(e)) from e
+    
+    def skip(self):
+        """Read past the members nobody asked for."""
+        for _ in self.items():
+            pass
+
+
+def iter_export_sections(fp):
+    """Yield the (section name, value) pairs of an export, one top-level section at a time.
+    
+    With ijson, the object of a STREAMED_SECTIONS section is yielded as a
+    _StreamedObject: its members are parsed as they are read from items(), so
+    the section is never held whole in memory.
+    
+    Args:
+        fp: Binary file object of plain JSON (see open_export)
+    
+    Raises:
+        InvalidExportError: If the file is not valid JSON or not a JSON object
+    """
+    if ijson is None:
+        try:
+            data = json.load(fp)
+        except (json.JSONDecodeError, UnicodeDecodeError, OSError, EOFError) as e:
+            raise InvalidExportError(str(e)) from e
+        if not isinstance(data, dict):
+            raise InvalidExportError("not a JSON object")
+        yield from data.items()
+        return
+    
+    try:
+        events = ijson.parse(fp, use_float=True)
+        for prefix, event, value in events:
+            if prefix != "" or event not in ("start_map", "map_key", "end_map"):
+                raise InvalidExportError("not a JSON object")
+            if event != "map_key":
+                continue
+            section = value
+            _, event, value = _next_event(events)
+            if section in STREAMED_SECTIONS and event == "start_map":
+                members = _StreamedObject(events)
+                yield section, members
+                members.skip()
+            else:
+                yield section, _build_value(event, value, events)
+    except _PARSE_ERRORS as e:
+        raise InvalidExportError(str(e)) from e
+
+
+def _valid_items(items, validate, section: str, errors: list):
+    """Keep the (key, record) pairs passing validation, reporting the others in errors."""
+    for key, record in items:
+        error = validate(record)
+        if error:
+            errors.append(f"{section} {key}: {error}")
+        else:
+            yield key, record
+
+
+def _read_games_section(section: str, value, errors: list) -> dict:
+    """Get the valid games of a games section, reporting the others in errors."""
+    if not isinstance(value, dict):
+        errors.append(f"{section}: not an object")
+        return {}
+    return dict(_valid_items(value.items(), validate_game, "game", errors))
+
+
+def read_export_games(fp) -> tuple:
+    """Read the valid games of an export, without parsing the sections after them.
+    
+    Args:
+        fp: Binary file object of the export (plain or gzipped JSON)
+    
+    Returns:
+        Tuple of (games dictionary, errors list)
+    
+    Raises:
+        InvalidExportError: If the file is not a valid export
+    """
+    errors = []
+    for section, value in iter_export_sections(open_export(fp)):
+        if section in GAMES_SECTIONS:
+            return _read_games_section(section, value, errors), errors
+    return {}, errors
+
+
+def get_catalog_changes(games: dict, overwrite: bool = False) -> tuple:
+    """Compare imported games with the shared catalog.
+    
+    Game IDs are what votes refer to, so they never change: updated games keep
+    their ID in the catalog, and added games whose ID is missing or already
+    used by another game get a new one.
+    
+    Args:
+        games: Imported games (game key -> definition)
+        overwrite: If True, games that already exist are updated. If False, only new games count.
+    
+    Returns:
+        Tuple of (games to upsert, diff with added/updated counts)
+    """
+    changes = {}
+    diff = {"added": 0, "updated": 0}
+    next_id = get_next_game_id()
+    for game_key, game in games.items():
+        existing = get_shared_game(game_key)
+        if existing is None:
+            game_id = game.get("id")
+            if game_id is None or get_game_key_by_id(game_id) is not None or any(g.get("id") == game_id for g in changes.values()):
+                game = {**game, "id": next_id}
+                next_id += 1
+            diff["added"] += 1
+        else:
+            if existing.get("id") is not None:
+                game = {**game, "id": existing["id"]}
+            if not overwrite or existing == freeze_game(game):
+                continue
+            diff["updated"] += 1
+        changes[game_key] = game
+    return changes, diff
+
+
+def get_game_id_map(games: dict, catalog_changes: dict = None) -> dict:
+    """Map the game IDs of an export to the IDs of the same games (by key) in the shared catalog.
+    
+    Args:
+        games: Games of the export (game key -> definition)
+        catalog_changes: Games about to be upserted (from get_catalog_changes), looked up first
+    
+    Returns:
+        Dictionary of export game ID -> catalog game ID (games unknown to the catalog are left out)
+    """
+    id_map = {}
+    for game_key, game in games.items():
+        local_game = (catalog_changes or {}).get(game_key) or get_shared_game(game_key)
+        if game.get("id") is not None and local_game is not None and local_game.get("id") is not None:
+            id_map[game["id"]] = local_game["id"]
+    return id_map
+
+
+def _add_profile_fields(profiles: dict, user_id: str, record: dict):
+    """Collect the profile fields of an imported record that the user's profile doesn't have yet.
+    
+    Profiles are shared by all servers: an import only fills them in, it never
+    replaces what users chose.
+    """
+    profile = {**get_user_profile(user_id), **profiles.get(user_id, {})}
+    fields = {}
+    if record.get("username") and "username" not in profile:
+        fields["username"] = record["username"]
+    if record.get("language") in LANGUAGES and "language" not in profile:
+        fields["language"] = record["language"]
+    if record.get("timezone") and "timezone" not in profile and is_valid_timezone(record["timezone"]):
+        fields["timezone"] = record["timezone"]
+    if fields:
+        profiles.setdefault(user_id, {}).update(fields)
+
+
+def _import_user_votes(user_data: dict, id_map, key_to_id) -> dict:
+    """Convert an imported user record to the ratings of the shared catalog's game IDs.
+    
+    Args:
+        user_data: Valid user record of the export
+        id_map: Export game ID -> catalog game ID (None if the export has no games:
+            its IDs are taken as they are)
+        key_to_id: Function giving the catalog ID of a game key (for "votes" of older exports)
+    """
+    ratings = {}
+    for game_key, rating in user_data.get("votes", {}).items():
+        game_id = key_to_id(game_key)
+        if game_id is not None and rating:
+            ratings[game_id] = rating
+    for game_id, rating in decode_ratings(user_data.get("ratings", "")).items():
+        game_id = game_id if id_map is None else id_map.get(game_id)
+        if game_id is not None:
+            ratings[game_id] = rating
+    return UserVotes(encode_ratings(ratings), user_data.get("unavailable", False)).to_dict()
+
+
+def prepare_guild_import(guild_id: int, fp, overwrite: bool = False, include_games: bool = True) -> dict:
+    """Parse and validate an export, and compute the changes it makes (nothing is written).
+    
+    Imported games are added to the shared catalog (overwrite also updates the
+    games that already exist), games of other servers are never removed. User
+    profiles only get the fields they don't have yet.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        fp: Binary file object of the export (plain or gzipped JSON)
+        overwrite: If True, replace the server's data. If False, merge (existing data wins).
+        include_games: If False, the games of the export are ignored (bulk restores
+            merge the games of all exports into the catalog once, see read_export_games)
+    
+    Returns:
+        Import plan: games (catalog changes), profiles (user profile fields to add), files (path -> new content),
+        data_files (the files of files written in TATIBOT_DATA_FORMAT, see data_manager.dumps_data),
+        diff (change counts per section) and errors (skipped records)
+    
+    Raises:
+        InvalidExportError: If the file is not a valid export
+    """
+    plan = {"guild_id": guild_id, "overwrite": overwrite, "games": {}, "profiles": {}, "files": {}, "data_files": set(), "diff": {}, "errors": []}
+    errors = plan["errors"]
+    # Ratings are stored by game ID: the IDs of the export are mapped to the catalog's through the game keys
+    id_map = None
+    
+    def key_to_id(game_key):
+        game = plan["games"].get(game_key) or get_shared_game(game_key)
+        return game.get("id") if game is not None else None
+    
+    for section, value in iter_export_sections(open_export(fp)):
+        if section in GAMES_SECTIONS:
+            games = _read_games_section(section, value, errors if include_games else [])
+            if include_games:
+                plan["games"], plan["diff"]["games"] = get_catalog_changes(games, overwrite)
+            id_map = get_game_id_map(games, plan["games"])
+        
+        elif section == "server_game_list":
+            if validate_game_keys(value):
+                errors.append(f"{section}: not a list of game keys")
+                continue
+            existing = load_server_game_list(guild_id)
+            imported = list(dict.fromkeys(value))
+            game_keys = imported if overwrite else existing + [k for k in imported if k not in set(existing)]
+            plan["files"][get_games_file(guild_id)] = game_keys
+            plan["diff"]["server_game_list"] = {
+                "added": len(set(game_keys) - set(existing)),
+                "removed": len(set(existing) - set(game_keys)),
+            }
+        
+        elif section == "votes":
+            if not isinstance(value, (dict, _StreamedObject)):
+                errors.append(f"{section}: not an object")
+                continue
+            imported = {}
+            for user_id, user_data in _valid_items(value.items(), validate_user_votes, "votes of user", errors):
+                _add_profile_fields(plan["profiles"], user_id, user_data)
+                imported[user_id] = _import_user_votes(user_data, id_map, key_to_id)
+            existing = {user_id: user_votes.to_dict() for user_id, user_votes in load_votes(guild_id).items()}
+            votes = imported if overwrite else {**imported, **existing}
+            plan["diff"]["votes"] = {
+                "added": len(votes.keys() - existing.keys()),
+                "updated": sum(1 for user_id in votes.keys() & existing.keys() if votes[user_id] != existing[user_id]),
+                "removed": len(existing.keys() - votes.keys()),
+            }
+            period = get_current_period(guild_id)
+            if period is None:
+                period = new_period_id(guild_id)
+                plan["files"][get_period_file(guild_id)] = {"current": period}
+            plan["files"][get_votes_file(guild_id, period)] = votes
+            plan["data_files"].add(get_votes_file(guild_id, period))
+        
+        elif section == "users":
+            if not isinstance(value, (dict, _StreamedObject)):
+                errors.append(f"{section}: not an object")
+                continue
+            for user_id, profile in _valid_items(value.items(), validate_user_profile, "profile of user", errors):
+                _add_profile_fields(plan["profiles"], user_id, profile)
+        
+        elif section == "config":
+            error = validate_config(value)
+            if error:
+                errors.append(f"{section}: {error}")
+                continue
+            existing = load_server_config(guild_id).to_dict()
+            config = value if overwrite else {**value, **existing}
+            plan["files"][get_config_file(guild_id)] = config
+            plan["diff"]["config"] = {
+                "updated": sum(1 for key in config.keys() | existing.keys() if config.get(key, _MISSING) != existing.get(key, _MISSING)),
+            }
+        
+        elif section == "schedules":
+            if not isinstance(value, list):
+                errors.append(f"{section}: not a list")
+                continue
+            imported = [schedule for _, schedule in _valid_items(enumerate(value), validate_schedule, "schedule", errors)]
+            existing = [schedule.to_dict() for schedule in load_schedules(guild_id)]
+            existing_ids = {s.get("id") for s in existing}
+            if overwrite:
+                schedules = imported
+            else:
+                # Combine lists, skipping schedules that already exist (same ID)
+                schedules = existing + [s for s in imported if s.get("id") not in existing_ids]
+            schedules.sort(key=lambda x: x.get("datetime", ""))
+            imported_ids = {s["id"] for s in schedules}
+            plan["files"][get_schedules_file(guild_id)] = schedules
+            plan["diff"]["schedules"] = {
+                "added": len(imported_ids - existing_ids),
+                "removed": len(existing_ids - imported_ids),
+            }
+    
+    return plan
+
+
+def _write_json_file(path, data):
+    """Write a JSON file atomically and durably (see core.atomic_io.atomic_write)."""
+    atomic_write(path, json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8'))
+
+
+def _finish_import(journal_file) -> int:
+    """Apply a committed import: its catalog and profile changes, then swap its staged files in.
+    
+    Runs again from the start after a crash (recover_guild_import): upserting the
+    same games and profile fields twice changes nothing.
+    
+    Returns:
+        Number of files swapped in
+    """
+    with open(journal_file, 'r', encoding='utf-8') as f:
+        transaction = json.load(f)
+    if transaction.get("games"):
+        upsert_shared_games(transaction["games"])
+    if transaction.get("profiles"):
+        update_user_profiles(transaction["profiles"])
+    swapped = 0
+    for staged_path, target_path in transaction["files"]:
+        if os.path.exists(staged_path):
+            os.replace(staged_path, target_path)
+            swapped += 1
+    journal_file.unlink()
+    return swapped
+
+
+def commit_guild_import(plan: dict):
+    """Apply an import plan from prepare_guild_import.
+    
+    Every server file is staged, then the transaction file is written with the
+    catalog changes and user profile fields: past that point the import
+    completes even if the process dies (see recover_guild_import), before it
+    nothing of the import is applied.
+    
+    Args:
+        plan: Import plan from prepare_guild_import
+    """
+    guild_id = plan["guild_id"]
+    # Votes saved just before must not be committed over the imported ones
+    flush_staged_writes()
+    if not plan["files"] and not plan["games"] and not plan["profiles"]:
+        return
+    
+    ensure_guild_dir(guild_id)
+    staged = []
+    for path, data in plan["files"].items():
+        staged_path = path.with_name(path.name + ".import")
+        if path in plan["data_files"]:
+            atomic_write(staged_path, dumps_data(data))
+        else:
+            _write_json_file(staged_path, data)
+        staged.append((str(staged_path), str(path)))
+    
+    # Writing the transaction file (atomically) is the commit point
+    journal_file = get_import_journal_file(guild_id)
+    pending_file = journal_file.with_name(journal_file.name + ".tmp")
+    _write_json_file(pending_file, {"files": staged, "games": plan["games"], "profiles": plan["profiles"]})
+    os.replace(pending_file, journal_file)
+    
+    _finish_import(journal_file)
+    invalidate_guild_cache(guild_id)
+
+
+def recover_guild_import(guild_id: int) -> bool:
+    """Finish an import interrupted after its commit point, or drop the files of one interrupted before.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+    
+    Returns:
+        True if an interrupted import was found
+    """
+    if not guild_dir_exists(guild_id):
+        return False
+    journal_file = get_import_journal_file(guild_id)
+    if journal_file.exists():
+        swapped = _finish_import(journal_file)
+        invalidate_guild_cache(guild_id)
+        logger.warning(f"Completed an interrupted import for guild {guild_id} ({swapped} file(s) swapped in)")
+        return True
+    leftovers = list(get_guild_dir(guild_id).glob("*.import")) + list(get_guild_dir(guild_id).glob("import.txn.json.tmp"))
+    for staged_path in leftovers:
+        staged_path.unlink()
+    if leftovers:
+        logger.warning(f"Discarded an import interrupted before its commit for guild {guild_id}")
+    return bool(leftovers)
+
+
+def recover_imports() -> int:
+    """Recover interrupted imports of every server (run at startup).
+    
+    Returns:
+        Number of servers with an interrupted import
+    """
+    return sum(1 for guild_id in list_guild_ids() if recover_guild_import(guild_id))
+
+
+def import_guild_data(guild_id: int, fp, overwrite: bool = False, dry_run: bool = False, include_games: bool = True) -> dict:
+    """Import guild data from an export file.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        fp: Binary file object of the export (plain or gzipped JSON)
+        overwrite: If True, completely replace existing data. If False, merge data.
+        dry_run: If True, only compute the changes
+        include_games: If False, the games of the export are not added to the shared catalog
+    
+    Returns:
+        Dictionary with diff (change counts per section) and errors (skipped records)
+    
+    Raises:
+        InvalidExportError: If the file is not a valid export
+    """
+    recover_guild_import(guild_id)
+    plan = prepare_guild_import(guild_id, fp, overwrite=overwrite, include_games=include_games)
+    if not dry_run:
+        commit_guild_import(plan)
+    return {"diff": plan["diff"], "errors": plan["errors"]}
@@ -1,13 +1,651 @@
 """Data management functions for games and votes."""
+import gzip
+import hashlib
 import json
-from datetime import datetime
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
-from .config import get_games_file, get_shared_games_file, get_votes_file, get_guild_dir, get_config_file, get_schedules_file
-from .config import GUILDS_DIR
+from .config import get_games_file, get_shared_games_file, get_shared_games_journal_file, get_votes_file, get_guild_dir, get_config_file, get_schedules_file
+from .config import guild_dir_exists, ensure_guild_dir, forget_guild_paths, move_guild_dir, ensure_data_dir, get_vote_archive_file, get_vote_archive_index_file, get_period_file
+from .config import get_data_format
+from .atomic_io import atomic_write, append_durably, stage_write, wait_for_commit, read_staged, has_staged_write, has_staged_writes_in, flush_staged_writes
+from .game_index import GameOrderIndex, GameLookupIndex, GameSearchIndex, GameTagIndex, GuildGames, freeze_game
+from .models import UserVotes, ServerConfig, Schedule
+from .user_profiles import get_user_profile
 
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON encoding and decoding
+    orjson = None
 
-def get_next_game_id(games):
-    """Get the next available game ID."""
+try:
+    import msgpack
+except ImportError:  # Optional: binary votes files (TATIBOT_DATA_FORMAT=msgpack)
+    msgpack = None
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows: the catalog is then only locked within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Shared catalog loaded once per process (reloaded if the files change on disk) as
+# read-only records, with its ID/name lookup, search and tag indexes, updated on every mutation
+_shared_games = None
+_shared_games_mtime = None
+_shared_games_index = None
+_shared_games_search = None
+_shared_games_tags = None
+
+# Catalog mutations are per-game patches appended to the journal under this lock,
+# the journal is folded back into shared_games.json once it gets long
+_shared_games_lock = threading.RLock()
+# Nesting depth of _locked_shared_catalog in the thread holding _shared_games_lock
+_shared_games_lock_depth = 0
+_shared_journal_entries = 0
+JOURNAL_COMPACT_THRESHOLD = 500
+
+# Default expected_version of the patch functions: apply without a version check
+ANY_VERSION = object()
+
+# Per-guild sorted game order indexes, built on first use and kept in sync by the save functions
+_guild_game_orders = {}
+# Per-guild (enabled game keys, bitmask of those games in the tag index), only for guilds
+# with an order index, dropped whenever that index changes and rebuilt by the next filter_games
+_guild_tag_masks = {}
+
+# Per-guild current voting period ID (from period.json, None if the guild never voted)
+_current_periods = {}
+
+# Guild documents are versioned: a save given an expected_version only applies if
+# nobody saved since (compare-and-swap under the guild's own lock, so guilds never wait
+# for each other). The version pairs a counter of this process' saves (reset on restart)
+# with the inode, mtime and size of the document's file, which changes when another
+# process (cli.py, a second bot) replaces it. A write of another process landing during
+# the save itself is not detected: run offline tools with the bot stopped.
+GUILD_DOCUMENTS = ("votes", "games", "config", "schedules")
+_guild_versions = {}
+_guild_locks = {}
+# Conflicting updates are retried this many times, then applied with the guild locked
+UPDATE_RETRIES = 5
+
+# Decoded votes of past periods by (guild_id, period), least recently used first
+# (past periods never change, only archiving or pruning them drops entries)
+_period_votes_cache = OrderedDict()
+PERIOD_CACHE_SIZE = 32
+
+# Exports are built in memory up to this size, then spill over to a temporary file
+EXPORT_SPOOL_SIZE = 4 * 1024 * 1024
+
+# First byte of a JSON document (object or list) - anything else is read as MessagePack
+_JSON_START = frozenset(b"{[")
+
+
+def _dumps_json(data) -> bytes:
+    # Compact: indent=2 about doubles the size and the encoding time
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+
+
+def _dumps_orjson(data) -> bytes:
+    return orjson.dumps(data)
+
+
+def _dumps_msgpack(data) -> bytes:
+    return msgpack.packb(data, use_bin_type=True)
+
+
+# Serializers of the data formats (see config.DATA_FORMATS) and the module they need
+DATA_SERIALIZERS = {
+    "json": (_dumps_json, json),
+    "orjson": (_dumps_orjson, orjson),
+    "msgpack": (_dumps_msgpack, msgpack),
+}
+
+
+def get_available_data_formats() -> list:
+    """Get the data formats whose library is installed."""
+    return [name for name, (_, module) in DATA_SERIALIZERS.items() if module is not None]
+
+
+def check_data_format():
+    """Check that the library of the configured data format (TATIBOT_DATA_FORMAT) is installed.
+    
+    Called at startup, so a missing package stops the bot instead of files
+    being written in another format than the configured one.
+    
+    Raises:
+        RuntimeError: If the library is missing
+    """
+    data_format = get_data_format()
+    if DATA_SERIALIZERS[data_format][1] is None:
+        raise RuntimeError(
+            f"TATIBOT_DATA_FORMAT={data_format} but the {data_format} package is not installed "
+            f"(pip install -r requirements.txt)"
+        )
+
+
+def dumps_data(data, data_format: str = None) -> bytes:
+    """Serialize votes data in a data format.
+    
+    Args:
+        data: JSON-compatible value
+        data_format: "json", "orjson" or "msgpack" (defaults to TATIBOT_DATA_FORMAT)
+    
+    Returns:
+        The encoded bytes
+    
+    Raises:
+        RuntimeError: If the format's library is not installed
+    """
+    data_format = data_format or get_data_format()
+    dumps, module = DATA_SERIALIZERS[data_format]
+    if module is None:
+        raise RuntimeError(f"Cannot write {data_format} data: the {data_format} package is not installed")
+    return dumps(data)
+
+
+def loads_data(data: bytes):
+    """Deserialize data written by dumps_data (or by json.dump), detecting its format.
+    
+    Raises:
+        ValueError: If the data is invalid, or MessagePack and msgpack isn't installed
+    """
+    first = data.lstrip()[:1] if data[:1].isspace() else data[:1]
+    if not first or first[0] in _JSON_START:
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+    if msgpack is None:
+        raise ValueError("MessagePack data, but msgpack is not installed")
+    try:
+        return msgpack.unpackb(data, raw=False)
+    except (ValueError, msgpack.UnpackException) as e:
+        raise ValueError(f"Invalid MessagePack data: {e}") from e
+
+
+def read_data_file(path: Path):
+    """Read a votes file in any data format (see loads_data), including a write not committed yet."""
+    staged = read_staged(path)
+    if staged is not None:
+        return loads_data(staged)
+    with open(path, 'rb') as f:
+        return loads_data(f.read())
+
+
+def write_data_file(path: Path, data, data_format: str = None):
+    """Write a votes file in the configured data format (see dumps_data).
+    
+    The file is replaced atomically with the next group commit (see core.atomic_io),
+    read_data_file already returns the new content.
+    
+    Returns:
+        Ticket to pass to core.atomic_io.wait_for_commit before acknowledging the write
+    """
+    return stage_write(path, dumps_data(data, data_format))
+
+
+def data_file_exists(path: Path) -> bool:
+    """Check whether a votes file exists (on disk or waiting for the group commit)."""
+    return has_staged_write(path) or path.exists()
+
+
+def _write_json_file(path: Path, data, indent: int = 2):
+    """Write a JSON file atomically and durably (see core.atomic_io.atomic_write)."""
+    atomic_write(path, json.dumps(data, indent=indent, ensure_ascii=False).encode('utf-8'))
+
+
+def _guild_lock(guild_id: int):
+    """Get the lock held while a guild's documents are saved (one per guild)."""
+    lock = _guild_locks.get(guild_id)
+    if lock is None:
+        lock = _guild_locks.setdefault(guild_id, threading.RLock())
+    return lock
+
+
+def get_document_version(guild_id: int, document: str) -> int:
+    """Get the version of a guild document, to pass as expected_version to its save function.
+    
+    Read it before loading the document: a save made in between then fails the
+    version check instead of being overwritten.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        document: One of GUILD_DOCUMENTS
+    
+    Returns:
+        Opaque version, only meant to be compared (changes with every save of
+        this process and every replacement of the file by another one)
+    """
+    return _guild_versions.get((guild_id, document), 0), _document_file_signature(guild_id, document)
+
+
+def _document_file_signature(guild_id: int, document: str):
+    """Get the (inode, mtime, size) of a guild document's file, None if it has none.
+    
+    A votes file waiting for the group commit has no signature: only this
+    process writes it until then, and its own saves are counted.
+    """
+    if document == "votes":
+        period = get_current_period(guild_id)
+        if period is None:
+            return None
+        path = get_votes_file(guild_id, period)
+        if has_staged_write(path):
+            return None
+    else:
+        path = {"games": get_games_file, "config": get_config_file, "schedules": get_schedules_file}[document](guild_id)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _check_version(guild_id: int, document: str, expected_version) -> bool:
+    """Check a save's expected version (must be called with the guild lock held)."""
+    return expected_version is ANY_VERSION or expected_version == get_document_version(guild_id, document)
+
+
+def _bump_version(guild_id: int, document: str):
+    """Mark a guild document as changed (must be called with the guild lock held)."""
+    key = (guild_id, document)
+    _guild_versions[key] = _guild_versions.get(key, 0) + 1
+
+
+def _update_document(guild_id: int, document: str, load, save, mutate, snapshot):
+    """Apply a mutation to a guild document with optimistic concurrency.
+    
+    The document is loaded, mutated and saved with its version as
+    expected_version. If another save got in between, the mutation is applied
+    again to the fresh document (up to UPDATE_RETRIES times, then with the
+    guild locked), so concurrent mutations never overwrite each other.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        document: One of GUILD_DOCUMENTS
+        load: Function loading the document of a guild
+        save: Save function of the document (taking expected_version)
+        mutate: Function changing the loaded document in place; it may be called
+            several times, so it must not have other side effects
+        snapshot: Function giving a comparable copy of the document (nothing is
+            saved if the mutation didn't change it)
+    
+    Returns:
+        What the last call of mutate returned
+    """
+    for _ in range(UPDATE_RETRIES):
+        version = get_document_version(guild_id, document)
+        data = load(guild_id)
+        before = snapshot(data)
+        result = mutate(data)
+        if snapshot(data) == before or save(data, guild_id, expected_version=version):
+            return result
+        logger.debug(f"Conflicting {document} update in guild {guild_id}, retrying")
+    
+    # Still conflicting: apply it with the guild's saves on hold
+    with _guild_lock(guild_id):
+        data = load(guild_id)
+        before = snapshot(data)
+        result = mutate(data)
+        if snapshot(data) != before:
+            save(data, guild_id)
+        return result
+
+
+def _file_mtime(path: Path):
+    """Get a file's mtime in nanoseconds, or None if it doesn't exist."""
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def _locked_shared_catalog():
+    """Hold the catalog lock, also across processes (e.g. cli.py workers) where fcntl is available.
+    
+    Every catalog change (and reload) happens under it, after _get_shared_catalog()
+    has picked up the other processes' changes, so new IDs are handed out from the
+    latest catalog and the journal is never compacted while another process appends to it.
+    """
+    global _shared_games_lock_depth
+    with _shared_games_lock:
+        if fcntl is None or _shared_games_lock_depth:
+            _shared_games_lock_depth += 1
+            try:
+                yield
+            finally:
+                _shared_games_lock_depth -= 1
+            return
+        ensure_data_dir()
+        shared_games_file = get_shared_games_file()
+        with open(shared_games_file.with_name(shared_games_file.name + ".lock"), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            _shared_games_lock_depth += 1
+            try:
+                yield
+            finally:
+                _shared_games_lock_depth -= 1
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _shared_catalog_mtime() -> tuple:
+    return (_file_mtime(get_shared_games_file()), _file_mtime(get_shared_games_journal_file()))
+
+
+def _get_shared_catalog() -> dict:
+    """Get the cached shared catalog (internal - callers must not mutate the dict).
+    
+    Returns:
+        Dictionary of all shared games as read-only records
+    """
+    global _shared_games, _shared_games_mtime, _shared_games_index, _shared_games_search, _shared_games_tags
+    global _shared_journal_entries
+    with _shared_games_lock:
+        if _shared_games is not None and _shared_catalog_mtime() == _shared_games_mtime:
+            return _shared_games
+    
+    # Reload under the lock: never between another process's snapshot and journal writes
+    with _locked_shared_catalog():
+        shared_games_file = get_shared_games_file()
+        mtime = _shared_catalog_mtime()
+        
+        if _shared_games is None or mtime != _shared_games_mtime:
+            if mtime[0] is not None:
+                with open(shared_games_file, 'r', encoding='utf-8') as f:
+                    _shared_games = json.load(f)
+            else:
+                _shared_games = {}
+            _shared_journal_entries = _replay_shared_journal(_shared_games) if mtime[1] is not None else 0
+            _shared_games = {game_key: freeze_game(game) for game_key, game in _shared_games.items()}
+            _shared_games_mtime = mtime
+            _shared_games_index = GameLookupIndex(_shared_games)
+            _shared_games_search = GameSearchIndex(_shared_games)
+            _shared_games_tags = GameTagIndex(_shared_games)
+        
+        return _shared_games
+
+
+def _replay_shared_journal(games: dict) -> int:
+    """Apply the journaled patches on top of the shared_games.json snapshot.
+    
+    Args:
+        games: Games loaded from shared_games.json (updated in place)
+        
+    Returns:
+        Number of journal entries
+    """
+    entries = 0
+    journal_file = get_shared_games_journal_file()
+    with open(journal_file, 'rb') as f:
+        offset = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                # Torn last line (interrupted write): the patch was never acknowledged. It is cut off
+                # so the next patch starts on a line of its own instead of being appended to it
+                os.truncate(journal_file, offset)
+                break
+            offset += len(line)
+            try:
+                patch = json.loads(line)
+            except ValueError:
+                continue
+            if patch.get("game") is None:
+                games.pop(patch["key"], None)
+            else:
+                games[patch["key"]] = patch["game"]
+            entries += 1
+    return entries
+
+
+def _game_version(game) -> str:
+    """Get the version of a game definition (hash of its content, None if it doesn't exist)."""
+    if game is None:
+        return None
+    return hashlib.sha1(json.dumps(dict(game), sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def get_shared_game_version(game_key: str):
+    """Get the current version of a shared game, to pass back as expected_version when patching it.
+    
+    Returns:
+        Version string, or None if the game doesn't exist
+    """
+    return _game_version(_get_shared_catalog().get(game_key))
+
+
+def _apply_shared_patch(game_key: str, game):
+    """Apply one patch to the cache, the catalog indexes and the server order indexes.
+    
+    Args:
+        game_key: The game key
+        game: New game data, or None to delete the game
+    """
+    old_game = _shared_games.get(game_key)
+    if old_game is not None:
+        _shared_games_index.remove(game_key, old_game)
+        _shared_games_search.remove(game_key, old_game)
+        _shared_games_tags.remove(game_key, old_game)
+    if game is None:
+        _shared_games.pop(game_key, None)
+    else:
+        game = freeze_game(game)
+        _shared_games[game_key] = game
+        _shared_games_index.add(game_key, game)
+        _shared_games_search.add(game_key, game)
+        _shared_games_tags.add(game_key, game)
+    
+    for guild_id, index in _guild_game_orders.items():
+        if game_key in index:
+            if game is None:
+                index.remove(game_key)
+            else:
+                index.add(game_key, game)
+            _guild_tag_masks.pop(guild_id, None)
+
+
+def _write_shared_patches(patches: list):
+    """Persist patches by appending them to the journal, then apply them in memory.
+    
+    Must be called within _locked_shared_catalog(), after _get_shared_catalog().
+    
+    Args:
+        patches: List of (game_key, game data or None to delete) tuples; games
+            without an ID get the next free one
+    """
+    global _shared_games_mtime, _shared_journal_entries
+    # New games get the next free IDs here, under the lock, so no two games share one
+    next_id = _shared_games_index.next_id
+    for i, (game_key, game) in enumerate(patches):
+        if game is not None and not game.get("id"):
+            patches[i] = (game_key, {**game, "id": next_id})
+            next_id += 1
+    
+    ensure_data_dir()
+    journal_file = get_shared_games_journal_file()
+    append_durably(journal_file, "".join(
+        json.dumps({"key": game_key, "game": game}, ensure_ascii=False) + "\n"
+        for game_key, game in patches
+    ).encode('utf-8'))
+    for game_key, game in patches:
+        _apply_shared_patch(game_key, game)
+    _shared_journal_entries += len(patches)
+    _shared_games_mtime = (_shared_games_mtime[0], _file_mtime(journal_file))
+    
+    if _shared_journal_entries >= JOURNAL_COMPACT_THRESHOLD:
+        _compact_shared_journal()
+
+
+def _compact_shared_journal():
+    """Fold the journal into shared_games.json and empty it (lock must be held).
+    
+    The snapshot is written before the journal is removed: if interrupted in between,
+    replaying the journal on the new snapshot gives the same catalog.
+    """
+    global _shared_games_mtime, _shared_journal_entries
+    ensure_data_dir()
+    shared_games_file = get_shared_games_file()
+    _write_json_file(shared_games_file, {game_key: dict(game) for game_key, game in _shared_games.items()})
+    get_shared_games_journal_file().unlink(missing_ok=True)
+    _shared_journal_entries = 0
+    _shared_games_mtime = (_file_mtime(shared_games_file), None)
+
+
+def compact_shared_games() -> int:
+    """Fold the shared catalog journal into shared_games.json now (maintenance).
+    
+    Returns:
+        Number of journal entries folded
+    """
+    with _locked_shared_catalog():
+        _get_shared_catalog()
+        entries = _shared_journal_entries
+        if entries:
+            _compact_shared_journal()
+    return entries
+
+
+def upsert_shared_game(game_key: str, game_data: dict, expected_version=ANY_VERSION) -> bool:
+    """Add or replace one game of the shared catalog.
+    
+    Args:
+        game_key: The game key (lowercase name)
+        game_data: Full game data dictionary
+        expected_version: Version from get_shared_game_version the change is based on
+            (None if the game must not exist yet); the patch is rejected if the game changed since
+        
+    Returns:
+        True if saved, False on version conflict
+    """
+    with _locked_shared_catalog():
+        current = _get_shared_catalog().get(game_key)
+        if expected_version is not ANY_VERSION and _game_version(current) != expected_version:
+            return False
+        if current != freeze_game(game_data):
+            _write_shared_patches([(game_key, dict(game_data))])
+        return True
+
+
+def update_shared_game(game_key: str, fields: dict, expected_version=ANY_VERSION) -> bool:
+    """Change some fields of one shared game (a None value removes the field).
+    
+    Args:
+        game_key: The game key (lowercase name)
+        fields: Fields to set
+        expected_version: Optional version the change is based on (see upsert_shared_game)
+        
+    Returns:
+        True if saved, False if the game doesn't exist or on version conflict
+    """
+    with _locked_shared_catalog():
+        current = _get_shared_catalog().get(game_key)
+        if current is None:
+            return False
+        if expected_version is not ANY_VERSION and _game_version(current) != expected_version:
+            return False
+        game = dict(current)
+        for field, value in fields.items():
+            if value is None:
+                game.pop(field, None)
+            else:
+                game[field] = value
+        if freeze_game(game) != current:
+            _write_shared_patches([(game_key, game)])
+        return True
+
+
+def rename_shared_game(old_key: str, new_key: str, game_data: dict, expected_version=ANY_VERSION) -> bool:
+    """Move a shared game to a new key (after a name change), as one journal write.
+    
+    Args:
+        old_key: Current game key
+        new_key: New game key (must not be used by another game)
+        game_data: Full game data dictionary
+        expected_version: Optional version of the old entry the change is based on
+        
+    Returns:
+        True if saved, False on version conflict or if the new key is taken
+    """
+    with _locked_shared_catalog():
+        shared_games = _get_shared_catalog()
+        if expected_version is not ANY_VERSION and _game_version(shared_games.get(old_key)) != expected_version:
+            return False
+        if new_key in shared_games:
+            return False
+        _write_shared_patches([(old_key, None), (new_key, dict(game_data))])
+        return True
+
+
+def upsert_shared_games(games: dict) -> int:
+    """Add or update several games in one journal write (without version check).
+    
+    Args:
+        games: Dictionary of game keys to full game data
+        
+    Returns:
+        Number of games actually changed
+    """
+    with _locked_shared_catalog():
+        shared_games = _get_shared_catalog()
+        changed = [
+            (game_key, dict(game_data)) for game_key, game_data in games.items()
+            if shared_games.get(game_key) != freeze_game(game_data)
+        ]
+        if changed:
+            _write_shared_patches(changed)
+    return len(changed)
+
+
+def delete_shared_game(game_key: str, expected_version=ANY_VERSION) -> bool:
+    """Delete one game from the shared catalog.
+    
+    Args:
+        game_key: The game key (lowercase name)
+        expected_version: Optional version the deletion is based on (see upsert_shared_game)
+        
+    Returns:
+        True if deleted (or already absent), False on version conflict
+    """
+    with _locked_shared_catalog():
+        current = _get_shared_catalog().get(game_key)
+        if expected_version is not ANY_VERSION and _game_version(current) != expected_version:
+            return False
+        if current is not None:
+            _write_shared_patches([(game_key, None)])
+        return True
+
+
+def assign_game_id(game_key: str):
+    """Give a shared game the next free ID if it has none.
+    
+    The ID is picked under the catalog lock, so parallel processes (cli.py
+    workers migrating servers) never give two games the same ID.
+    
+    Returns:
+        The game's ID, or None if the game doesn't exist
+    """
+    with _locked_shared_catalog():
+        game = _get_shared_catalog().get(game_key)
+        if game is not None and not game.id:
+            _write_shared_patches([(game_key, dict(game))])
+            game = _shared_games[game_key]
+        return game.id if game is not None else None
+
+
+def get_next_game_id(games=None):
+    """Get the next available game ID.
+    
+    Args:
+        games: Optional games dict to compute the ID from (defaults to the shared catalog index)
+    """
+    if games is None:
+        _get_shared_catalog()
+        return _shared_games_index.next_id
     if not games:
         return 1
     existing_ids = [game.get("id", 0) for game in games.values() if game.get("id")]
@@ -17,18 +655,145 @@ def get_next_game_id(games):
     return max(existing_ids) + 1
 
 
+def get_game_key_by_id(game_id: int):
+    """Look up a shared game key by its numeric ID.
+    
+    Returns:
+        The game key, or None if no game has this ID
+    """
+    _get_shared_catalog()
+    return _shared_games_index.by_id.get(game_id)
+
+
+def get_game_key_by_name(name: str):
+    """Look up a shared game key by its name (case-insensitive).
+    
+    Returns:
+        The game key, or None if no game has this name
+    """
+    _get_shared_catalog()
+    return _shared_games_index.by_name.get(name.strip().lower())
+
+
+def find_game_key(query: str, games: dict = None):
+    """Resolve a game from a user-provided ID or name.
+    
+    Args:
+        query: Game ID (digits) or game name
+        games: Optional games dict (e.g. from load_games) the game must belong to
+        
+    Returns:
+        The game key, or None if not found
+    """
+    query = query.strip()
+    game_key = get_game_key_by_id(int(query)) if query.isdigit() else None
+    if game_key is None:
+        game_key = get_game_key_by_name(query)
+    if game_key is not None and games is not None and game_key not in games:
+        return None
+    return game_key
+
+
+def search_games(query: str, guild_id: int = None, limit: int = 25) -> list:
+    """Fuzzy search games by name and tags using the trigram index.
+    
+    Args:
+        query: Text typed by the user
+        guild_id: Optional Discord guild (server) ID to only return games enabled there
+        limit: Maximum number of results
+        
+    Returns:
+        List of (game_key, game_data) tuples (read-only records), best match first
+    """
+    shared_games = _get_shared_catalog()
+    if not query.strip():
+        # Nothing typed yet: suggest games in display order
+        if guild_id is None:
+            return [(game_key, shared_games[game_key]) for game_key in list(shared_games)[:limit]]
+        return get_sorted_games(guild_id)[:limit]
+    
+    allowed = set(load_server_game_list(guild_id)) if guild_id is not None else None
+    return [(game_key, shared_games[game_key]) for game_key in _shared_games_search.search(query, limit, allowed)]
+
+
+def get_game_tags() -> list:
+    """Get all tags used in the shared catalog, sorted by name."""
+    _get_shared_catalog()
+    return sorted(_shared_games_tags.tag_names.values(), key=str.lower)
+
+
+def get_tag_token(tag: str) -> str:
+    """Get a short ID of a tag for component custom_ids (limited to 100 characters by Discord).
+    
+    The ID only depends on the tag (case-insensitive), so it stays valid when
+    other tags are added or removed.
+    """
+    return hashlib.blake2s(tag.strip().lower().encode('utf-8'), digest_size=6).hexdigest()
+
+
+def get_tag_by_token(token: str):
+    """Get the catalog tag a get_tag_token ID stands for.
+    
+    Returns:
+        The tag, or None if no game has it anymore
+    """
+    _get_shared_catalog()
+    for tag in list(_shared_games_tags.tag_names.values()):
+        if get_tag_token(tag) == token:
+            return tag
+    return None
+
+
+def _guild_games_mask(games: dict, guild_id: int = None) -> int:
+    """Get the tag index bitmask of a guild's games, cached next to the guild's order index."""
+    if guild_id is None or guild_id not in _guild_game_orders:
+        return _shared_games_tags.mask_of(games.keys())
+    cached = _guild_tag_masks.get(guild_id)
+    # A mask of another game list (e.g. one game enabled and another disabled) is rebuilt
+    if cached is not None and cached[0] == games.keys():
+        return cached[1]
+    mask = _shared_games_tags.mask_of(games.keys())
+    _guild_tag_masks[guild_id] = (frozenset(games), mask)
+    return mask
+
+
+def filter_games(games: dict, tag: str = None, remote_play: bool = False, guild_id: int = None) -> dict:
+    """Filter games by tag and/or Remote Play Together support using the tag bitmaps.
+    
+    Args:
+        games: Dictionary of games (e.g. from load_games)
+        tag: Optional tag the games must have (case-insensitive)
+        remote_play: If True, only keep games supporting Remote Play Together
+        guild_id: Server the games are enabled on (from load_games); its games'
+            bitmask is then cached instead of being rebuilt on every call
+        
+    Returns:
+        Read-only mapping with the matching games only
+    """
+    if not tag and not remote_play:
+        return games
+    with _shared_games_lock:
+        _get_shared_catalog()
+        mask = _guild_games_mask(games, guild_id) & _shared_games_tags.filter_mask(tag, remote_play)
+        return GuildGames(_shared_games_tags.keys_of(mask), games)
+
+
+def get_shared_game(game_key: str):
+    """Get one shared game definition by key.
+    
+    Returns:
+        Read-only game record, or None if the game doesn't exist
+    """
+    return _get_shared_catalog().get(game_key)
+
+
 def load_shared_games() -> dict:
-    """Load all shared game definitions (full game data).
+    """Load all shared game definitions (full game data) as editable copies.
     
     Returns:
         Dictionary of all shared games with full definitions
     """
-    shared_games_file = get_shared_games_file()
-    
-    if shared_games_file.exists():
-        with open(shared_games_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    return {game_key: dict(game) for game_key, game in _get_shared_catalog().items()}
 
 
 def load_server_game_list(guild_id: int) -> list:
@@ -42,15 +807,9 @@ def load_server_game_list(guild_id: int) -> list:
     """
     games_file = get_games_file(guild_id)
     
-    if games_file.exists():
+    if guild_dir_exists(guild_id) and games_file.exists():
         with open(games_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # Support both old format (dict) and new format (list of keys)
-            if isinstance(data, list):
-                return data
-            elif isinstance(data, dict):
-                # Legacy format: convert to list of keys
-                return list(data.keys())
+            return json.load(f)
     return []
 
 
@@ -62,98 +821,130 @@ def load_games(guild_id: int):
         guild_id: The Discord guild (server) ID
         
     Returns:
-        Dictionary of games (only games enabled on this server, with full data from shared)
+        Read-only mapping of the games enabled on this server to their shared records
+        (change games with upsert_shared_game / update_shared_game)
     """
-    # Load shared game definitions (all games with full data)
-    shared_games = load_shared_games()
+    # Shared game definitions (all games with full data)
+    shared_games = _get_shared_catalog()
     
     # Load server-specific game list (which games are enabled on this server)
     server_game_keys = load_server_game_list(guild_id)
     
-    # If server has no game list yet, migrate from legacy format
-    if not server_game_keys and shared_games:
-        legacy_games_file = get_games_file(guild_id)
-        if legacy_games_file.exists():
-            try:
-                with open(legacy_games_file, 'r', encoding='utf-8') as f:
-                    legacy_data = json.load(f)
-                    if isinstance(legacy_data, dict):
-                        # Migrate: use all keys from legacy file
-                        server_game_keys = list(legacy_data.keys())
-                        # Save as new format (list of keys)
-                        save_server_game_list(server_game_keys, guild_id)
-            except Exception:
-                pass
-    
-    # Return only games that are in server's list, with full data from shared
-    result = {}
-    for game_key in server_game_keys:
-        if game_key in shared_games:
-            result[game_key] = shared_games[game_key].copy()
-        # If game not in shared, it will be missing (could add warning)
-    
-    return result
+    # View over the shared records of the games in the server's list
+    # (games missing from shared are left out)
+    return GuildGames(server_game_keys, shared_games)
+
+
+def get_sorted_games(guild_id: int, order: str = "id", games: dict = None) -> list:
+    """Get a server's games in display order, from the server's order index.
+    
+    The index is built once per server and then updated incrementally when games
+    are added, updated or removed, so no sorting happens per request.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        order: "id" (ID then name), "name" or "players" (player range)
+        games: Optional games dict from load_games (will load if not provided)
+        
+    Returns:
+        List of (game_key, game_data) tuples
+    """
+    if games is None:
+        games = load_games(guild_id)
+    
+    index = _guild_game_orders.get(guild_id)
+    if index is not None:
+        sorted_games = [(game_key, games[game_key]) for game_key in index.keys(order) if game_key in games]
+        if len(sorted_games) == len(games):
+            return sorted_games
+    
+    # First use (or files changed outside the bot): build the index
+    index = GameOrderIndex(games)
+    _guild_game_orders[guild_id] = index
+    _guild_tag_masks.pop(guild_id, None)
+    return [(game_key, games[game_key]) for game_key in index.keys(order)]
 
 
 def save_shared_games(games: dict):
-    """Save shared game definitions (full game data).
+    """Replace the whole shared catalog (e.g. when importing a backup).
+    
+    Single-game changes should use upsert_shared_game / update_shared_game /
+    delete_shared_game, which only append a patch to the journal.
     
     Args:
         games: Dictionary of all shared games with full definitions
     """
-    shared_games_file = get_shared_games_file()
-    with open(shared_games_file, 'w', encoding='utf-8') as f:
-        json.dump(games, f, indent=2, ensure_ascii=False)
+    global _shared_games
+    with _locked_shared_catalog():
+        old_games = _get_shared_catalog()
+        
+        # Start from the old cache so only the changed games are re-indexed
+        _shared_games = dict(old_games)
+        for game_key in old_games.keys() - games.keys():
+            _apply_shared_patch(game_key, None)
+        for game_key, game in games.items():
+            if old_games.get(game_key) != freeze_game(game):
+                _apply_shared_patch(game_key, game)
+        _compact_shared_journal()
 
 
-def save_server_game_list(game_keys: list, guild_id: int):
+def save_server_game_list(game_keys: list, guild_id: int, expected_version=ANY_VERSION) -> bool:
     """Save server-specific list of enabled game keys.
     
     Args:
         game_keys: List of game keys (strings) that are enabled on this server
         guild_id: The Discord guild (server) ID
-    """
-    games_file = get_games_file(guild_id)
-    with open(games_file, 'w', encoding='utf-8') as f:
-        json.dump(game_keys, f, indent=2, ensure_ascii=False)
-
-
-def add_game_to_shared(game_key: str, game_data: dict):
-    """Add or update a game in the shared games database.
+        expected_version: Only save if the list is still at this version (see get_document_version)
     
-    Args:
-        game_key: The game key (lowercase name)
-        game_data: Full game data dictionary
+    Returns:
+        True if saved, False if the list was saved by someone else since expected_version
     """
-    shared_games = load_shared_games()
-    shared_games[game_key] = game_data.copy()
-    save_shared_games(shared_games)
+    with _guild_lock(guild_id):
+        if not _check_version(guild_id, "games", expected_version):
+            return False
+        ensure_guild_dir(guild_id)
+        _write_json_file(get_games_file(guild_id), game_keys)
+        _bump_version(guild_id, "games")
+        
+        # Keep the server's order index in sync (only the added/removed games)
+        _guild_tag_masks.pop(guild_id, None)
+        index = _guild_game_orders.get(guild_id)
+        if index is not None:
+            enabled_keys = set(game_keys)
+            for game_key in index.keys():
+                if game_key not in enabled_keys:
+                    index.remove(game_key)
+            added_keys = [game_key for game_key in game_keys if game_key not in index]
+            if added_keys:
+                shared_games = _get_shared_catalog()
+                for game_key in added_keys:
+                    if game_key in shared_games:
+                        index.add(game_key, shared_games[game_key])
+    return True
 
 
-def add_game_to_server(game_key: str, guild_id: int):
-    """Add a game to a server's enabled game list.
+def update_server_game_list(guild_id: int, mutate):
+    """Change a server's game list without overwriting concurrent changes.
     
     Args:
-        game_key: The game key (lowercase name)
         guild_id: The Discord guild (server) ID
+        mutate: Function changing the list of game keys in place (may be called
+            again if another change got in first)
+    
+    Returns:
+        What mutate returned
     """
-    server_game_keys = load_server_game_list(guild_id)
-    if game_key not in server_game_keys:
-        server_game_keys.append(game_key)
-        save_server_game_list(server_game_keys, guild_id)
+    return _update_document(guild_id, "games", load_server_game_list, save_server_game_list, mutate, list)
 
 
-def remove_game_from_server(game_key: str, guild_id: int):
-    """Remove a game from a server's enabled game list (but keep in shared).
+def add_game_to_shared(game_key: str, game_data: dict):
+    """Add or update a game in the shared games database (without version check).
     
     Args:
         game_key: The game key (lowercase name)
-        guild_id: The Discord guild (server) ID
+        game_data: Full game data dictionary
     """
-    server_game_keys = load_server_game_list(guild_id)
-    if game_key in server_game_keys:
-        server_game_keys.remove(game_key)
-        save_server_game_list(server_game_keys, guild_id)
+    upsert_shared_game(game_key, game_data)
 
 
 def save_games(games, guild_id: int):
@@ -164,162 +955,529 @@ def save_games(games, guild_id: int):
         games: Dictionary of games (for this server)
         guild_id: The Discord guild (server) ID
     """
-    # Update shared games with any new/updated definitions
-    shared_games = load_shared_games()
-    for game_key, game_data in games.items():
-        shared_games[game_key] = game_data.copy()
-    save_shared_games(shared_games)
+    # Write a patch for each new/updated definition only
+    upsert_shared_games(games)
     
     # Update server's game list (just the keys)
     server_game_keys = list(games.keys())
     save_server_game_list(server_game_keys, guild_id)
 
 
+def get_current_period(guild_id: int):
+    """Get the ID of a guild's current voting period (the pointer is cached per guild).
+    
+    Returns:
+        Period ID (YYYY-MM-DD, with a -N suffix if several periods started that day),
+        or None if the guild never voted
+    """
+    if guild_id not in _current_periods:
+        period = None
+        period_file = get_period_file(guild_id)
+        if guild_dir_exists(guild_id) and period_file.exists():
+            with open(period_file, 'r', encoding='utf-8') as f:
+                period = json.load(f).get("current")
+        _current_periods[guild_id] = period
+    return _current_periods[guild_id]
+
+
+def _set_current_period(guild_id: int, period: str):
+    """Point a guild's current voting period to a new ID."""
+    ensure_guild_dir(guild_id)
+    _write_json_file(get_period_file(guild_id), {"current": period})
+    _current_periods[guild_id] = period
+
+
+def invalidate_guild_cache(guild_id: int):
+    """Forget what is cached about a guild (after its files were replaced, e.g. by an import).
+    
+    The versions of its documents change too, so updates in progress start over
+    from the new files.
+    """
+    forget_guild_paths(guild_id)
+    with _guild_lock(guild_id):
+        _guild_game_orders.pop(guild_id, None)
+        _guild_tag_masks.pop(guild_id, None)
+        _current_periods.pop(guild_id, None)
+        for document in GUILD_DOCUMENTS:
+            _bump_version(guild_id, document)
+
+
+def move_guild_folder(guild_id: int, layout: str) -> bool:
+    """Move a guild's folder to another layout (see config.move_guild_dir) without losing a write.
+    
+    The folder is moved under the guild lock, once the staged writes are
+    committed, so no save of the guild is pending or in progress meanwhile. In
+    the bot, run it with guild_actors.run_task, in order with the guild's changes.
+    
+    Returns:
+        True if the folder was moved, False if already there or missing
+    
+    Raises:
+        OSError: If the guild's staged writes could not be committed, or the folder could not be moved
+    """
+    with _guild_lock(guild_id):
+        flush_staged_writes()
+        if has_staged_writes_in(get_guild_dir(guild_id)):
+            raise OSError(f"Writes of guild {guild_id} could not be committed, its folder was not moved")
+        return move_guild_dir(guild_id, layout)
+
+
+def new_period_id(guild_id: int) -> str:
+    """Get an unused period ID starting today."""
+    base = datetime.now().strftime("%Y-%m-%d")
+    used = set(_load_vote_archive_index_periods(guild_id))
+    used.add(get_current_period(guild_id))
+    period, n = base, 1
+    while period in used or data_file_exists(get_votes_file(guild_id, period)):
+        n += 1
+        period = f"{base}-{n}"
+    return period
+
+
+def advance_vote_period(guild_id: int):
+    """Start a new voting period: only the current period pointer changes.
+    
+    The votes of the closed period stay in their file (available to restore and
+    history) until collect_vote_periods moves them into the archive.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        
+    Returns:
+        ID of the closed period, or None if it had no votes (nothing to keep)
+    """
+    with _guild_lock(guild_id):
+        current = get_current_period(guild_id)
+        if current is None or not data_file_exists(get_votes_file(guild_id, current)):
+            return None
+        # The closed period's file is final: put it on disk before the period changes
+        flush_staged_writes()
+        _set_current_period(guild_id, new_period_id(guild_id))
+        # Votes updates in progress must not land in the new period with the old votes
+        _bump_version(guild_id, "votes")
+    return current
+
+
+def _votes_from_records(votes: dict) -> dict:
+    """Build the UserVotes of the user records of a votes file or archived period."""
+    return {user_id: UserVotes.from_dict(user_data) for user_id, user_data in votes.items()}
+
+
 def load_votes(guild_id: int):
-    """Load votes from JSON file for a specific guild.
+    """Load the votes of the current voting period for a specific guild.
     
     Args:
         guild_id: The Discord guild (server) ID
         
     Returns:
-        Dictionary of votes
+        Dictionary of user ID -> UserVotes
     """
-    votes_file = get_votes_file(guild_id)
-    if votes_file.exists():
-        with open(votes_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    period = get_current_period(guild_id)
+    if period is None:
+        return {}
+    votes_file = get_votes_file(guild_id, period)
+    if data_file_exists(votes_file):
+        return _votes_from_records(read_data_file(votes_file))
     return {}
 
 
-def save_votes(votes, guild_id: int):
-    """Save votes to JSON file for a specific guild.
+def save_votes(votes, guild_id: int, expected_version=ANY_VERSION) -> bool:
+    """Save the votes of the current voting period for a specific guild.
+    
+    Prefer update_votes to change some users' votes: saving a loaded votes
+    dict without expected_version overwrites the votes saved since.
     
     Args:
-        votes: Dictionary of votes to save
+        votes: Dictionary of user ID -> UserVotes to save
         guild_id: The Discord guild (server) ID
+        expected_version: Only save if the votes are still at this version (see get_document_version)
+    
+    Returns:
+        True once saved to disk, False if the votes were saved by someone else since expected_version
+    
+    Raises:
+        OSError: If the group commit could not write the votes file
     """
-    votes_file = get_votes_file(guild_id)
-    with open(votes_file, 'w', encoding='utf-8') as f:
-        json.dump(votes, f, indent=2, ensure_ascii=False)
+    with _guild_lock(guild_id):
+        if not _check_version(guild_id, "votes", expected_version):
+            return False
+        period = get_current_period(guild_id)
+        if period is None:
+            period = new_period_id(guild_id)
+            _set_current_period(guild_id, period)
+        votes_file = get_votes_file(guild_id, period)
+        ticket = write_data_file(votes_file, {user_id: user_votes.to_dict() for user_id, user_votes in votes.items()})
+        _bump_version(guild_id, "votes")
+    # Waiting outside the lock lets the guild's next votes join the same group commit
+    wait_for_commit(votes_file, ticket)
+    return True
+
+
+def _votes_snapshot(votes: dict) -> dict:
+    return {user_id: (user_votes.ratings, user_votes.unavailable) for user_id, user_votes in votes.items()}
 
 
-def save_old_votes(guild_id: int):
-    """Save current votes to a dated backup file for a specific guild.
+def update_votes(guild_id: int, mutate):
+    """Change votes of the current voting period without overwriting concurrent votes.
+    
+    If another user's votes were saved while the mutation was applied, it is
+    applied again to the fresh votes, so mutate should only touch the votes of
+    the user it is for.
     
     Args:
         guild_id: The Discord guild (server) ID
+        mutate: Function changing the votes (user ID -> UserVotes) in place, may
+            be called several times; nothing is saved if it changes nothing
+    
+    Returns:
+        What mutate returned
+    """
+    return _update_document(guild_id, "votes", load_votes, save_votes, mutate, _votes_snapshot)
+
+
+def _load_vote_archive_index(guild_id: int) -> list:
+    """Load the vote archive index (list of period/offset/length entries, oldest first)."""
+    index_file = get_vote_archive_index_file(guild_id)
+    if guild_dir_exists(guild_id) and index_file.exists():
+        with open(index_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return []
+
+
+def _load_vote_archive_index_periods(guild_id: int) -> list:
+    """Get the IDs of the archived periods, oldest first."""
+    return [entry["period"] for entry in _load_vote_archive_index(guild_id)]
+
+
+def _save_vote_archive_index(guild_id: int, entries: list):
+    """Save the vote archive index (written to a temporary file, then swapped in)."""
+    _write_json_file(get_vote_archive_index_file(guild_id), entries)
+
+
+def append_vote_archive(guild_id: int, period: str, votes: dict):
+    """Append one voting period to a guild's vote archive.
+    
+    Each period is its own gzip member in votes.archive.jsonl.gz (a record in the
+    configured data format), so saving is an append and reading a period is a
+    seek to its offset. Archiving a period again
+    (e.g. two resets on the same day) replaces it in the index.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        period: Period label (YYYY-MM-DD)
+        votes: Votes of that period
+    """
+    ensure_guild_dir(guild_id)
+    record = gzip.compress(dumps_data({"period": period, "votes": votes}))
+    offset = append_durably(get_vote_archive_file(guild_id), record)
+    
+    entries = [entry for entry in _load_vote_archive_index(guild_id) if entry["period"] != period]
+    entries.append({"period": period, "offset": offset, "length": len(record), "users": _period_voters(votes)})
+    entries.sort(key=lambda entry: entry["period"])
+    _save_vote_archive_index(guild_id, entries)
+    _period_votes_cache.pop((guild_id, period), None)
+
+
+def _period_voters(votes: dict) -> list:
+    """Get the IDs of the users who rated at least one game in a period (for the archive index)."""
+    return sorted(user_id for user_id, user_data in votes.items() if user_data.get("ratings"))
+
+
+def rebuild_vote_archive_index(guild_id: int) -> list:
+    """Rebuild the archive index by scanning the gzip members of the archive.
+    
+    Returns:
+        The rebuilt index entries (oldest first)
+    """
+    archive_file = get_vote_archive_file(guild_id)
+    if not (guild_dir_exists(guild_id) and archive_file.exists()):
+        return []
+    with open(archive_file, 'rb') as f:
+        data = f.read()
+    
+    by_period = {}
+    offset = 0
+    while offset < len(data):
+        decompressor = zlib.decompressobj(wbits=31)  # gzip member
+        try:
+            record = loads_data(decompressor.decompress(data[offset:]))
+        except (zlib.error, ValueError):
+            break  # Truncated tail (interrupted append)
+        length = len(data) - offset - len(decompressor.unused_data)
+        by_period[record["period"]] = {
+            "period": record["period"], "offset": offset, "length": length, "users": _period_voters(record["votes"])
+        }
+        offset += length
+    
+    entries = sorted(by_period.values(), key=lambda entry: entry["period"])
+    _save_vote_archive_index(guild_id, entries)
+    return entries
+
+
+def _list_closed_period_files(guild_id: int) -> dict:
+    """Get the votes files of closed periods not archived yet, by period ID."""
+    if not guild_dir_exists(guild_id):
+        return {}
+    current = get_current_period(guild_id)
+    period_files = {}
+    for votes_file in get_guild_dir(guild_id).glob("votes.[0-9]*.json"):
+        period = votes_file.name[len("votes."):-len(".json")]
+        if period != current:
+            period_files[period] = votes_file
+    return period_files
+
+
+def list_vote_periods(guild_id: int) -> list:
+    """Get the IDs of the past voting periods of a guild (archived or not yet), newest first."""
+    periods = set(_load_vote_archive_index_periods(guild_id)) | _list_closed_period_files(guild_id).keys()
+    return sorted(periods, key=_period_sort_key, reverse=True)
+
+
+def load_period_votes(guild_id: int, period: str):
+    """Load the votes of one past voting period (decoded periods are kept in an LRU cache).
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        period: Period ID
         
     Returns:
-        Path to the backup file, or None if no votes to save
+        Dictionary of user ID -> UserVotes (shared with the cache, do not modify),
+        or None if the period doesn't exist
     """
-    votes = load_votes(guild_id)
-    if not votes:
+    if period == get_current_period(guild_id):
         return None
     
-    date_str = datetime.now().strftime("%Y-%m-%d")
-    guild_dir = get_guild_dir(guild_id)
-    old_votes_file = guild_dir / f"votes.old.{date_str}.json"
+    cache_key = (guild_id, period)
+    votes = _period_votes_cache.get(cache_key)
+    if votes is not None:
+        _period_votes_cache.move_to_end(cache_key)
+        return votes
     
-    with open(old_votes_file, 'w', encoding='utf-8') as f:
-        json.dump(votes, f, indent=2, ensure_ascii=False)
+    votes_file = get_votes_file(guild_id, period)
+    if guild_dir_exists(guild_id) and data_file_exists(votes_file):
+        votes = read_data_file(votes_file)
+    else:
+        votes = load_archived_votes(guild_id, period)
+    
+    if votes is not None:
+        votes = _votes_from_records(votes)
+        _period_votes_cache[cache_key] = votes
+        if len(_period_votes_cache) > PERIOD_CACHE_SIZE:
+            _period_votes_cache.popitem(last=False)
+    return votes
+
+
+def load_votes_in_period(guild_id: int, period: str = None) -> dict:
+    """Load the votes of the current period (period None or current) or of a past one.
     
-    return str(old_votes_file)
+    Returns:
+        Dictionary of user ID -> UserVotes (empty if the period doesn't exist)
+    """
+    if period is None or period == get_current_period(guild_id):
+        return load_votes(guild_id)
+    return load_period_votes(guild_id, period) or {}
 
 
-def find_user_votes_in_old_files(user_id: str, guild_id: int):
-    """Search through all old vote files to find user's votes, starting from most recent.
+def list_user_vote_periods(guild_id: int, user_id: str) -> list:
+    """Get the past periods in which a user rated games, newest first.
+    
+    Archived periods are answered from the archive index (users per period),
+    only the few closed periods not archived yet are read.
+    """
+    periods = set()
+    unindexed = list(_list_closed_period_files(guild_id))
+    for entry in _load_vote_archive_index(guild_id):
+        if "users" not in entry:
+            unindexed.append(entry["period"])  # Archived before users were indexed
+        elif user_id in entry["users"]:
+            periods.add(entry["period"])
+    for period in unindexed:
+        votes = load_period_votes(guild_id, period)
+        if votes and user_id in votes and votes[user_id].ratings:
+            periods.add(period)
+    return sorted(periods, key=_period_sort_key, reverse=True)
+
+
+def get_period_at(guild_id: int, date: str):
+    """Get the voting period that was running on a date.
     
     Args:
-        user_id: The user's ID as a string
         guild_id: The Discord guild (server) ID
+        date: Date (YYYY-MM-DD)
         
     Returns:
-        Tuple of (votes_dict, filename) if found, (None, None) otherwise
+        Period ID (possibly the current one), or None if no period had started yet
     """
-    guild_dir = get_guild_dir(guild_id)
-    old_files = list(guild_dir.glob("votes.old.*.json"))
-    if not old_files:
-        return None, None
-    
-    # Sort by filename (which includes date) - newest first
-    sorted_files = sorted(old_files, reverse=True)
+    periods = list_vote_periods(guild_id)
+    current = get_current_period(guild_id)
+    if current is not None:
+        periods.append(current)
+    started = [period for period in periods if period[:10] <= date]
+    return max(started, key=_period_sort_key) if started else None
+
+
+def _period_sort_key(period: str):
+    """Sort key of period IDs (YYYY-MM-DD then the -N suffix as a number)."""
+    n = period[11:]
+    return (period[:10], int(n) if n.isdigit() else 1)
+
+
+def load_archived_votes(guild_id: int, period: str):
+    """Load the votes of one archived voting period.
     
-    # Search through each file from newest to oldest
-    for old_file in sorted_files:
+    Args:
+        guild_id: The Discord guild (server) ID
+        period: Period ID
+        
+    Returns:
+        Dictionary of the user records of the period, or None if the period isn't archived
+    """
+    for attempt in range(2):
+        entries = _load_vote_archive_index(guild_id) if attempt == 0 else rebuild_vote_archive_index(guild_id)
+        entry = next((entry for entry in entries if entry["period"] == period), None)
+        if entry is None:
+            return None
         try:
-            with open(old_file, 'r', encoding='utf-8') as f:
-                old_votes = json.load(f)
-                
-            # Check if this user has votes in this file
-            if user_id in old_votes:
-                user_data = old_votes[user_id]
-                user_votes = user_data.get("votes", {})
-                # Only return if they actually have votes
-                if user_votes:
-                    return old_votes, str(old_file)
-        except (json.JSONDecodeError, IOError) as e:
-            # Skip corrupted or unreadable files
-            continue
-    
-    # No votes found in any old file
-    return None, None
+            with open(get_vote_archive_file(guild_id), 'rb') as f:
+                f.seek(entry["offset"])
+                record = loads_data(gzip.decompress(f.read(entry["length"])))
+            if record["period"] == period:
+                return record["votes"]
+        except (OSError, zlib.error, ValueError):
+            pass
+        # Index out of sync with the archive (interrupted rewrite): rebuild it and retry
+    return None
 
 
-def clear_votes(guild_id: int, save_backup=True):
-    """Clear all votes for a specific guild (used when starting a new voting period).
+def find_user_votes_in_archive(user_id: str, guild_id: int):
+    """Search the past voting periods for the user's most recent votes.
     
     Args:
+        user_id: The user's ID as a string
         guild_id: The Discord guild (server) ID
-        save_backup: Whether to save a backup before clearing
+        
+    Returns:
+        Tuple of (votes of the period by user ID, period) if found, (None, None) otherwise
     """
-    if save_backup:
-        save_old_votes(guild_id)
-    save_votes({}, guild_id)
+    periods = list_user_vote_periods(guild_id, user_id)
+    if not periods:
+        return None, None
+    return load_period_votes(guild_id, periods[0]), periods[0]
 
 
-def get_user_language(user_id: str, guild_id: int) -> str:
-    """Get user's preferred language from votes data for a specific guild.
+def collect_vote_periods(guild_id: int) -> int:
+    """Move the votes files of closed periods into the vote archive (background cleanup).
     
     Args:
-        user_id: The user's ID as a string
         guild_id: The Discord guild (server) ID
         
     Returns:
-        Language code ('en' or 'fr'), defaults to 'en'
+        Number of periods archived
     """
-    votes = load_votes(guild_id)
-    user_data = votes.get(str(user_id), {})
-    return user_data.get("language", "en")
+    period_files = _list_closed_period_files(guild_id)
+    for period, votes_file in sorted(period_files.items()):
+        votes = read_data_file(votes_file)
+        if votes:
+            append_vote_archive(guild_id, period, votes)
+        votes_file.unlink()
+    return len(period_files)
 
 
-def set_user_language(user_id: str, lang: str, guild_id: int) -> bool:
-    """Set user's preferred language in votes data for a specific guild.
+def prune_vote_archive(guild_id: int, keep_days: int = 30) -> int:
+    """Drop archived periods older than keep_days.
+    
+    The kept gzip members are copied as-is (no recompression) into a new archive.
     
     Args:
-        user_id: The user's ID as a string
-        lang: Language code ('en' or 'fr')
         guild_id: The Discord guild (server) ID
+        keep_days: Number of days of history to keep
         
     Returns:
-        True if language is valid and set, False otherwise
+        Number of periods removed
     """
-    if lang not in ["en", "fr"]:
-        return False
+    entries = _load_vote_archive_index(guild_id)
+    cutoff = (datetime.now() - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+    kept = [entry for entry in entries if entry["period"] >= cutoff]
+    archive_file = get_vote_archive_file(guild_id)
+    if not archive_file.exists() or (len(kept) == len(entries) and archive_file.stat().st_size == sum(e["length"] for e in entries)):
+        return 0
     
-    votes = load_votes(guild_id)
-    user_id_str = str(user_id)
+    tmp_file = archive_file.with_name(archive_file.name + ".tmp")
+    new_entries = []
+    with open(archive_file, 'rb') as src, open(tmp_file, 'wb') as dst:
+        for entry in kept:
+            src.seek(entry["offset"])
+            new_entries.append({**entry, "offset": dst.tell()})
+            dst.write(src.read(entry["length"]))
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp_file, archive_file)
+    _save_vote_archive_index(guild_id, new_entries)
+    for entry in entries:
+        if entry["period"] < cutoff:
+            _period_votes_cache.pop((guild_id, entry["period"]), None)
+    return len(entries) - len(kept)
+
+
+def rewrite_vote_archive(guild_id: int, transform) -> int:
+    """Rewrite the archived periods of a guild through a function (used by schema migrations).
     
-    if user_id_str not in votes:
-        votes[user_id_str] = {
-            "username": "",
-            "votes": {},
-            "language": lang
-        }
-    else:
-        votes[user_id_str]["language"] = lang
+    Unchanged periods are copied as-is, the new archive is swapped in once complete.
     
-    save_votes(votes, guild_id)
-    return True
+    Args:
+        guild_id: The Discord guild (server) ID
+        transform: Function taking the votes of a period and returning them
+            updated, or None if they don't change
+    
+    Returns:
+        Number of periods rewritten
+    """
+    entries = _load_vote_archive_index(guild_id)
+    archive_file = get_vote_archive_file(guild_id)
+    if not entries or not archive_file.exists():
+        return 0
+    
+    tmp_file = archive_file.with_name(archive_file.name + ".tmp")
+    new_entries = []
+    rewritten = 0
+    with open(archive_file, 'rb') as src, open(tmp_file, 'wb') as dst:
+        for entry in entries:
+            src.seek(entry["offset"])
+            record = src.read(entry["length"])
+            votes = transform(loads_data(gzip.decompress(record))["votes"])
+            if votes is not None:
+                record = gzip.compress(dumps_data({"period": entry["period"], "votes": votes}))
+                entry = {**entry, "users": _period_voters(votes)}
+                rewritten += 1
+            new_entries.append({**entry, "offset": dst.tell(), "length": len(record)})
+            dst.write(record)
+        dst.flush()
+        os.fsync(dst.fileno())
+    if not rewritten:
+        tmp_file.unlink()
+        return 0
+    os.replace(tmp_file, archive_file)
+    _save_vote_archive_index(guild_id, new_entries)
+    for entry in entries:
+        _period_votes_cache.pop((guild_id, entry["period"]), None)
+    return rewritten
+
+
+def clear_votes(guild_id: int, save_backup=True):
+    """Clear all votes for a specific guild (used when starting a new voting period).
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        save_backup: Whether to keep the current votes as a past period
+            (otherwise they are deleted)
+        
+    Returns:
+        ID of the closed period if the votes were kept, None otherwise
+    """
+    if save_backup:
+        return advance_vote_period(guild_id)
+    save_votes({}, guild_id)
+    return None
 
 
 def load_server_config(guild_id: int):
@@ -329,38 +1487,48 @@ def load_server_config(guild_id: int):
         guild_id: The Discord guild (server) ID
         
     Returns:
-        Dictionary with server configuration (reminder_day, reminder_hour, reminder_minute, etc.)
+        ServerConfig (reminder_day, reminder_hour, reminder_minute, etc.), the
+        default configuration if the server has none
     """
     config_file = get_config_file(guild_id)
-    if config_file.exists():
+    if guild_dir_exists(guild_id) and config_file.exists():
         with open(config_file, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            # Ensure game_management_roles exists (backward compatibility)
-            if "game_management_roles" not in config:
-                config["game_management_roles"] = []
-            return config
-    # Default configuration
-    return {
-        "reminder_day": "sun",  # Sunday
-        "reminder_hour": 20,     # 8 PM
-        "reminder_minute": 0,
-        "game_night_day": None,  # None means no recurring game night
-        "game_night_hour": None,
-        "game_night_minute": None,
-        "game_management_roles": []  # Empty list means only admins can manage games
-    }
+            return ServerConfig.from_dict(json.load(f))
+    return ServerConfig()
 
 
-def save_server_config(config: dict, guild_id: int):
+def save_server_config(config: ServerConfig, guild_id: int, expected_version=ANY_VERSION) -> bool:
     """Save server configuration to JSON file for a specific guild.
     
     Args:
-        config: Dictionary with server configuration
+        config: ServerConfig of the server
         guild_id: The Discord guild (server) ID
+        expected_version: Only save if the configuration is still at this version (see get_document_version)
+    
+    Returns:
+        True if saved, False if the configuration was saved by someone else since expected_version
     """
-    config_file = get_config_file(guild_id)
-    with open(config_file, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=2, ensure_ascii=False)
+    with _guild_lock(guild_id):
+        if not _check_version(guild_id, "config", expected_version):
+            return False
+        ensure_guild_dir(guild_id)
+        _write_json_file(get_config_file(guild_id), config.to_dict())
+        _bump_version(guild_id, "config")
+    return True
+
+
+def update_server_config(guild_id: int, mutate):
+    """Change a server's configuration without overwriting concurrent changes of other fields.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        mutate: Function setting fields of the ServerConfig (may be called again
+            if another change got in first)
+    
+    Returns:
+        What mutate returned
+    """
+    return _update_document(guild_id, "config", load_server_config, save_server_config, mutate, ServerConfig.to_dict)
 
 
 def load_schedules(guild_id: int):
@@ -370,186 +1538,155 @@ def load_schedules(guild_id: int):
         guild_id: The Discord guild (server) ID
         
     Returns:
-        List of scheduled game nights (each with id, datetime, description, etc.)
+        List of Schedule (id, datetime, description, created_at)
     """
     schedules_file = get_schedules_file(guild_id)
-    if schedules_file.exists():
+    if guild_dir_exists(guild_id) and schedules_file.exists():
         with open(schedules_file, 'r', encoding='utf-8') as f:
             schedules = json.load(f)
             # Ensure it's a list
             if isinstance(schedules, list):
-                return schedules
+                return [Schedule.from_dict(schedule) for schedule in schedules]
             return []
     return []
 
 
-def save_schedules(schedules: list, guild_id: int):
+def save_schedules(schedules: list, guild_id: int, expected_version=ANY_VERSION) -> bool:
     """Save scheduled game nights to JSON file for a specific guild.
     
     Args:
-        schedules: List of scheduled game nights
+        schedules: List of Schedule
         guild_id: The Discord guild (server) ID
+        expected_version: Only save if the schedules are still at this version (see get_document_version)
+    
+    Returns:
+        True if saved, False if the schedules were saved by someone else since expected_version
     """
-    schedules_file = get_schedules_file(guild_id)
-    with open(schedules_file, 'w', encoding='utf-8') as f:
-        json.dump(schedules, f, indent=2, ensure_ascii=False)
+    with _guild_lock(guild_id):
+        if not _check_version(guild_id, "schedules", expected_version):
+            return False
+        ensure_guild_dir(guild_id)
+        _write_json_file(get_schedules_file(guild_id), [schedule.to_dict() for schedule in schedules])
+        _bump_version(guild_id, "schedules")
+    return True
+
 
+def _schedules_snapshot(schedules: list) -> list:
+    return [schedule.to_dict() for schedule in schedules]
 
-def add_schedule(guild_id: int, schedule_datetime: datetime, description: str = None):
-    """Add a new scheduled game night.
+
+def update_schedules(guild_id: int, mutate):
+    """Change a server's scheduled game nights without overwriting concurrent changes.
     
     Args:
         guild_id: The Discord guild (server) ID
-        schedule_datetime: datetime object for when the game night is scheduled
-        description: Optional description for the game night
-        
+        mutate: Function changing the list of Schedule in place (may be called
+            again if another change got in first)
+    
     Returns:
-        The ID of the newly created schedule
+        What mutate returned
     """
-    schedules = load_schedules(guild_id)
-    
-    # Generate ID (use timestamp as ID for uniqueness)
-    schedule_id = int(schedule_datetime.timestamp())
-    
-    new_schedule = {
-        "id": schedule_id,
-        "datetime": schedule_datetime.isoformat(),
-        "description": description or "",
-        "created_at": datetime.now().isoformat()
-    }
-    
-    schedules.append(new_schedule)
-    # Sort by datetime
-    schedules.sort(key=lambda x: x["datetime"])
-    save_schedules(schedules, guild_id)
-    
-    return schedule_id
+    return _update_document(guild_id, "schedules", load_schedules, save_schedules, mutate, _schedules_snapshot)
 
 
-def remove_schedule(guild_id: int, schedule_id: int):
-    """Remove a scheduled game night by ID.
+def update_guild_document(guild_id: int, document: str, mutate):
+    """Change a guild document given by name (see update_votes, update_server_game_list,
+    update_server_config and update_schedules).
     
     Args:
         guild_id: The Discord guild (server) ID
-        schedule_id: The ID of the schedule to remove
-        
+        document: One of GUILD_DOCUMENTS
+        mutate: Function changing the loaded document in place
+    
     Returns:
-        True if schedule was found and removed, False otherwise
+        What mutate returned
+    
+    Raises:
+        ValueError: If the document name is unknown
     """
-    schedules = load_schedules(guild_id)
-    original_count = len(schedules)
-    schedules = [s for s in schedules if s.get("id") != schedule_id]
+    updates = {
+        "votes": update_votes,
+        "games": update_server_game_list,
+        "config": update_server_config,
+        "schedules": update_schedules,
+    }
+    if document not in updates:
+        raise ValueError(f"Unknown guild document: {document}")
+    return updates[document](guild_id, mutate)
+
+
+def _write_json_object(write, items, indent: str = "  "):
+    """Write (key, value) pairs as a JSON object, one member per line.
     
-    if len(schedules) < original_count:
-        save_schedules(schedules, guild_id)
-        return True
-    return False
+    Each value is serialized on its own, so only one member is in memory as text at a time.
+    """
+    write("{")
+    separator = "\n"
+    for key, value in items:
+        write(f"{separator}{indent}  {json.dumps(key, ensure_ascii=False)}: {json.dumps(value, ensure_ascii=False)}")
+        separator = ",\n"
+    write("}" if separator == "\n" else f"\n{indent}}}")
 
 
-def export_guild_data(guild_id: int) -> dict:
-    """Export all guild data (shared games, votes, config, schedules) to a dictionary.
+def write_guild_export(guild_id: int, fp, all_games: bool = False):
+    """Stream all guild data (games, votes, voters' profiles, config, schedules) as JSON into a binary file.
     
-    Note: Games are now centralized (shared across all servers), but are still included in exports.
+    Sections are written one after the other and values one game / one user at a
+    time, so the export is never held in memory as a whole.
     
     Args:
         guild_id: The Discord guild (server) ID
-        
-    Returns:
-        Dictionary containing all guild data
+        fp: Binary file object to write to (e.g. a gzip.GzipFile)
+        all_games: If True, include the whole shared catalog. If False, only the
+            games enabled on the server or rated in its votes (ratings are stored
+            by game ID: the games carry their ID so an import can map them).
     """
-    return {
-        "guild_id": guild_id,
-        "export_date": datetime.now().isoformat(),
-        "shared_games": load_shared_games(),  # Load shared games (all definitions)
-        "server_game_list": load_server_game_list(guild_id),  # Load server's game list
-        "votes": load_votes(guild_id),
-        "config": load_server_config(guild_id),
-        "schedules": load_schedules(guild_id)
-    }
+    write = lambda text: fp.write(text.encode('utf-8'))
+    catalog = _get_shared_catalog()
+    server_game_list = load_server_game_list(guild_id)
+    votes = load_votes(guild_id)
+    
+    if all_games:
+        game_keys = catalog.keys()
+    else:
+        game_keys = set(server_game_list)
+        for user_votes in votes.values():
+            game_keys.update(get_game_key_by_id(game_id) for game_id in user_votes.rated_games())
+        game_keys = sorted(key for key in game_keys if key in catalog)
+    
+    write(f'{{\n  "guild_id": {json.dumps(guild_id)},\n  "export_date": {json.dumps(datetime.now().isoformat())},\n')
+    write('  "shared_games": ')
+    _write_json_object(write, ((game_key, dict(catalog[game_key])) for game_key in game_keys))
+    write(f',\n  "server_game_list": {json.dumps(server_game_list, ensure_ascii=False)},\n  "votes": ')
+    _write_json_object(write, ((user_id, user_votes.to_dict()) for user_id, user_votes in votes.items()))
+    write(',\n  "users": ')
+    _write_json_object(write, ((user_id, profile) for user_id in votes if (profile := get_user_profile(user_id))))
+    write(',\n  "config": ')
+    _write_json_object(write, load_server_config(guild_id).to_dict().items())
+    write(',\n  "schedules": [')
+    separator = "\n"
+    for schedule in load_schedules(guild_id):
+        write(f"{separator}    {json.dumps(schedule.to_dict(), ensure_ascii=False)}")
+        separator = ",\n"
+    write("]\n}\n" if separator == "\n" else "\n  ]\n}\n")
 
 
-def import_guild_data(guild_id: int, data: dict, overwrite: bool = False) -> dict:
-    """Import guild data from a dictionary.
-    
-    Note: Games are now centralized (shared across all servers), so importing games affects all servers.
+def export_guild_data(guild_id: int, all_games: bool = False, compress: bool = False):
+    """Export all guild data to a temporary file (in memory while small, on disk past EXPORT_SPOOL_SIZE).
     
     Args:
         guild_id: The Discord guild (server) ID
-        data: Dictionary containing data to import (from export_guild_data)
-        overwrite: If True, completely replace existing data. If False, merge data.
+        all_games: If True, include the whole shared catalog instead of the server's games only
+        compress: If True, gzip the export
         
     Returns:
-        Dictionary with import results: {"games": count, "votes": count, "config": bool, "schedules": count, "errors": []}
+        SpooledTemporaryFile positioned at the start of the export (to be closed by the caller)
     """
-    results = {
-        "games": 0,
-        "votes": 0,
-        "config": False,
-        "schedules": 0,
-        "errors": []
-    }
-    
-    try:
-        # Import games (shared across all servers)
-        if "shared_games" in data or "games" in data:
-            # Support both old format ("games") and new format ("shared_games")
-            games_data = data.get("shared_games") or data.get("games", {})
-            shared_games = load_shared_games()
-            if overwrite:
-                save_shared_games(games_data)
-                results["games"] = len(games_data)
-            else:
-                # Merge: existing games take precedence, add new ones
-                merged_games = {**games_data, **shared_games}
-                save_shared_games(merged_games)
-                results["games"] = len(games_data)
-        
-        # Import server game list if provided
-        if "server_game_list" in data:
-            save_server_game_list(data["server_game_list"], guild_id)
-        
-        # Import votes
-        if "votes" in data:
-            if overwrite:
-                save_votes(data["votes"], guild_id)
-                results["votes"] = len(data["votes"])
-            else:
-                # Merge: existing votes take precedence, add new users
-                existing_votes = load_votes(guild_id)
-                merged_votes = {**data["votes"], **existing_votes}
-                save_votes(merged_votes, guild_id)
-                results["votes"] = len(data["votes"])
-        
-        # Import config
-        if "config" in data:
-            if overwrite:
-                save_server_config(data["config"], guild_id)
-                results["config"] = True
-            else:
-                # Merge: existing config takes precedence, add missing keys
-                existing_config = load_server_config(guild_id)
-                merged_config = {**data["config"], **existing_config}
-                save_server_config(merged_config, guild_id)
-                results["config"] = True
-        
-        # Import schedules
-        if "schedules" in data:
-            if overwrite:
-                save_schedules(data["schedules"], guild_id)
-                results["schedules"] = len(data["schedules"])
-            else:
-                # Merge: combine lists, remove duplicates by ID
-                existing_schedules = load_schedules(guild_id)
-                existing_ids = {s.get("id") for s in existing_schedules}
-                new_schedules = [s for s in data["schedules"] if s.get("id") not in existing_ids]
-                merged_schedules = existing_schedules + new_schedules
-                # Sort by datetime
-                merged_schedules.sort(key=lambda x: x.get("datetime", ""))
-                save_schedules(merged_schedules, guild_id)
-                results["schedules"] = len(new_schedules)
-                
-    except Exception as e:
-        results["errors"].append(str(e))
-    
-    return results
-
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+    if compress:
+        with gzip.GzipFile(fileobj=spool, mode='wb') as gz:
+            write_guild_export(guild_id, gz, all_games=all_games)
+    else:
+        write_guild_export(guild_id, spool, all_games=all_games)
+    spool.seek(0)
+    return spool
@@ -0,0 +1,311 @@
+"""Integrity checker (fsck) for the bot data.
+
+Checks one server at a time, so memory does not grow with the number of
+servers (the shared catalog and the user profiles are checked once): every
+file must be readable, votes and server game lists must point to games of the
+shared catalog, schedules must be well formed and the vote archive must match
+its index. Problems are returned as issue dictionaries
+(one JSON line each in the report of `python cli.py check`), and most of them
+can be repaired.
+"""
+import gzip
+import json
+import shutil
+import zlib
+from datetime import datetime
+from .config import get_games_file, get_period_file, get_config_file, get_schedules_file, get_meta_file, get_import_journal_file
+from .config import get_guild_dir, get_vote_archive_file, get_vote_archive_index_file, get_shared_games_file, get_shared_games_journal_file
+from .config import guild_dir_exists, USERS_DIR
+from .data_manager import get_shared_game, load_shared_games, save_server_game_list, save_schedules, rebuild_vote_archive_index
+from .data_manager import get_game_key_by_id, read_data_file, dumps_data, loads_data
+from .atomic_io import atomic_write, atomic_write_text
+from .models import Schedule, encode_ratings, iter_ratings
+from .data_import import validate_game, validate_config, validate_schedule, validate_user_profile, recover_guild_import
+from .migrations import SCHEMA_VERSION, get_schema_version, migrate_guild
+
+_UNREADABLE = object()
+
+
+def _issue(guild_id, path, check: str, detail: str, repaired: bool = False) -> dict:
+    return {"guild_id": guild_id, "file": path.name, "check": check, "detail": detail, "repaired": repaired}
+
+
+def _read_json(path, guild_id, issues: list, repair: bool):
+    """Read a JSON file (or a votes file in any data format), reporting it if unreadable (repair sets it aside as *.corrupt).
+    
+    Returns:
+        The parsed content, None if the file doesn't exist, or _UNREADABLE
+    """
+    if not path.exists():
+        return None
+    try:
+        return read_data_file(path)
+    except (OSError, ValueError) as e:
+        if repair:
+            path.replace(path.with_name(path.name + ".corrupt"))
+        issues.append(_issue(guild_id, path, "corrupt_file", str(e), repair))
+        return _UNREADABLE
+
+
+def _write_json(path, data):
+    atomic_write_text(path, json.dumps(data, indent=2, ensure_ascii=False))
+
+
+def _is_json(line: str) -> bool:
+    try:
+        json.loads(line)
+        return True
+    except ValueError:
+        return False
+
+
+def check_catalog() -> list:
+    """Check the shared catalog: readable files, valid game records and unique game IDs.
+    
+    Returns:
+        List of issues (guild_id None), reported only: the catalog is never repaired automatically
+    """
+    issues = []
+    if _read_json(get_shared_games_file(), None, issues, repair=False) is _UNREADABLE:
+        return issues
+    
+    journal_file = get_shared_games_journal_file()
+    if journal_file.exists():
+        with open(journal_file, 'r', encoding='utf-8') as f:
+            torn = sum(1 for line in f if not _is_json(line))
+        if torn:
+            issues.append(_issue(None, journal_file, "torn_journal", f"{torn} unreadable line(s), ignored when loading"))
+    
+    owners = {}
+    for game_key, game in load_shared_games().items():
+        error = validate_game(game)
+        if error:
+            issues.append(_issue(None, get_shared_games_file(), "invalid_game", f"{game_key}: {error}"))
+        if game.get("id") is not None:
+            owners.setdefault(game["id"], []).append(game_key)
+    for game_id, game_keys in owners.items():
+        if len(game_keys) > 1:
+            issues.append(_issue(None, get_shared_games_file(), "duplicate_game_id", f"ID {game_id}: {', '.join(game_keys)}"))
+    return issues
+
+
+def check_user_profiles(repair: bool = False) -> list:
+    """Check the user profiles files: readable objects of valid profiles.
+    
+    Args:
+        repair: If True, unreadable files are set aside as *.corrupt and invalid profiles dropped
+    
+    Returns:
+        List of issues (guild_id None)
+    """
+    issues = []
+    if not USERS_DIR.is_dir():
+        return issues
+    for path in sorted(USERS_DIR.glob("*.json")):
+        profiles = _read_json(path, None, issues, repair)
+        if profiles is _UNREADABLE:
+            continue
+        if not isinstance(profiles, dict):
+            issues.append(_issue(None, path, "invalid_format", "expected an object of user profiles", repair))
+            if repair:
+                _write_json(path, {})
+            continue
+        invalid = [user_id for user_id, profile in profiles.items() if validate_user_profile(profile)]
+        if invalid:
+            issues.append(_issue(None, path, "invalid_profile", f"invalid profile(s) of user(s) {', '.join(invalid[:10])}", repair))
+            if repair:
+                _write_json(path, {user_id: profile for user_id, profile in profiles.items() if user_id not in invalid})
+    return issues
+
+
+def _check_game_list(guild_id: int, issues: list, repair: bool):
+    """games.json: a list of existing, unique game keys."""
+    path = get_games_file(guild_id)
+    game_keys = _read_json(path, guild_id, issues, repair)
+    if game_keys is None or game_keys is _UNREADABLE:
+        return
+    if not isinstance(game_keys, list) or not all(isinstance(game_key, str) for game_key in game_keys):
+        issues.append(_issue(guild_id, path, "invalid_format", "expected a list of game keys"))
+        return
+    missing = [game_key for game_key in game_keys if get_shared_game(game_key) is None]
+    duplicates = len(game_keys) - len(set(game_keys))
+    if missing:
+        issues.append(_issue(guild_id, path, "missing_game", f"{len(missing)} game(s) not in the shared catalog: {', '.join(missing[:10])}", repair))
+    if duplicates:
+        issues.append(_issue(guild_id, path, "duplicate_game", f"{duplicates} duplicate game key(s)", repair))
+    if repair and (missing or duplicates):
+        missing = set(missing)
+        save_server_game_list([game_key for game_key in dict.fromkeys(game_keys) if game_key not in missing], guild_id)
+
+
+def _check_votes_file(guild_id: int, path, issues: list, repair: bool):
+    """votes.{period}.json: user records whose ratings point to existing game IDs and are in 0-5."""
+    votes = _read_json(path, guild_id, issues, repair)
+    if votes is None or votes is _UNREADABLE:
+        return
+    if not isinstance(votes, dict):
+        issues.append(_issue(guild_id, path, "invalid_format", "expected an object of user records"))
+        return
+    
+    orphans = {}
+    invalid_users = []
+    invalid_ratings = 0
+    for user_id, user_data in list(votes.items()):
+        if not isinstance(user_data, dict) or not isinstance(user_data.get("ratings", ""), str):
+            invalid_users.append(user_id)
+            if repair:
+                del votes[user_id]
+            continue
+        try:
+            ratings = list(iter_ratings(user_data.get("ratings", "")))
+        except ValueError:
+            invalid_users.append(user_id)
+            if repair:
+                del votes[user_id]
+            continue
+        kept = {}
+        for game_id, rating in ratings:
+            if rating not in "12345":
+                invalid_ratings += 1
+            elif get_game_key_by_id(game_id) is None:
+                orphans[game_id] = orphans.get(game_id, 0) + 1
+            else:
+                kept[game_id] = int(rating)
+        if repair:
+            user_data["ratings"] = encode_ratings(kept)
+    
+    for game_id, count in orphans.items():
+        issues.append(_issue(guild_id, path, "orphan_vote", f"{count} rating(s) of game ID {game_id}, not in the shared catalog", repair))
+    if invalid_ratings:
+        issues.append(_issue(guild_id, path, "invalid_rating", f"{invalid_ratings} rating(s) not an integer from 0 to 5", repair))
+    if invalid_users:
+        issues.append(_issue(guild_id, path, "invalid_user", f"invalid record(s) of user(s) {', '.join(invalid_users[:10])}", repair))
+    if repair and (orphans or invalid_ratings or invalid_users):
+        atomic_write(path, dumps_data(votes))
+
+
+def _check_schedules(guild_id: int, issues: list, repair: bool):
+    """schedules.json: well formed schedules with unique IDs and ISO datetimes."""
+    path = get_schedules_file(guild_id)
+    schedules = _read_json(path, guild_id, issues, repair)
+    if schedules is None or schedules is _UNREADABLE:
+        return
+    if not isinstance(schedules, list):
+        issues.append(_issue(guild_id, path, "invalid_format", "expected a list of schedules", repair))
+        if repair:
+            save_schedules([], guild_id)
+        return
+    
+    kept = []
+    seen_ids = set()
+    for schedule in schedules:
+        error = validate_schedule(schedule)
+        if error is None:
+            try:
+                datetime.fromisoformat(schedule["datetime"])
+            except ValueError:
+                error = "invalid datetime"
+        if error is None and schedule["id"] in seen_ids:
+            error = "duplicate id"
+        if error:
+            issues.append(_issue(guild_id, path, "invalid_schedule", f"{schedule.get('id') if isinstance(schedule, dict) else schedule}: {error}", repair))
+        else:
+            seen_ids.add(schedule["id"])
+            kept.append(schedule)
+    if repair and len(kept) != len(schedules):
+        save_schedules([Schedule.from_dict(schedule) for schedule in kept], guild_id)
+
+
+def _check_vote_archive(guild_id: int, issues: list, repair: bool):
+    """votes.archive.jsonl.gz: every index entry is a readable gzip member of its period, and nothing is unindexed."""
+    index_path = get_vote_archive_index_file(guild_id)
+    archive_path = get_vote_archive_file(guild_id)
+    entries = _read_json(index_path, guild_id, issues, repair)
+    if entries is _UNREADABLE:
+        # The index is rebuilt from the archive itself
+        if repair:
+            rebuild_vote_archive_index(guild_id)
+        return
+    if entries is None and not archive_path.exists():
+        return
+    
+    entries = entries or []
+    archive_size = archive_path.stat().st_size if archive_path.exists() else 0
+    bad_periods = []
+    if archive_path.exists():
+        with open(archive_path, 'rb') as f:
+            # One member in memory at a time
+            for entry in entries:
+                try:
+                    f.seek(entry["offset"])
+                    record = loads_data(gzip.decompress(f.read(entry["length"])))
+                    if record["period"] != entry["period"]:
+                        bad_periods.append(entry["period"])
+                except (OSError, EOFError, KeyError, TypeError, zlib.error, ValueError):
+                    bad_periods.append(entry.get("period", "?") if isinstance(entry, dict) else "?")
+    else:
+        bad_periods = [entry.get("period", "?") for entry in entries]
+    indexed_end = max((entry["offset"] + entry["length"] for entry in entries if isinstance(entry, dict) and "offset" in entry), default=0)
+    
+    if bad_periods:
+        issues.append(_issue(guild_id, archive_path, "corrupt_archive", f"unreadable period(s): {', '.join(map(str, bad_periods[:10]))}", repair))
+    if indexed_end < archive_size:
+        issues.append(_issue(guild_id, archive_path, "unindexed_archive", f"{archive_size - indexed_end} byte(s) after the last indexed period", repair))
+    if repair and (bad_periods or indexed_end < archive_size):
+        entries = rebuild_vote_archive_index(guild_id)
+        indexed_end = max((entry["offset"] + entry["length"] for entry in entries), default=0)
+        if indexed_end < archive_size:
+            # Unreadable tail: set aside, the archive is cut after its last readable period
+            with open(archive_path, 'r+b') as f:
+                f.seek(indexed_end)
+                with open(archive_path.with_name(archive_path.name + ".corrupt"), 'wb') as corrupt:
+                    shutil.copyfileobj(f, corrupt)
+                f.truncate(indexed_end)
+
+
+def check_guild(guild_id: int, repair: bool = False) -> list:
+    """Check (and optionally repair) all the files of one server.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        repair: If True, fix what can be fixed: unreadable files are set aside
+            as *.corrupt, references to missing games and invalid records are
+            dropped, archive indexes rebuilt, pending imports and migrations applied
+    
+    Returns:
+        List of issues, each with guild_id, file, check, detail and repaired
+    """
+    issues = []
+    if not guild_dir_exists(guild_id):
+        return issues
+    guild_dir = get_guild_dir(guild_id)
+    
+    journal_file = get_import_journal_file(guild_id)
+    if journal_file.exists() or any(guild_dir.glob("*.import")):
+        issues.append(_issue(guild_id, journal_file, "pending_import", "interrupted import", repair))
+        if repair:
+            recover_guild_import(guild_id)
+    
+    meta = _read_json(get_meta_file(guild_id), guild_id, issues, repair)
+    if meta is not _UNREADABLE and get_schema_version(guild_id) < SCHEMA_VERSION:
+        issues.append(_issue(guild_id, get_meta_file(guild_id), "outdated_schema", f"schema v{get_schema_version(guild_id)}, current is v{SCHEMA_VERSION}", repair))
+        if repair:
+            migrate_guild(guild_id)
+    
+    _check_game_list(guild_id, issues, repair)
+    
+    period = _read_json(get_period_file(guild_id), guild_id, issues, repair)
+    if period is not None and period is not _UNREADABLE and not (isinstance(period, dict) and isinstance(period.get("current"), str)):
+        issues.append(_issue(guild_id, get_period_file(guild_id), "invalid_format", "expected {\"current\": period ID}"))
+    for votes_file in sorted(guild_dir.glob("votes.[0-9]*.json")):
+        _check_votes_file(guild_id, votes_file, issues, repair)
+    
+    config = _read_json(get_config_file(guild_id), guild_id, issues, repair)
+    if config is not None and config is not _UNREADABLE:
+        error = validate_config(config)
+        if error:
+            issues.append(_issue(guild_id, get_config_file(guild_id), "invalid_config", error))
+    
+    _check_schedules(guild_id, issues, repair)
+    _check_vote_archive(guild_id, issues, repair)
+    return issues
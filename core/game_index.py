@@ -0,0 +1,327 @@
+"""In-memory indexes and views over game definitions."""
+from bisect import bisect_left, insort
+from collections.abc import Mapping
+from .models import Game
+
+# Sort keys for each supported game order
+# (the game key is appended to every entry, so ties are always broken the same way)
+GAME_ORDERS = {
+    "id": lambda game: (game.id or 9999, game.name),
+    "name": lambda game: (game.name.lower(), game.id or 9999),
+    "players": lambda game: (game.min_players, game.max_players, game.id or 9999),
+}
+
+
+def freeze_game(game) -> Game:
+    """Make a read-only game record (see core.models.Game) to be shared between servers."""
+    return game if isinstance(game, Game) else Game.from_dict(game)
+
+
+class GuildGames(Mapping):
+    """Read-only mapping of the games enabled on a server.
+    
+    Holds references to the shared catalog records instead of copies, so every
+    server enabling a game points to the same record.
+    """
+    
+    __slots__ = ("_games",)
+    
+    def __init__(self, game_keys, records):
+        self._games = {game_key: records[game_key] for game_key in game_keys if game_key in records}
+    
+    def __getitem__(self, game_key):
+        return self._games[game_key]
+    
+    def __iter__(self):
+        return iter(self._games)
+    
+    def __len__(self):
+        return len(self._games)
+    
+    def __contains__(self, game_key):
+        return game_key in self._games
+    
+    def __repr__(self):
+        return f"GuildGames({list(self._games)})"
+
+
+class SortedGameOrder:
+    """Game keys kept sorted by one of GAME_ORDERS, updated with bisect instead of re-sorting."""
+    
+    __slots__ = ("sort_key", "entries", "positions")
+    
+    def __init__(self, order: str, games: dict):
+        self.sort_key = GAME_ORDERS[order]
+        self.positions = {key: self.sort_key(game) for key, game in games.items()}
+        self.entries = sorted((position, key) for key, position in self.positions.items())
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __contains__(self, game_key):
+        return game_key in self.positions
+    
+    def keys(self) -> list:
+        """Get the game keys in order."""
+        return [key for _, key in self.entries]
+    
+    def add(self, game_key: str, game: Game):
+        """Insert a game, or move it if its sort key changed."""
+        position = self.sort_key(game)
+        old_position = self.positions.get(game_key)
+        if old_position == position:
+            return
+        if old_position is not None:
+            self.remove(game_key)
+        self.positions[game_key] = position
+        insort(self.entries, (position, game_key))
+    
+    def remove(self, game_key: str):
+        """Remove a game (no-op if it is not indexed)."""
+        position = self.positions.pop(game_key, None)
+        if position is None:
+            return
+        i = bisect_left(self.entries, (position, game_key))
+        if i < len(self.entries) and self.entries[i] == (position, game_key):
+            del self.entries[i]
+
+
+class GameOrderIndex:
+    """All game orders for one set of games (e.g. the games enabled on a server)."""
+    
+    __slots__ = ("orders",)
+    
+    def __init__(self, games: dict):
+        self.orders = {order: SortedGameOrder(order, games) for order in GAME_ORDERS}
+    
+    def __len__(self):
+        return len(self.orders["id"])
+    
+    def __contains__(self, game_key):
+        return game_key in self.orders["id"]
+    
+    def keys(self, order: str = "id") -> list:
+        """Get the game keys sorted by the given order."""
+        return self.orders[order].keys()
+    
+    def add(self, game_key: str, game: Game):
+        """Add or update a game in every order."""
+        for sorted_order in self.orders.values():
+            sorted_order.add(game_key, game)
+    
+    def remove(self, game_key: str):
+        """Remove a game from every order."""
+        for sorted_order in self.orders.values():
+            sorted_order.remove(game_key)
+
+
+class GameLookupIndex:
+    """ID and name lookups over the shared game catalog, plus the next free game ID."""
+    
+    __slots__ = ("by_id", "by_name", "next_id")
+    
+    def __init__(self, games: dict):
+        self.by_id = {}
+        self.by_name = {}
+        self.next_id = 1
+        for game_key, game in games.items():
+            self.add(game_key, game)
+    
+    def add(self, game_key: str, game: Game, old_game: Game = None):
+        """Index a new game, or re-index an updated one (old_game is its previous data)."""
+        if old_game is not None:
+            self.remove(game_key, old_game)
+        game_id = game.id
+        if game_id:
+            self.by_id[game_id] = game_key
+            if game_id >= self.next_id:
+                self.next_id = game_id + 1
+        self.by_name[game.name.lower()] = game_key
+    
+    def remove(self, game_key: str, game: Game):
+        """Remove a game (IDs are never handed out again)."""
+        if self.by_id.get(game.id) == game_key:
+            del self.by_id[game.id]
+        name_key = game.name.lower()
+        if self.by_name.get(name_key) == game_key:
+            del self.by_name[name_key]
+
+
+def _trigrams(text: str) -> set:
+    """Get the trigrams of a text, each word padded so 1-2 letter prefixes also match."""
+    result = set()
+    for word in text.lower().split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            result.add(padded[i:i + 3])
+    return result
+
+
+class GameSearchIndex:
+    """Trigram index over game names and tags for fuzzy search (autocomplete)."""
+    
+    __slots__ = ("name_trigrams", "tag_trigrams", "names")
+    
+    # Name matches count more than tag matches
+    NAME_WEIGHT = 2
+    TAG_WEIGHT = 1
+    
+    def __init__(self, games: dict):
+        self.name_trigrams = {}
+        self.tag_trigrams = {}
+        self.names = {}
+        for game_key, game in games.items():
+            self.add(game_key, game)
+    
+    @staticmethod
+    def _tag_text(game: Game) -> str:
+        return " ".join(game.tags)
+    
+    def add(self, game_key: str, game: Game, old_game: Game = None):
+        """Index a new game, or re-index an updated one (old_game is its previous data)."""
+        if old_game is not None:
+            self.remove(game_key, old_game)
+        self.names[game_key] = game.name.lower()
+        for trigram in _trigrams(game.name):
+            self.name_trigrams.setdefault(trigram, set()).add(game_key)
+        for trigram in _trigrams(self._tag_text(game)):
+            self.tag_trigrams.setdefault(trigram, set()).add(game_key)
+    
+    def remove(self, game_key: str, game: Game):
+        """Remove a game from the index."""
+        self.names.pop(game_key, None)
+        for postings, text in ((self.name_trigrams, game.name), (self.tag_trigrams, self._tag_text(game))):
+            for trigram in _trigrams(text):
+                keys = postings.get(trigram)
+                if keys is not None:
+                    keys.discard(game_key)
+                    if not keys:
+                        del postings[trigram]
+    
+    def search(self, query: str, limit: int = 25, allowed=None) -> list:
+        """Find the games best matching a query.
+        
+        Args:
+            query: Text typed by the user
+            limit: Maximum number of results
+            allowed: Optional set of game keys to restrict results to (e.g. a server's games)
+        
+        Returns:
+            List of game keys, best match first
+        """
+        query_trigrams = _trigrams(query)
+        if not query_trigrams:
+            return []
+        
+        # Count matching trigrams in names and in tags
+        name_hits = {}
+        tag_hits = {}
+        for postings, hits in ((self.name_trigrams, name_hits), (self.tag_trigrams, tag_hits)):
+            for trigram in query_trigrams:
+                for game_key in postings.get(trigram, ()):
+                    hits[game_key] = hits.get(game_key, 0) + 1
+        
+        # Keep games matching at least half of the query in their name or tags
+        min_hits = (len(query_trigrams) + 1) // 2
+        scores = {}
+        for game_key in name_hits.keys() | tag_hits.keys():
+            if allowed is not None and game_key not in allowed:
+                continue
+            name_score = name_hits.get(game_key, 0)
+            tag_score = tag_hits.get(game_key, 0)
+            if max(name_score, tag_score) >= min_hits:
+                scores[game_key] = name_score * self.NAME_WEIGHT + tag_score * self.TAG_WEIGHT
+        
+        # Names starting with the query come first, then the best trigram overlap
+        query_lower = query.strip().lower()
+        ranked = sorted(
+            scores,
+            key=lambda k: (not self.names[k].startswith(query_lower), -scores[k], self.names[k])
+        )
+        return ranked[:limit]
+
+
+class GameTagIndex:
+    """Bitmap index from tag to games: each game owns one bit, each tag a bitmask.
+    
+    Filtering is done by AND-ing masks instead of walking every game's tag list.
+    """
+    
+    __slots__ = ("bits", "keys_by_bit", "free_bits", "tags", "tag_names", "remote_play")
+    
+    def __init__(self, games: dict):
+        self.bits = {}
+        self.keys_by_bit = []
+        self.free_bits = []
+        self.tags = {}  # lowercase tag -> mask
+        self.tag_names = {}  # lowercase tag -> tag as written in the catalog
+        self.remote_play = 0  # mask of remote_play_together games
+        for game_key, game in games.items():
+            self.add(game_key, game)
+    
+    def add(self, game_key: str, game: Game, old_game: Game = None):
+        """Index a new game, or re-index an updated one (old_game is its previous data)."""
+        if old_game is not None:
+            self.remove(game_key, old_game)
+        if game_key not in self.bits:
+            if self.free_bits:
+                bit = self.free_bits.pop()
+                self.keys_by_bit[bit] = game_key
+            else:
+                bit = len(self.keys_by_bit)
+                self.keys_by_bit.append(game_key)
+            self.bits[game_key] = bit
+        mask = 1 << self.bits[game_key]
+        for tag in game.tags:
+            tag_key = tag.lower()
+            self.tags[tag_key] = self.tags.get(tag_key, 0) | mask
+            self.tag_names.setdefault(tag_key, tag)
+        if game.remote_play_together:
+            self.remote_play |= mask
+    
+    def remove(self, game_key: str, game: Game = None):
+        """Remove a game and release its bit."""
+        bit = self.bits.pop(game_key, None)
+        if bit is None:
+            return
+        mask = 1 << bit
+        for tag_key in list(self.tags):
+            if self.tags[tag_key] & mask:
+                self.tags[tag_key] &= ~mask
+                if not self.tags[tag_key]:
+                    del self.tags[tag_key]
+                    del self.tag_names[tag_key]
+        self.remote_play &= ~mask
+        self.keys_by_bit[bit] = None
+        self.free_bits.append(bit)
+    
+    def mask_of(self, game_keys) -> int:
+        """Get the bitmask of a set of games."""
+        mask = 0
+        for game_key in game_keys:
+            bit = self.bits.get(game_key)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+    
+    def keys_of(self, mask: int) -> list:
+        """Get the game keys of a bitmask."""
+        keys = []
+        while mask:
+            low_bit = mask & -mask
+            keys.append(self.keys_by_bit[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return keys
+    
+    def filter_mask(self, tag: str = None, remote_play: bool = False) -> int:
+        """Get the mask of games having a tag and/or supporting Remote Play Together.
+        
+        Returns:
+            Bitmask of matching games (-1, i.e. all bits, when no filter is given)
+        """
+        mask = -1
+        if tag:
+            mask &= self.tags.get(tag.strip().lower(), 0)
+        if remote_play:
+            mask &= self.remote_play
+        return mask
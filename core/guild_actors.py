@@ -0,0 +1,312 @@
+"""Per-guild actors owning the changes to each guild's data.
+
+Commands and views don't load and save a guild's votes, game list,
+configuration or schedules themselves: they send a message to the guild's
+mailbox and await its result. One asyncio task per guild (started when
+messages arrive, gone when the mailbox is empty) handles the messages in
+order. The mutations waiting together are applied to the documents they
+change, each document is saved once, in a worker thread, and then every
+sender is acknowledged - a burst of votes on a server costs one write, and
+servers never wait for each other.
+
+Saves still go through the versioned updates of data_manager: a batch that
+loses the race against a save made outside the actors (a thread of this
+process, or a file replaced by another process before the save, see
+data_manager.get_document_version) is applied again to the fresh document.
+"""
+import asyncio
+import functools
+import logging
+from collections import deque
+from datetime import datetime
+from .data_manager import update_guild_document
+from .models import UserVotes, Schedule
+from .user_profiles import update_user_profile
+
+logger = logging.getLogger(__name__)
+
+# Most mutations applied and saved as one write
+MAX_BATCH = 256
+# A mailbox holding this many messages is reported (burst or slow disk)
+MAILBOX_WARN_DEPTH = 100
+
+# Actor of each guild that received messages, by guild ID
+_actors = {}
+
+
+class Mutation:
+    """Message changing one guild document (one of data_manager.GUILD_DOCUMENTS).
+    
+    mutate changes the loaded document in place and its return value is the
+    result of the message. It may be applied again if the save conflicts, so it
+    must not have other side effects, and should check its input before
+    changing anything (an exception fails this message only, the batch is saved).
+    """
+    
+    __slots__ = ("document", "mutate", "future")
+    
+    def __init__(self, document: str, mutate):
+        self.document = document
+        self.mutate = mutate
+        self.future = None
+
+
+class Task:
+    """Message running a function (in a worker thread) between the mutations, e.g.
+    closing the voting period or importing data. It is never batched."""
+    
+    __slots__ = ("func", "future")
+    
+    def __init__(self, func):
+        self.func = func
+        self.future = None
+
+
+def _apply_mutations(guild_id: int, document: str, messages: list) -> list:
+    """Apply mutations of one document and save it once (runs in a worker thread).
+    
+    Returns:
+        (ok, result or exception) of each message
+    """
+    def apply(data):
+        outcomes = []
+        for message in messages:
+            try:
+                outcomes.append((True, message.mutate(data)))
+            except Exception as e:
+                outcomes.append((False, e))
+        return outcomes
+    
+    return update_guild_document(guild_id, document, apply)
+
+
+def _resolve(future, ok: bool, value):
+    # The sender may have given up waiting (e.g. interaction cancelled)
+    if future.done():
+        return
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(value)
+
+
+class GuildActor:
+    """Mailbox and task of one guild, with counters of its activity."""
+    
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.mailbox = deque()
+        self.task = None
+        self.messages = 0
+        self.writes = 0
+        self.max_depth = 0
+    
+    def send(self, message) -> asyncio.Future:
+        """Queue a message and start the guild's task if it isn't running."""
+        message.future = asyncio.get_running_loop().create_future()
+        self.mailbox.append(message)
+        self.messages += 1
+        depth = len(self.mailbox)
+        if depth > self.max_depth:
+            self.max_depth = depth
+            if depth == MAILBOX_WARN_DEPTH:
+                logger.warning(f"Mailbox of guild {self.guild_id} holds {depth} messages")
+        if self.task is None:
+            self.task = asyncio.create_task(self._run(), name=f"guild-actor-{self.guild_id}")
+        return message.future
+    
+    def _next_batch(self) -> list:
+        """Take a task alone, or the mutations at the head of the mailbox (up to MAX_BATCH)."""
+        if isinstance(self.mailbox[0], Task):
+            return [self.mailbox.popleft()]
+        batch = []
+        while self.mailbox and len(batch) < MAX_BATCH and isinstance(self.mailbox[0], Mutation):
+            batch.append(self.mailbox.popleft())
+        return batch
+    
+    async def _run(self):
+        try:
+            while self.mailbox:
+                batch = self._next_batch()
+                if isinstance(batch[0], Task):
+                    await self._run_task(batch[0])
+                else:
+                    await self._apply(batch)
+        finally:
+            self.task = None
+    
+    async def _run_task(self, task: Task):
+        try:
+            result = await asyncio.to_thread(task.func)
+        except Exception as e:
+            _resolve(task.future, False, e)
+        else:
+            _resolve(task.future, True, result)
+    
+    async def _apply(self, batch: list):
+        by_document = {}
+        for message in batch:
+            by_document.setdefault(message.document, []).append(message)
+        
+        for document, messages in by_document.items():
+            try:
+                outcomes = await asyncio.to_thread(_apply_mutations, self.guild_id, document, messages)
+            except Exception as e:
+                logger.error(f"Could not save {document} of guild {self.guild_id}: {e}", exc_info=True)
+                outcomes = [(False, e)] * len(messages)
+            else:
+                self.writes += 1
+            for message, (ok, value) in zip(messages, outcomes):
+                _resolve(message.future, ok, value)
+        if len(batch) > 1:
+            logger.debug(f"Guild {self.guild_id}: {len(batch)} messages saved in {len(by_document)} write(s), {len(self.mailbox)} waiting")
+
+
+def _get_actor(guild_id: int) -> GuildActor:
+    actor = _actors.get(guild_id)
+    if actor is None:
+        actor = _actors[guild_id] = GuildActor(guild_id)
+    return actor
+
+
+async def send(guild_id: int, message):
+    """Send a message to a guild's actor and wait until it is handled.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        message: Mutation or Task
+    
+    Returns:
+        Result of the message (what its mutate or func returned), once saved
+    
+    Raises:
+        Exception: What the message's function raised, or the save error
+    """
+    return await _get_actor(guild_id).send(message)
+
+
+async def mutate_votes(guild_id: int, mutate):
+    """Change votes of the current voting period (user ID -> UserVotes), see Mutation."""
+    return await send(guild_id, Mutation("votes", mutate))
+
+
+async def mutate_game_list(guild_id: int, mutate):
+    """Change the server's list of enabled game keys, see Mutation."""
+    return await send(guild_id, Mutation("games", mutate))
+
+
+async def mutate_config(guild_id: int, mutate):
+    """Change the server's ServerConfig, see Mutation."""
+    return await send(guild_id, Mutation("config", mutate))
+
+
+async def mutate_schedules(guild_id: int, mutate):
+    """Change the server's list of Schedule, see Mutation."""
+    return await send(guild_id, Mutation("schedules", mutate))
+
+
+async def run_task(guild_id: int, func, *args, **kwargs):
+    """Run a function in a worker thread, in order with the guild's mutations.
+    
+    Returns:
+        What the function returned
+    """
+    return await send(guild_id, Task(functools.partial(func, *args, **kwargs)))
+
+
+async def set_user_vote(guild_id: int, user_id: str, username: str, game_id: int, rating: int) -> dict:
+    """Save a user's rating for a game (voting also marks the user as available).
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        user_id: The user's ID as a string
+        username: The user's display name (kept in the user's profile)
+        game_id: The game's numeric ID
+        rating: Rating from 1 to 5
+    
+    Returns:
+        All votes of the guild after the update (user ID -> UserVotes)
+    """
+    # The profile is shared by all guilds: written in a worker thread, outside the guild's actor
+    await asyncio.to_thread(update_user_profile, user_id, username=username)
+    
+    def vote(votes):
+        user_votes = votes.setdefault(user_id, UserVotes())
+        user_votes.set_rating(game_id, rating)
+        # Mark as available when voting (remove unavailable flag)
+        user_votes.unavailable = False
+        return votes
+    
+    return await mutate_votes(guild_id, vote)
+
+
+async def add_game_to_server(game_key: str, guild_id: int):
+    """Add a game to a server's enabled game list."""
+    def add(game_keys):
+        if game_key not in game_keys:
+            game_keys.append(game_key)
+    
+    await mutate_game_list(guild_id, add)
+
+
+async def remove_game_from_server(game_key: str, guild_id: int):
+    """Remove a game from a server's enabled game list (but keep in shared)."""
+    def remove(game_keys):
+        if game_key in game_keys:
+            game_keys.remove(game_key)
+    
+    await mutate_game_list(guild_id, remove)
+
+
+async def rename_game_on_server(old_key: str, new_key: str, guild_id: int):
+    """Move a server's game list entry to a game's new key (one write)."""
+    def rename(game_keys):
+        if old_key in game_keys:
+            game_keys.remove(old_key)
+        if new_key not in game_keys:
+            game_keys.append(new_key)
+    
+    await mutate_game_list(guild_id, rename)
+
+
+async def add_schedule(guild_id: int, schedule_datetime: datetime, description: str = None) -> int:
+    """Add a new scheduled game night.
+    
+    Returns:
+        The ID of the newly created schedule
+    """
+    new_schedule = Schedule(int(schedule_datetime.timestamp()), schedule_datetime, description, datetime.now().isoformat())
+    
+    def add(schedules):
+        schedules.append(new_schedule)
+        schedules.sort(key=lambda x: x.datetime)
+    
+    await mutate_schedules(guild_id, add)
+    return new_schedule.id
+
+
+def get_mailbox_stats(reset: bool = False) -> dict:
+    """Get the activity of each guild's mailbox.
+    
+    Args:
+        reset: Start new counters (max_depth, messages, writes) after reading them
+    
+    Returns:
+        Dictionary of guild ID -> {"depth", "max_depth", "messages", "writes"}
+        (messages / writes is the batching achieved)
+    """
+    stats = {}
+    for guild_id, actor in list(_actors.items()):
+        stats[guild_id] = {
+            "depth": len(actor.mailbox),
+            "max_depth": actor.max_depth,
+            "messages": actor.messages,
+            "writes": actor.writes,
+        }
+        if reset:
+            actor.max_depth = len(actor.mailbox)
+            actor.messages = actor.writes = 0
+            # Idle guilds are forgotten (their actor is created again on the next message)
+            if actor.task is None and not actor.mailbox:
+                del _actors[guild_id]
+    return stats
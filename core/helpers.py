@@ -1,8 +1,12 @@
 """Common helper functions for commands."""
 import discord
-from typing import Optional, Callable
+from discord import app_commands
+from functools import lru_cache
+from typing import Optional, Callable, List
+from zoneinfo import available_timezones
 from .translations import get_translation
 from .permissions import can_manage_games
+from .data_manager import search_games, get_game_tags
 
 
 def require_guild(interaction: discord.Interaction) -> Optional[tuple]:
@@ -69,3 +73,32 @@ def require_admin(interaction: discord.Interaction) -> Optional[tuple]:
         return None
     
     return (guild_id, user_id, t)
+
+
+async def game_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    """Autocomplete game arguments from the search index (server's games only)."""
+    if not interaction.guild:
+        return []
+    return [
+        app_commands.Choice(name=f"{game_data.emoji} {game_data['name']}"[:100], value=game_key)
+        for game_key, game_data in search_games(current, guild_id=interaction.guild.id, limit=25)
+    ]
+
+
+async def tag_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    """Autocomplete tag arguments from the tags of the shared catalog."""
+    current = current.strip().lower()
+    tags = [tag for tag in get_game_tags() if current in tag.lower()]
+    return [app_commands.Choice(name=tag[:100], value=tag[:100]) for tag in tags[:25]]
+
+
+@lru_cache(maxsize=1)
+def _timezone_names() -> tuple:
+    return tuple(sorted(available_timezones()))
+
+
+async def timezone_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    """Autocomplete timezone arguments from the IANA timezone names."""
+    current = current.strip().lower()
+    names = [name for name in _timezone_names() if current in name.lower()]
+    return [app_commands.Choice(name=name, value=name) for name in names[:25]]
@@ -0,0 +1,300 @@
+"""Versioned migrations of the per-server data files.
+
+Each server folder records the schema version it was upgraded to in meta.json.
+Migrations run once for all servers at startup (or offline with
+`python -m core.migrations`), so the loaders only handle the current format.
+Server folders are also moved to the configured directory layout.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from .config import GUILD_LAYOUTS, get_guild_layout, get_guild_path, get_guild_dir, list_guild_ids
+from .config import get_games_file, get_config_file, get_meta_file, get_votes_file, get_period_file
+from .data_manager import get_shared_game, upsert_shared_game, save_server_game_list, append_vote_archive, list_vote_periods
+from .data_manager import get_current_period, new_period_id, invalidate_guild_cache, assign_game_id, rewrite_vote_archive
+from .data_manager import read_data_file, dumps_data, move_guild_folder
+from .atomic_io import atomic_write, atomic_write_text
+from .guild_actors import run_task
+from .models import encode_ratings
+from .user_profiles import DEFAULT_LANGUAGE, get_user_profile, update_user_profiles
+
+logger = logging.getLogger(__name__)
+
+# Fields of the vote records moved to the user profiles by the v6 migration
+USER_FIELDS = {"username", "language"}
+
+
+def _migrate_games_list(guild_id: int):
+    """v1: games.json holding full game definitions (dict) -> list of enabled keys.
+    
+    Definitions missing from the shared catalog are added to it.
+    """
+    games_file = get_games_file(guild_id)
+    if not games_file.exists():
+        return
+    with open(games_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        return
+    for game_key, game_data in data.items():
+        if get_shared_game(game_key) is None and isinstance(game_data, dict):
+            upsert_shared_game(game_key, game_data, expected_version=None)
+    save_server_game_list(list(data.keys()), guild_id)
+
+
+def _migrate_config_roles(guild_id: int):
+    """v2: add game_management_roles to config.json (empty list means admins only)."""
+    config_file = get_config_file(guild_id)
+    if not config_file.exists():
+        return
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    if "game_management_roles" in config:
+        return
+    config["game_management_roles"] = []
+    atomic_write_text(config_file, json.dumps(config, indent=2, ensure_ascii=False))
+
+
+def _migrate_vote_backups(guild_id: int):
+    """v3: dated votes.old.YYYY-MM-DD.json backups -> periods of votes.archive.jsonl.gz."""
+    archived = set(list_vote_periods(guild_id))
+    for old_file in sorted(get_guild_dir(guild_id).glob("votes.old.*.json")):
+        period = old_file.name.split('.')[-2]
+        if period not in archived:
+            with open(old_file, 'r', encoding='utf-8') as f:
+                append_vote_archive(guild_id, period, json.load(f))
+        old_file.unlink()
+
+
+def _migrate_vote_periods(guild_id: int):
+    """v4: votes.json -> votes.{period}.json of the current period (pointed to by period.json)."""
+    legacy_votes_file = get_guild_dir(guild_id) / "votes.json"
+    if not legacy_votes_file.exists() or get_current_period(guild_id) is not None:
+        return
+    # The records are moved as they are (the loaders only read the current format, see v5)
+    period = new_period_id(guild_id)
+    os.replace(legacy_votes_file, get_votes_file(guild_id, period))
+    atomic_write_text(get_period_file(guild_id), json.dumps({"current": period}, indent=2))
+    invalidate_guild_cache(guild_id)
+
+
+def _convert_user_votes(votes: dict):
+    """Convert the user records of a period from game key -> rating dicts to ratings strings.
+    
+    Returns:
+        The converted votes, or None if they were already in the new format
+    """
+    if not any(isinstance(user_data, dict) and "votes" in user_data for user_data in votes.values()):
+        return None
+    converted = {}
+    for user_id, user_data in votes.items():
+        if not isinstance(user_data, dict):
+            converted[user_id] = user_data  # Left to the integrity check
+            continue
+        user_data = dict(user_data)
+        ratings = {}
+        for game_key, rating in user_data.pop("votes", {}).items():
+            game = get_shared_game(game_key)
+            if game is None or not rating:
+                continue  # Votes for games deleted from the catalog were already ignored
+            ratings[game.id or assign_game_id(game_key)] = rating
+        user_data["ratings"] = encode_ratings(ratings)
+        converted[user_id] = user_data
+    return converted
+
+
+def _rewrite_votes_files(guild_id: int, transform):
+    """Rewrite the votes files of a guild (current and closed periods) through a function.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        transform: Function taking the votes of a period and returning them
+            updated, or None if they don't change
+    """
+    for votes_file in sorted(get_guild_dir(guild_id).glob("votes.[0-9]*.json")):
+        votes = transform(read_data_file(votes_file))
+        if votes is not None:
+            atomic_write(votes_file, dumps_data(votes))
+
+
+def _migrate_vote_game_ids(guild_id: int):
+    """v5: votes keyed by game key ({"votes": {"catan": 4}}) -> ratings strings indexed by game ID.
+    
+    Both the votes files (current and closed periods) and the vote archive are rewritten.
+    """
+    _rewrite_votes_files(guild_id, _convert_user_votes)
+    rewrite_vote_archive(guild_id, _convert_user_votes)
+
+
+def _strip_user_fields(votes: dict):
+    """Drop the username and language of the user records of a period.
+    
+    Returns:
+        The stripped votes, or None if they had none
+    """
+    if not any(isinstance(user_data, dict) and user_data.keys() & USER_FIELDS for user_data in votes.values()):
+        return None
+    return {
+        user_id: {k: v for k, v in user_data.items() if k not in USER_FIELDS} if isinstance(user_data, dict) else user_data
+        for user_id, user_data in votes.items()
+    }
+
+
+def _migrate_user_profiles(guild_id: int):
+    """v6: username and language of the vote records -> user profiles shared by all servers.
+    
+    Profiles already holding a value (from another server) keep it, except the
+    default language which a server's explicit choice replaces.
+    """
+    updates = {}
+    for votes_file in sorted(get_guild_dir(guild_id).glob("votes.[0-9]*.json")):
+        votes = read_data_file(votes_file)
+        for user_id, user_data in votes.items():
+            if not isinstance(user_data, dict):
+                continue
+            profile = {**get_user_profile(user_id), **updates.get(user_id, {})}
+            fields = {}
+            if user_data.get("username") and "username" not in profile:
+                fields["username"] = user_data["username"]
+            if user_data.get("language", DEFAULT_LANGUAGE) != DEFAULT_LANGUAGE and profile.get("language", DEFAULT_LANGUAGE) == DEFAULT_LANGUAGE:
+                fields["language"] = user_data["language"]
+            if fields:
+                updates.setdefault(user_id, {}).update(fields)
+    # Profiles are saved before the vote records lose these fields
+    update_user_profiles(updates)
+    _rewrite_votes_files(guild_id, _strip_user_fields)
+    rewrite_vote_archive(guild_id, _strip_user_fields)
+
+
+# Migration for schema version N is MIGRATIONS[N - 1]. Only append to this list:
+# each migration must be safe to run on data already in the new format.
+MIGRATIONS = [
+    _migrate_games_list,
+    _migrate_config_roles,
+    _migrate_vote_backups,
+    _migrate_vote_periods,
+    _migrate_vote_game_ids,
+    _migrate_user_profiles,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(guild_id: int) -> int:
+    """Get the schema version a server's data was migrated to (0 if never migrated)."""
+    meta_file = get_meta_file(guild_id)
+    if meta_file.exists():
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get("schema_version", 0)
+    return 0
+
+
+def set_schema_version(guild_id: int, version: int):
+    """Record the schema version of a server's data."""
+    meta_file = get_meta_file(guild_id)
+    meta = {}
+    if meta_file.exists():
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    meta["schema_version"] = version
+    atomic_write_text(meta_file, json.dumps(meta, indent=2, ensure_ascii=False))
+
+
+def migrate_guild(guild_id: int) -> int:
+    """Apply the pending migrations of one server.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+    
+    Returns:
+        Number of migrations applied
+    """
+    version = get_schema_version(guild_id)
+    for target_version in range(version + 1, SCHEMA_VERSION + 1):
+        MIGRATIONS[target_version - 1](guild_id)
+        # Record progress after each step so an interrupted run resumes where it stopped
+        set_schema_version(guild_id, target_version)
+    return max(0, SCHEMA_VERSION - version)
+
+
+def run_migrations() -> dict:
+    """Migrate every server in the guild index to the current schema version.
+    
+    Returns:
+        Dictionary with guilds (folders checked), migrated (folders upgraded),
+        failed (list of guild IDs) and seconds (total duration)
+    """
+    start = time.perf_counter()
+    report = {"guilds": 0, "migrated": 0, "failed": [], "seconds": 0.0}
+    
+    for guild_id in list_guild_ids():
+        report["guilds"] += 1
+        guild_start = time.perf_counter()
+        try:
+            applied = migrate_guild(guild_id)
+        except Exception as e:
+            logger.error(f"Migration failed for guild {guild_id}: {e}", exc_info=True)
+            report["failed"].append(guild_id)
+            continue
+        if applied:
+            report["migrated"] += 1
+            logger.info(f"Migrated guild {guild_id} to schema v{SCHEMA_VERSION} ({applied} step(s)) in {(time.perf_counter() - guild_start) * 1000:.1f} ms")
+    
+    report["seconds"] = time.perf_counter() - start
+    logger.info(
+        f"Schema migrations: {report['migrated']}/{report['guilds']} guild(s) upgraded to v{SCHEMA_VERSION} "
+        f"in {report['seconds']:.2f}s ({len(report['failed'])} failed)"
+    )
+    return report
+
+
+async def migrate_guild_layout(layout: str = None, batch_size: int = 100) -> int:
+    """Move server folders to a directory layout while the bot keeps running.
+    
+    Each folder is moved by its server's actor (see core.guild_actors.run_task),
+    in order with the server's changes, once its staged writes are committed
+    and under its lock (see data_manager.move_guild_folder), so no vote is
+    lost to the move. Commands keep being served during the migration.
+    
+    Args:
+        layout: Target layout ("flat" or "sharded"), defaults to TATIBOT_GUILD_LAYOUT
+        batch_size: Number of servers moved at the same time
+        
+    Returns:
+        Number of server folders moved
+    """
+    layout = layout or get_guild_layout()
+    start = time.perf_counter()
+    moved = 0
+    guild_ids = [guild_id for guild_id in list_guild_ids() if get_guild_dir(guild_id) != get_guild_path(guild_id, layout)]
+    for i in range(0, len(guild_ids), batch_size):
+        batch = guild_ids[i:i + batch_size]
+        results = await asyncio.gather(
+            *(run_task(guild_id, move_guild_folder, guild_id, layout) for guild_id in batch),
+            return_exceptions=True
+        )
+        for guild_id, result in zip(batch, results):
+            if isinstance(result, Exception):
+                logger.error(f"Could not move guild {guild_id} to the {layout} layout: {result}", exc_info=result)
+            elif result:
+                moved += 1
+    if moved:
+        logger.info(f"Moved {moved} guild folder(s) to the {layout} layout in {time.perf_counter() - start:.2f}s")
+    return moved
+
+
+if __name__ == "__main__":
+    from .logger_config import setup_logging
+    parser = argparse.ArgumentParser(description="Upgrade server data to the current schema and directory layout.")
+    parser.add_argument("--layout", choices=GUILD_LAYOUTS, help="Directory layout to move server folders to (default: TATIBOT_GUILD_LAYOUT)")
+    args = parser.parse_args()
+    
+    setup_logging()
+    moved = asyncio.run(migrate_guild_layout(args.layout))
+    result = run_migrations()
+    print(f"{moved} guild folder(s) moved to the {args.layout or get_guild_layout()} layout")
+    print(f"{result['migrated']}/{result['guilds']} guild(s) migrated to schema v{SCHEMA_VERSION} in {result['seconds']:.2f}s")
+    if result["failed"]:
+        print(f"Failed: {', '.join(str(guild_id) for guild_id in result['failed'])}")
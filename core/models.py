@@ -0,0 +1,293 @@
+"""Domain models of the bot data: games, user votes, server configs and schedules.
+
+Records are turned into these __slots__ classes once, when they are loaded:
+defaults are resolved there, so the rest of the code reads attributes instead
+of repeating `.get(field, default)`, and an instance takes a fraction of the
+memory of the dict it comes from. to_dict() gives back what the JSON files hold.
+"""
+from collections.abc import Mapping
+from datetime import datetime
+
+DEFAULT_EMOJI = "🎮"
+
+GAME_FIELDS = ("name", "min_players", "max_players", "id", "emoji", "store_links", "tags", "remote_play_together")
+_GAME_FIELD_BITS = {field: 1 << bit for bit, field in enumerate(GAME_FIELDS)}
+_GAME_DEFAULTS = {"id": None, "emoji": DEFAULT_EMOJI, "store_links": "", "tags": (), "remote_play_together": False}
+
+
+class Game(Mapping):
+    """Read-only game record of the shared catalog (shared between servers).
+    
+    Every field is an attribute with its default resolved (game.emoji is "🎮"
+    when the record has none). The mapping interface (game["name"], dict(game))
+    only exposes the fields present in the record, so it round-trips unchanged.
+    """
+    
+    __slots__ = GAME_FIELDS + ("_present", "_extra")
+    
+    @classmethod
+    def from_dict(cls, data) -> "Game":
+        """Build a game from its JSON record (tags become a tuple)."""
+        game = cls.__new__(cls)
+        present = 0
+        for field in GAME_FIELDS:
+            if field in data:
+                value = data[field]
+                present |= _GAME_FIELD_BITS[field]
+                if field == "tags":
+                    value = tuple(value)
+            else:
+                value = _GAME_DEFAULTS.get(field)
+            object.__setattr__(game, field, value)
+        extra = {key: value for key, value in data.items() if key not in _GAME_FIELD_BITS}
+        object.__setattr__(game, "_present", present)
+        object.__setattr__(game, "_extra", extra or None)
+        return game
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("game records are read-only (copy them with dict(game) to edit)")
+    
+    def __getitem__(self, key):
+        bit = _GAME_FIELD_BITS.get(key)
+        if bit is not None:
+            if self._present & bit:
+                return getattr(self, key)
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+    
+    def __iter__(self):
+        for field in GAME_FIELDS:
+            if self._present & _GAME_FIELD_BITS[field]:
+                yield field
+        if self._extra is not None:
+            yield from self._extra
+    
+    def __len__(self):
+        return bin(self._present).count("1") + len(self._extra or ())
+    
+    def __reduce__(self):
+        return (Game.from_dict, (self.to_dict(),))
+    
+    def __repr__(self):
+        return f"Game({dict(self)!r})"
+    
+    def to_dict(self) -> dict:
+        """Get the JSON record of the game."""
+        return {key: list(value) if key == "tags" else value for key, value in self.items()}
+
+
+def _check_rating(game_id, rating):
+    if not isinstance(game_id, int) or isinstance(game_id, bool) or game_id < 1:
+        raise ValueError(f"invalid game ID {game_id!r} (games must have an ID to be rated)")
+    if not isinstance(rating, int) or not 0 <= rating <= 9:
+        raise ValueError(f"invalid rating {rating!r}")
+
+
+def iter_ratings(ratings: str):
+    """Yield the (game ID, rating digit) pairs of a ratings string (unrated games are skipped).
+    
+    A ratings string is made of comma-separated segments of one digit per game
+    ID, each starting with the ID of its first digit ("12:503": 5 for game 12, 3
+    for game 14). The first segment may leave out its start, then ID 1 ("0503").
+    
+    Raises:
+        ValueError: If the string is malformed
+    """
+    if not ratings:
+        return
+    for i, segment in enumerate(ratings.split(",")):
+        start, sep, digits = segment.rpartition(":")
+        if sep:
+            if not start.isdigit() or int(start) < 1:
+                raise ValueError(f"invalid ratings segment {segment!r}")
+            start = int(start)
+        elif i == 0:
+            start = 1
+        else:
+            raise ValueError(f"ratings segment {segment!r} has no start ID")
+        if not digits.isdigit() or not digits.isascii():
+            raise ValueError(f"invalid ratings segment {segment!r}")
+        for offset, digit in enumerate(digits):
+            if digit != "0":
+                yield start + offset, digit
+
+
+def encode_ratings(ratings: dict) -> str:
+    """Encode a game ID -> rating mapping as a ratings string (see iter_ratings).
+    
+    Its size grows with the number of rated games, not with the highest game ID.
+    
+    Raises:
+        ValueError: If a game ID or rating is invalid
+    """
+    segments = []
+    digits = []
+    start = last = None
+    for game_id in sorted(game_id for game_id, rating in ratings.items() if rating):
+        _check_rating(game_id, ratings[game_id])
+        # Unrated games in between cost a "0" each, a new segment ",<ID>:"
+        if last is not None and game_id - last - 1 <= len(str(game_id)) + 2:
+            digits.append("0" * (game_id - last - 1))
+        else:
+            if digits:
+                segments.append((start, "".join(digits)))
+            start, digits = game_id, []
+        digits.append(str(ratings[game_id]))
+        last = game_id
+    if digits:
+        segments.append((start, "".join(digits)))
+    parts = []
+    for start, run in segments:
+        # A first segment starting close to ID 1 is written with leading zeros and no start
+        if not parts and start - 1 <= len(str(start)) + 1:
+            parts.append("0" * (start - 1) + run)
+        else:
+            parts.append(f"{start}:{run}")
+    return ",".join(parts)
+
+
+def decode_ratings(ratings: str) -> dict:
+    """Decode a ratings string into a game ID -> rating mapping (rated games only)."""
+    return {game_id: int(digit) for game_id, digit in iter_ratings(ratings)}
+
+
+def set_rating(ratings: str, game_id: int, rating: int) -> str:
+    """Get a ratings string with one game's rating changed (0 removes it).
+    
+    Raises:
+        ValueError: If the game has no valid ID or the rating is not a digit
+    """
+    _check_rating(game_id, rating)
+    rated = decode_ratings(ratings)
+    if rating:
+        rated[game_id] = rating
+    else:
+        rated.pop(game_id, None)
+    return encode_ratings(rated)
+
+
+class UserVotes:
+    """A user's votes in one voting period.
+    
+    Ratings are stored as runs of one digit per game ID ("0503" holds the
+    rating of game 1 at position 0, "40000:5" rates game 40000 only, see
+    iter_ratings), so a record doesn't grow with game names or with the size of
+    the catalog, and renaming a game doesn't touch the votes.
+    """
+    
+    __slots__ = ("_ratings", "_rated", "unavailable")
+    
+    def __init__(self, ratings: str = "", unavailable: bool = False):
+        self.ratings = ratings
+        self.unavailable = unavailable
+    
+    @property
+    def ratings(self) -> str:
+        return self._ratings
+    
+    @ratings.setter
+    def ratings(self, ratings: str):
+        self._ratings = ratings
+        # Decoded on first lookup of a segmented string (a plain digit string is indexed directly)
+        self._rated = None
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "UserVotes":
+        return cls(data.get("ratings", ""), data.get("unavailable", False))
+    
+    def to_dict(self) -> dict:
+        """Get the JSON record (unavailable is only written when set)."""
+        if self.unavailable:
+            return {"ratings": self.ratings, "unavailable": True}
+        return {"ratings": self.ratings}
+    
+    def get_rating(self, game_id) -> int:
+        """Get the rating of a game (0 if not rated)."""
+        ratings = self._ratings
+        if "," not in ratings and ":" not in ratings:
+            if isinstance(game_id, int) and 0 < game_id <= len(ratings):
+                return int(ratings[game_id - 1])
+            return 0
+        if self._rated is None:
+            self._rated = decode_ratings(ratings)
+        return self._rated.get(game_id, 0)
+    
+    def set_rating(self, game_id: int, rating: int):
+        """Set the rating of a game (0 removes it)."""
+        self.ratings = set_rating(self.ratings, game_id, rating)
+    
+    def rated_games(self) -> dict:
+        """Get the game ID -> rating mapping of the rated games."""
+        return decode_ratings(self.ratings)
+    
+    def __eq__(self, other):
+        if not isinstance(other, UserVotes):
+            return NotImplemented
+        return self.ratings == other.ratings and self.unavailable == other.unavailable
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"UserVotes({self.ratings!r}, unavailable={self.unavailable})"
+
+
+_CONFIG_DEFAULTS = {
+    "reminder_day": "sun",  # Sunday
+    "reminder_hour": 20,  # 8 PM
+    "reminder_minute": 0,
+    "game_night_day": None,  # None means no recurring game night
+    "game_night_hour": None,
+    "game_night_minute": None,
+}
+
+
+class ServerConfig:
+    """Configuration of a server (vote reminder, recurring game night, game management roles)."""
+    
+    __slots__ = tuple(_CONFIG_DEFAULTS) + ("game_management_roles",)
+    
+    def __init__(self, **fields):
+        for field, default in _CONFIG_DEFAULTS.items():
+            setattr(self, field, fields.get(field, default))
+        # Empty list means only admins can manage games
+        self.game_management_roles = list(fields.get("game_management_roles", []))
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "ServerConfig":
+        return cls(**{field: data[field] for field in cls.__slots__ if field in data})
+    
+    def to_dict(self) -> dict:
+        """Get the JSON record (the roles list is a copy)."""
+        data = {field: getattr(self, field) for field in _CONFIG_DEFAULTS}
+        data["game_management_roles"] = list(self.game_management_roles)
+        return data
+    
+    def __repr__(self):
+        return f"ServerConfig({self.to_dict()!r})"
+
+
+class Schedule:
+    """A scheduled game night (datetime in the bot's local time)."""
+    
+    __slots__ = ("id", "datetime", "description", "created_at")
+    
+    def __init__(self, id: int, datetime: datetime, description: str = "", created_at: str = None):
+        self.id = id
+        self.datetime = datetime
+        self.description = description or ""
+        self.created_at = created_at
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "Schedule":
+        """Build a schedule from its JSON record (the datetime is parsed once, here)."""
+        return cls(data["id"], datetime.fromisoformat(data["datetime"]), data.get("description"), data.get("created_at"))
+    
+    def to_dict(self) -> dict:
+        data = {"id": self.id, "datetime": self.datetime.isoformat(), "description": self.description}
+        if self.created_at is not None:
+            data["created_at"] = self.created_at
+        return data
+    
+    def __repr__(self):
+        return f"Schedule({self.id}, {self.datetime.isoformat()}, {self.description!r})"
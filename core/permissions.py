@@ -19,7 +19,7 @@ def can_manage_games(user: discord.Member, guild: discord.Guild) -> bool:
     
     # Check role-based permissions
     config = load_server_config(guild.id)
-    allowed_roles = config.get("game_management_roles", [])
+    allowed_roles = config.game_management_roles
     
     # If no roles configured, only admins can manage
     if not allowed_roles:
@@ -1,11 +1,13 @@
 """Translation strings for the bot."""
 from typing import Dict
+from .user_profiles import get_user_language
 
 # Translation dictionaries
 TRANSLATIONS: Dict[str, Dict[str, str]] = {
     "en": {
         # Common
         "error_no_games": "❌ No games in the list yet!",
+        "error_no_games_filter": "❌ No games match these filters!",
         "error_game_not_found": "❌ Game '{game}' not found in the list!",
         "error_need_admin": "❌ You need administrator permissions to use this command.",
         "error_need_permission": "❌ You don't have permission to manage games. Ask an admin to configure game management roles.",
@@ -14,6 +16,7 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "game_added": "✅ Added {emoji} '{name}' (Players: {min_players}-{max_players})",
         "game_removed": "✅ Removed '{game_name}' from the list",
         "game_exists": "❌ Game '{name}' is already in the list!",
+        "game_edit_conflict": "❌ This game was changed by someone else in the meantime, please try again.",
         "game_invalid_min": "❌ Invalid player count! Minimum must be at least 1.",
         "game_invalid_max": "❌ Invalid player count! Maximum must be >= minimum.",
         "game_list_title": "🎮 Available Games",
@@ -97,6 +100,8 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         
         # Results
         "results_no_votes": "❌ No votes yet! Use `/vote` to start voting.",
+        "history_no_period": "❌ No voting period had started on {date}.",
+        "history_period": "📅 Voting period {period}",
         "results_title": "📊 Voting Results",
         "results_available_players": "**Available Players:** {count}",
         "results_no_compatible": "⚠️ No Compatible Games",
@@ -111,7 +116,7 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         
         # Clear votes
         "clearvotes_success": "✅ All votes have been cleared! Ready for a new voting period.",
-        "clearvotes_backup": "📁 Previous votes saved to: `{file}`",
+        "clearvotes_backup": "📁 Previous votes kept as period `{period}`",
         
         # Sync
         "sync_success": "✅ Successfully synced {count} command(s) to this server!\nCommands should be available immediately.",
@@ -120,13 +125,16 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         # Export/Import
         "export_success": "✅ Data exported successfully!\n📁 File: `{filename}`\n\nThis file contains all server data (games, votes, config, schedules).",
         "export_error": "❌ Failed to export data: {error}",
+        "export_too_large": "❌ The export ({size} MB compressed) is larger than this server's upload limit ({limit} MB). Try again without `all_games`.",
         "import_success": "✅ Data imported successfully! ({mode})\n",
         "import_mode_overwrite": "Overwrite mode",
         "import_mode_merge": "Merge mode",
-        "import_games": "Games: {count}",
-        "import_votes": "Votes: {count} users",
-        "import_config": "Config: {success}",
-        "import_schedules": "Schedules: {count}",
+        "import_dry_run": "🔍 Dry run ({mode}): nothing was changed, the import would apply:\n",
+        "import_diff_games": "Shared games: {added} added, {updated} updated",
+        "import_diff_game_list": "Server games: {added} enabled, {removed} disabled",
+        "import_diff_votes": "Votes: {added} users added, {updated} updated, {removed} removed",
+        "import_diff_config": "Config: {updated} setting(s) changed",
+        "import_diff_schedules": "Schedules: {added} added, {removed} removed",
         "import_warnings": "⚠️ {count} warning(s) occurred:",
         "import_error": "❌ Failed to import data: {error}",
         "import_error_invalid_file": "❌ Invalid file! Please upload a JSON file exported from TatiBot.",
@@ -138,6 +146,9 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "language_changed": "✅ Language changed to **{lang}**",
         "language_invalid": "❌ Invalid language! Available: {options}",
         "language_options": "English (en), Français (fr)",
+        "timezone_set": "✅ Timezone set to **{timezone}**",
+        "timezone_cleared": "✅ Timezone removed, game night times are shown in the bot's timezone",
+        "timezone_invalid": "❌ Unknown timezone **{timezone}**! Use a name like Europe/Paris or America/New_York.",
         
         # Help
         "help_title": "🎮 TatiBot Help",
@@ -184,14 +195,18 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
                                         "• Only counts available players (not marked unavailable)\n\n"
                                         "**`/language <lang>`** - Set your preferred language\n"
                                         "• Choose English (en) or Français (fr)\n"
-                                        "• All bot messages will appear in your language\n\n"
+                                        "• All bot messages will appear in your language, on every server\n\n"
+                                        "**`/timezone [timezone]`** - Set your timezone (e.g. Europe/Paris)\n"
+                                        "• Game night times are shown in your timezone\n\n"
                                         "**`/clearvotes`** - Manually clear all votes (saves backup)\n\n"
-                                        "**`/exportdata`** - Export all server data as JSON (admin only)\n"
+                                        "**`/exportdata [all_games] [compress]`** - Export all server data as JSON (admin only)\n"
                                         "• Creates a backup file with games, votes, config, and schedules\n"
+                                        "• Only the server's games are included unless all_games=true, large exports are gzipped\n"
                                         "• Download the file to keep a backup or transfer to another server\n\n"
-                                        "**`/importdata <file> [overwrite]`** - Import server data from JSON file (admin only)\n"
-                                        "• Upload a previously exported JSON file\n"
-                                        "• Use overwrite=true to completely replace data, or false to merge\n\n"
+                                        "**`/importdata <file> [overwrite] [dry_run]`** - Import server data from JSON file (admin only)\n"
+                                        "• Upload a previously exported JSON (or .json.gz) file\n"
+                                        "• Use overwrite=true to completely replace data, or false to merge\n"
+                                        "• Use dry_run=true to see what would change without applying it\n\n"
                                         "**`/sync`** - Force sync commands (admin only)",
         "help_scheduling": "📅 Scheduling",
         "help_scheduling_value": "**`/schedule <date> <time> [description]`** - Schedule a game night\n"
@@ -250,6 +265,7 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
     "fr": {
         # Common
         "error_no_games": "❌ Aucun jeu dans la liste pour le moment !",
+        "error_no_games_filter": "❌ Aucun jeu ne correspond à ces filtres !",
         "error_game_not_found": "❌ Jeu '{game}' introuvable dans la liste !",
         "error_need_admin": "❌ Vous devez avoir les permissions d'administrateur pour utiliser cette commande.",
         "error_need_permission": "❌ Vous n'avez pas la permission de gérer les jeux. Demandez à un admin de configurer les rôles de gestion des jeux.",
@@ -258,6 +274,7 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "game_added": "✅ Ajouté {emoji} '{name}' (Joueurs : {min_players}-{max_players})",
         "game_removed": "✅ Supprimé '{game_name}' de la liste",
         "game_exists": "❌ Le jeu '{name}' est déjà dans la liste !",
+        "game_edit_conflict": "❌ Ce jeu a été modifié par quelqu'un d'autre entre-temps, veuillez réessayer.",
         "game_invalid_min": "❌ Nombre de joueurs invalide ! Le minimum doit être d'au moins 1.",
         "game_invalid_max": "❌ Nombre de joueurs invalide ! Le maximum doit être >= au minimum.",
         "game_list_title": "🎮 Jeux Disponibles",
@@ -329,6 +346,8 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         
         # Results
         "results_no_votes": "❌ Aucun vote pour le moment ! Utilisez `/vote` pour commencer à voter.",
+        "history_no_period": "❌ Aucune période de vote n'avait commencé le {date}.",
+        "history_period": "📅 Période de vote {period}",
         "results_title": "📊 Résultats des Votes",
         "results_available_players": "**Joueurs Disponibles :** {count}",
         "results_no_compatible": "⚠️ Aucun Jeu Compatible",
@@ -343,7 +362,7 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         
         # Clear votes
         "clearvotes_success": "✅ Tous les votes ont été effacés ! Prêt pour une nouvelle période de vote.",
-        "clearvotes_backup": "📁 Votes précédents sauvegardés dans : `{file}`",
+        "clearvotes_backup": "📁 Votes précédents conservés dans la période `{period}`",
         
         # Sync
         "sync_success": "✅ {count} commande(s) synchronisée(s) avec succès sur ce serveur !\nLes commandes devraient être disponibles immédiatement.",
@@ -352,13 +371,16 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         # Export/Import
         "export_success": "✅ Données exportées avec succès !\n📁 Fichier : `{filename}`\n\nCe fichier contient toutes les données du serveur (jeux, votes, config, planifications).",
         "export_error": "❌ Échec de l'exportation des données : {error}",
+        "export_too_large": "❌ L'export ({size} Mo compressé) dépasse la limite d'envoi de ce serveur ({limit} Mo). Réessayez sans `all_games`.",
         "import_success": "✅ Données importées avec succès ! ({mode})\n",
         "import_mode_overwrite": "Mode remplacement",
         "import_mode_merge": "Mode fusion",
-        "import_games": "Jeux : {count}",
-        "import_votes": "Votes : {count} utilisateurs",
-        "import_config": "Config : {success}",
-        "import_schedules": "Planifications : {count}",
+        "import_dry_run": "🔍 Simulation ({mode}) : rien n'a été modifié, l'import appliquerait :\n",
+        "import_diff_games": "Jeux partagés : {added} ajoutés, {updated} mis à jour",
+        "import_diff_game_list": "Jeux du serveur : {added} activés, {removed} désactivés",
+        "import_diff_votes": "Votes : {added} utilisateurs ajoutés, {updated} mis à jour, {removed} supprimés",
+        "import_diff_config": "Config : {updated} paramètre(s) modifié(s)",
+        "import_diff_schedules": "Planifications : {added} ajoutées, {removed} supprimées",
         "import_warnings": "⚠️ {count} avertissement(s) :",
         "import_error": "❌ Échec de l'importation des données : {error}",
         "import_error_invalid_file": "❌ Fichier invalide ! Veuillez télécharger un fichier JSON exporté depuis TatiBot.",
@@ -370,6 +392,9 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "language_changed": "✅ Langue changée en **{lang}**",
         "language_invalid": "❌ Langue invalide ! Disponibles : {options}",
         "language_options": "English (en), Français (fr)",
+        "timezone_set": "✅ Fuseau horaire défini sur **{timezone}**",
+        "timezone_cleared": "✅ Fuseau horaire supprimé, les horaires des soirées jeux sont affichés dans le fuseau horaire du bot",
+        "timezone_invalid": "❌ Fuseau horaire **{timezone}** inconnu ! Utilisez un nom comme Europe/Paris ou America/New_York.",
         
         # Help
         "help_title": "🎮 Aide TatiBot",
@@ -416,14 +441,18 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
                                         "• Ne compte que les joueurs disponibles (non marqués indisponibles)\n\n"
                                         "**`/language <lang>`** - Définir votre langue préférée\n"
                                         "• Choisissez English (en) ou Français (fr)\n"
-                                        "• Tous les messages du bot apparaîtront dans votre langue\n\n"
+                                        "• Tous les messages du bot apparaîtront dans votre langue, sur tous les serveurs\n\n"
+                                        "**`/timezone [timezone]`** - Définir votre fuseau horaire (ex. Europe/Paris)\n"
+                                        "• Les horaires des soirées jeux sont affichés dans votre fuseau horaire\n\n"
                                         "**`/clearvotes`** - Effacer manuellement tous les votes (sauvegarde une copie)\n\n"
-                                        "**`/exportdata`** - Exporter toutes les données du serveur en JSON (admin uniquement)\n"
+                                        "**`/exportdata [all_games] [compress]`** - Exporter toutes les données du serveur en JSON (admin uniquement)\n"
                                         "• Crée un fichier de sauvegarde avec jeux, votes, config et planifications\n"
+                                        "• Seuls les jeux du serveur sont inclus sauf si all_games=true, les gros exports sont compressés (gzip)\n"
                                         "• Téléchargez le fichier pour garder une sauvegarde ou transférer vers un autre serveur\n\n"
-                                        "**`/importdata <file> [overwrite]`** - Importer les données du serveur depuis un fichier JSON (admin uniquement)\n"
-                                        "• Téléchargez un fichier JSON précédemment exporté\n"
-                                        "• Utilisez overwrite=true pour remplacer complètement les données, ou false pour fusionner\n\n"
+                                        "**`/importdata <file> [overwrite] [dry_run]`** - Importer les données du serveur depuis un fichier JSON (admin uniquement)\n"
+                                        "• Téléchargez un fichier JSON (ou .json.gz) précédemment exporté\n"
+                                        "• Utilisez overwrite=true pour remplacer complètement les données, ou false pour fusionner\n"
+                                        "• Utilisez dry_run=true pour voir les changements sans les appliquer\n\n"
                                         "**`/sync`** - Forcer la synchronisation des commandes (admin uniquement)",
         "help_scheduling": "📅 Planification",
         "help_scheduling_value": "**`/schedule <date> <time> [description]`** - Planifier une soirée de jeu\n"
@@ -482,47 +511,21 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
 }
 
 
-def get_user_language(user_id: str, guild_id: int, votes: dict = None) -> str:
-    """Get user's preferred language, defaulting to 'en'.
-    
-    Args:
-        user_id: The user's ID as a string
-        guild_id: The Discord guild (server) ID
-        votes: Optional votes dict (will load if not provided)
-    
-    Returns:
-        Language code ('en' or 'fr')
-    """
-    if votes is None:
-        from .data_manager import load_votes
-        votes = load_votes(guild_id)
-    
-    user_data = votes.get(str(user_id), {})
-    return user_data.get("language", "en")
-
-
-def get_translation(key: str, user_id: str = None, guild_id: int = None, lang: str = None, votes: dict = None, **kwargs) -> str:
+def get_translation(key: str, user_id: str = None, guild_id: int = None, lang: str = None, **kwargs) -> str:
     """Get a translated string.
     
     Args:
         key: Translation key
         user_id: User ID to get language from (optional if lang is provided)
-        guild_id: The Discord guild (server) ID (required if user_id is provided)
+        guild_id: The Discord guild (server) ID (unused: languages are set per user, for all servers)
         lang: Language code directly (optional if user_id is provided)
-        votes: Optional votes dict (will load if not provided)
         **kwargs: Variables to format into the string
     
     Returns:
         Translated and formatted string
     """
     if lang is None:
-        if user_id is None:
-            lang = "en"
-        else:
-            if guild_id is None:
-                lang = "en"  # Default if guild_id not provided
-            else:
-                lang = get_user_language(user_id, guild_id, votes)
+        lang = "en" if user_id is None else get_user_language(user_id)
     
     translations = TRANSLATIONS.get(lang, TRANSLATIONS["en"])
     text = translations.get(key, TRANSLATIONS["en"].get(key, key))
@@ -533,42 +536,3 @@ def get_translation(key: str, user_id: str = None, guild_id: int = None, lang: s
     except KeyError:
         # If formatting fails, return as-is
         return text
-
-
-def set_user_language(user_id: str, lang: str, votes: dict = None) -> bool:
-    """Set user's preferred language.
-    
-    Args:
-        user_id: The user's ID as a string
-        lang: Language code ('en' or 'fr')
-        votes: Optional votes dict (will load if not provided)
-    
-    Returns:
-        True if language is valid and set, False otherwise
-    """
-    if lang not in TRANSLATIONS:
-        return False
-    
-    if votes is None:
-        from .data_manager import load_votes, save_votes
-        votes = load_votes()
-        should_save = True
-    else:
-        should_save = False
-    
-    user_id_str = str(user_id)
-    if user_id_str not in votes:
-        votes[user_id_str] = {
-            "username": "",  # Will be set when user interacts
-            "votes": {},
-            "language": lang
-        }
-    else:
-        votes[user_id_str]["language"] = lang
-    
-    if should_save:
-        from .data_manager import save_votes
-        save_votes(votes)
-    
-    return True
-
@@ -0,0 +1,197 @@
+"""User profiles (display name, language, timezone) shared by all servers.
+
+A user's preferences follow them from one server to another, and the votes of
+each server only hold ratings and availability. Profiles are spread over 256
+small files (see get_user_profiles_file), so saving one rewrites a few hundred
+users at most, and the most recently used profiles are kept in an LRU cache.
+"""
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from .config import USERS_DIR, get_user_profiles_file
+from .atomic_io import atomic_write_text
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows: profile files are then only locked within the process
+    fcntl = None
+
+DEFAULT_LANGUAGE = "en"
+LANGUAGES = ("en", "fr")
+
+# Recently used profiles by user ID ({} for users without a profile)
+_profile_cache = OrderedDict()
+PROFILE_CACHE_SIZE = 4096
+_profiles_lock = threading.RLock()
+
+
+def _load_profiles_file(path) -> dict:
+    """Load all the profiles of one file (empty if it doesn't exist)."""
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def _cache_profile(user_id: str, profile: dict):
+    _profile_cache[user_id] = profile
+    _profile_cache.move_to_end(user_id)
+    if len(_profile_cache) > PROFILE_CACHE_SIZE:
+        _profile_cache.popitem(last=False)
+
+
+@contextmanager
+def _locked_profiles_file(path):
+    """Hold the lock of a profiles file while it is read and rewritten (also across processes, e.g. cli.py workers)."""
+    with _profiles_lock:
+        USERS_DIR.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(path.with_name(path.name + ".lock"), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_user_profile(user_id: str) -> dict:
+    """Get a user's profile.
+    
+    Args:
+        user_id: The user's ID as a string
+    
+    Returns:
+        Dictionary with the fields the user has (username, language, timezone),
+        shared with the cache: do not modify
+    """
+    user_id = str(user_id)
+    with _profiles_lock:
+        profile = _profile_cache.get(user_id)
+        if profile is None:
+            profile = _load_profiles_file(get_user_profiles_file(user_id)).get(user_id, {})
+        _cache_profile(user_id, profile)
+        return profile
+
+
+def update_user_profiles(updates: dict) -> int:
+    """Update the profiles of several users, with one write per profiles file.
+    
+    Args:
+        updates: Dictionary of user ID -> fields to set (a None value removes the field)
+    
+    Returns:
+        Number of profiles actually changed
+    """
+    by_file = {}
+    for user_id, fields in updates.items():
+        by_file.setdefault(get_user_profiles_file(str(user_id)), {})[str(user_id)] = fields
+    
+    changed = 0
+    for path, file_updates in by_file.items():
+        with _locked_profiles_file(path):
+            profiles = _load_profiles_file(path)
+            file_changed = False
+            for user_id, fields in file_updates.items():
+                profile = dict(profiles.get(user_id, {}))
+                for field, value in fields.items():
+                    if value is None:
+                        profile.pop(field, None)
+                    else:
+                        profile[field] = value
+                if profile != profiles.get(user_id, {}):
+                    if profile:
+                        profiles[user_id] = profile
+                    else:
+                        profiles.pop(user_id, None)
+                    file_changed = True
+                    changed += 1
+                _cache_profile(user_id, profile)
+            if file_changed:
+                atomic_write_text(path, json.dumps(profiles, indent=2, ensure_ascii=False))
+    return changed
+
+
+def update_user_profile(user_id: str, **fields) -> bool:
+    """Update some fields of a user's profile (written only if something changes).
+    
+    Args:
+        user_id: The user's ID as a string
+        **fields: Fields to set (a None value removes the field)
+    
+    Returns:
+        True if the profile changed
+    """
+    user_id = str(user_id)
+    profile = get_user_profile(user_id)
+    if all(profile.get(field) == value for field, value in fields.items()):
+        return False
+    return update_user_profiles({user_id: fields}) > 0
+
+
+def get_display_name(user_id: str) -> str:
+    """Get the last known display name of a user (the ID if none is known)."""
+    return get_user_profile(user_id).get("username") or str(user_id)
+
+
+def get_user_language(user_id: str) -> str:
+    """Get a user's preferred language.
+    
+    Returns:
+        Language code ('en' or 'fr'), defaults to 'en'
+    """
+    return get_user_profile(user_id).get("language", DEFAULT_LANGUAGE)
+
+
+def set_user_language(user_id: str, lang: str) -> bool:
+    """Set a user's preferred language (for all servers).
+    
+    Args:
+        user_id: The user's ID as a string
+        lang: Language code ('en' or 'fr')
+    
+    Returns:
+        True if the language is valid and set, False otherwise
+    """
+    if lang not in LANGUAGES:
+        return False
+    update_user_profile(user_id, language=lang)
+    return True
+
+
+def get_user_timezone(user_id: str):
+    """Get a user's timezone.
+    
+    Returns:
+        ZoneInfo of the user, or None if not set
+    """
+    timezone = get_user_profile(user_id).get("timezone")
+    return ZoneInfo(timezone) if timezone else None
+
+
+def is_valid_timezone(timezone: str) -> bool:
+    """Check that a timezone name is known (IANA name, e.g. Europe/Paris)."""
+    try:
+        ZoneInfo(timezone)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def set_user_timezone(user_id: str, timezone: str = None) -> bool:
+    """Set a user's timezone (for all servers).
+    
+    Args:
+        user_id: The user's ID as a string
+        timezone: IANA timezone name (e.g. Europe/Paris), or None to remove it
+    
+    Returns:
+        True if the timezone is valid and set, False otherwise
+    """
+    if timezone is not None and not is_valid_timezone(timezone):
+        return False
+    update_user_profile(user_id, timezone=timezone)
+    return True
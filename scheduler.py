@@ -4,8 +4,10 @@ import logging
 from pathlib import Path
 from datetime import datetime, timedelta
 from apscheduler.triggers.cron import CronTrigger
-from core.data_manager import save_old_votes, clear_votes, load_server_config
-from core.config import GUILDS_DIR
+from core.data_manager import advance_vote_period, load_server_config, collect_vote_periods, prune_vote_archive
+from core.config import list_guild_ids
+from core.guild_actors import run_task, get_mailbox_stats
+from core.migrations import migrate_guild_layout
 
 logger = logging.getLogger(__name__)
 
@@ -22,9 +24,9 @@ async def send_reminders(bot):
     for guild in bot.guilds:
         try:
             config = load_server_config(guild.id)
-            reminder_day = config.get("reminder_day", "sun")
-            reminder_hour = config.get("reminder_hour", 20)
-            reminder_minute = config.get("reminder_minute", 0)
+            reminder_day = config.reminder_day
+            reminder_hour = config.reminder_hour
+            reminder_minute = config.reminder_minute
             
             # Check if it's time to send reminder for this server
             if (current_day == reminder_day and 
@@ -70,25 +72,26 @@ async def reset_votes_wednesday(bot):
     # Process each guild separately
     for guild in bot.guilds:
         try:
-            old_file = save_old_votes(guild.id)
-            if old_file:
-                logger.info(f"Votes backed up to: {old_file} for guild {guild.name} (ID: {guild.id})")
-            clear_votes(guild.id, save_backup=False)
-            logger.info(f"Votes cleared for guild {guild.name} (ID: {guild.id})")
+            # Only moves the guild's period pointer, the old votes are archived by the daily cleanup
+            closed_period = await run_task(guild.id, advance_vote_period, guild.id)
         except Exception as e:
             logger.error(f"Error resetting votes for guild {guild.name} (ID: {guild.id}): {e}", exc_info=True)
-    
-    embed = discord.Embed(
-        title="🔄 Votes Reset!",
-        description="All votes have been reset for the new voting period.\n"
-                   "Use `/vote` to start voting for next week's game night!",
-        color=discord.Color.orange()
-    )
-    
-    if old_file:
-        embed.set_footer(text=f"Previous votes saved to: {old_file}")
-    
-    for guild in bot.guilds:
+            continue
+        if not closed_period:
+            # Nothing changed: no notification
+            logger.info(f"No votes to clear for guild {guild.name} (ID: {guild.id})")
+            continue
+        logger.info(f"Voting period {closed_period} closed for guild {guild.name} (ID: {guild.id})")
+        logger.info(f"Votes cleared for guild {guild.name} (ID: {guild.id})")
+        
+        embed = discord.Embed(
+            title="🔄 Votes Reset!",
+            description="All votes have been reset for the new voting period.\n"
+                       "Use `/vote` to start voting for next week's game night!",
+            color=discord.Color.orange()
+        )
+        embed.set_footer(text=f"Previous votes kept as period {closed_period}")
+        
         # Try to find a general channel or first text channel
         channel = None
         for ch in guild.text_channels:
@@ -105,45 +108,44 @@ async def reset_votes_wednesday(bot):
 
 
 async def clean_old_votes(bot):
-    """Clean vote backup files older than 30 days for all guilds."""
-    logger.info("Starting cleanup of old vote backup files (older than 30 days)")
+    """Archive closed voting periods and drop those older than 30 days for all guilds."""
+    logger.info("Starting cleanup of past votes (archiving closed periods, removing those older than 30 days)")
     try:
-        cutoff_date = datetime.now() - timedelta(days=30)
         total_deleted = 0
         
-        # Process each guild directory
-        for guild_dir in GUILDS_DIR.iterdir():
-            if not guild_dir.is_dir():
-                continue
-                
-            old_files = list(guild_dir.glob("votes.old.*.json"))
-            deleted_count = 0
-            
-            for old_file in old_files:
-                try:
-                    # Extract date from filename: votes.old.YYYY-MM-DD.json
-                    date_str = old_file.stem.split('.')[-1]  # Get last part after splitting by '.'
-                    file_date = datetime.strptime(date_str, "%Y-%m-%d")
-                    
-                    if file_date < cutoff_date:
-                        old_file.unlink()
-                        deleted_count += 1
-                        total_deleted += 1
-                        logger.info(f"Deleted old vote backup: {old_file.name} from guild {guild_dir.name}")
-                except (ValueError, IndexError) as e:
-                    logger.warning(f"Could not parse date from filename {old_file.name}: {e}")
-                    continue
-                except Exception as e:
-                    logger.error(f"Error deleting {old_file.name}: {e}", exc_info=True)
+        # Process each guild (listed from the guild index), in order with its votes
+        for guild_id in list_guild_ids():
+            try:
+                await run_task(guild_id, collect_vote_periods, guild_id)
+                deleted_count = await run_task(guild_id, prune_vote_archive, guild_id, keep_days=30)
+                if deleted_count:
+                    total_deleted += deleted_count
+                    logger.info(f"Removed {deleted_count} archived voting period(s) from guild {guild_id}")
+            except Exception as e:
+                logger.error(f"Error pruning vote archive of guild {guild_id}: {e}", exc_info=True)
         
         if total_deleted > 0:
-            logger.info(f"Cleanup complete: Deleted {total_deleted} old vote backup file(s) across all guilds")
+            logger.info(f"Cleanup complete: Removed {total_deleted} archived voting period(s) across all guilds")
         else:
-            logger.info("Cleanup complete: No old vote backup files to delete")
+            logger.info("Cleanup complete: No archived votes to remove")
     except Exception as e:
         logger.error(f"Error during vote cleanup: {e}", exc_info=True)
 
 
+async def log_mailbox_stats(bot):
+    """Log the busiest guild mailboxes of the last hour (queue depth and batching of their writes)."""
+    stats = get_mailbox_stats(reset=True)
+    busiest = sorted(stats.items(), key=lambda item: item[1]["max_depth"], reverse=True)[:5]
+    busiest = [(guild_id, s) for guild_id, s in busiest if s["messages"]]
+    if not busiest:
+        return
+    summary = ", ".join(
+        f"{guild_id}: max depth {s['max_depth']}, {s['messages']} message(s) in {s['writes']} write(s)"
+        for guild_id, s in busiest
+    )
+    logger.info(f"Busiest guild mailboxes: {summary}")
+
+
 async def clean_old_logs(bot):
     """Clean log files older than 7 days."""
     logger.info("Starting cleanup of old log files (older than 7 days)")
@@ -210,4 +212,20 @@ def setup_scheduler(scheduler, bot):
         id='cleanup_old_logs'
     )
     logger.info("Scheduled daily cleanup of log files (older than 7 days) at 2:05 AM")
+    
+    # Log the guild mailboxes' activity every hour
+    scheduler.add_job(
+        log_mailbox_stats,
+        CronTrigger(minute=30),
+        args=[bot],
+        id='mailbox_stats'
+    )
+    logger.info("Scheduled hourly report of guild mailbox activity")
+    
+    # Move guild folders to the configured layout in the background (no-op if already there)
+    scheduler.add_job(
+        migrate_guild_layout,
+        id='guild_layout_migration'
+    )
+    logger.info("Scheduled guild folder layout check")
 
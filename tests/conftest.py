@@ -0,0 +1,12 @@
+import os
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def data_folder(tmp_path_factory):
+    # Data paths are relative to the working directory (see core.config.DATA_DIR); one folder for
+    # the whole run since paths are cached per process, so each test module uses its own guild ID
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("bot"))
+    yield
+    os.chdir(previous)
@@ -0,0 +1,79 @@
+"""/importdata transactions: nothing applied before the commit point, everything after it."""
+import io
+import json
+import pytest
+from core import data_import
+from core.config import get_votes_file, get_import_journal_file, get_guild_dir
+from core.data_manager import get_shared_game, load_votes, load_server_game_list, get_current_period, read_data_file
+from core.data_import import import_guild_data, recover_guild_import
+from core.user_profiles import get_user_profile
+
+GUILD_ID = 7001
+
+
+def export(game_key: str, user_id: str) -> io.BytesIO:
+    data = {
+        "guild_id": 1,
+        "shared_games": {game_key: {"id": 1, "name": game_key.title(), "min_players": 2, "max_players": 6}},
+        "server_game_list": [game_key],
+        "votes": {user_id: {"ratings": "4"}},
+        "users": {user_id: {"username": f"user {user_id}", "timezone": "Europe/Paris"}},
+    }
+    return io.BytesIO(json.dumps(data).encode("utf-8"))
+
+
+class Crash(Exception):
+    pass
+
+
+def test_votes_are_written_in_the_data_format():
+    import_guild_data(GUILD_ID, export("import ok", "101"))
+    votes_file = get_votes_file(GUILD_ID, get_current_period(GUILD_ID))
+    # Compact, as every votes file (not indented like the other JSON files)
+    assert b"\n" not in votes_file.read_bytes().strip()
+    assert set(read_data_file(votes_file)) == {"101"}
+    assert load_votes(GUILD_ID)["101"].get_rating(get_shared_game("import ok").id) == 4
+
+
+def test_crash_before_the_commit_point_applies_nothing(monkeypatch):
+    replace = data_import.os.replace
+
+    def crash_on_commit(source, target):
+        if str(target).endswith("import.txn.json"):
+            raise Crash()
+        replace(source, target)
+
+    monkeypatch.setattr(data_import.os, "replace", crash_on_commit)
+    with pytest.raises(Crash):
+        import_guild_data(GUILD_ID, export("import rolled back", "102"))
+    monkeypatch.undo()
+
+    assert get_shared_game("import rolled back") is None
+    assert get_user_profile("102") == {}
+    assert load_server_game_list(GUILD_ID) == ["import ok"]
+    assert "102" not in load_votes(GUILD_ID)
+    # The next startup drops the staged files
+    assert recover_guild_import(GUILD_ID)
+    assert not list(get_guild_dir(GUILD_ID).glob("*.import"))
+    assert not recover_guild_import(GUILD_ID)
+
+
+def test_crash_after_the_commit_point_is_completed_on_recovery(monkeypatch):
+    def crash(journal_file):
+        raise Crash()
+
+    monkeypatch.setattr(data_import, "_finish_import", crash)
+    with pytest.raises(Crash):
+        import_guild_data(GUILD_ID, export("import recovered", "103"))
+    monkeypatch.undo()
+
+    assert get_import_journal_file(GUILD_ID).exists()
+    assert get_shared_game("import recovered") is None
+
+    assert recover_guild_import(GUILD_ID)
+    assert not get_import_journal_file(GUILD_ID).exists()
+    game = get_shared_game("import recovered")
+    assert game is not None
+    assert get_user_profile("103") == {"username": "user 103", "timezone": "Europe/Paris"}
+    assert load_server_game_list(GUILD_ID) == ["import ok", "import recovered"]
+    assert load_votes(GUILD_ID)["103"].get_rating(game.id) == 4
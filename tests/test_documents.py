@@ -0,0 +1,66 @@
+"""Guild documents: version checks of the save functions and retries of the update functions."""
+import json
+from core.config import get_games_file
+from core.data_manager import (
+    UPDATE_RETRIES, get_document_version, save_votes, load_votes, update_votes,
+    save_server_game_list, load_server_game_list
+)
+from core.models import UserVotes
+
+GUILD_ID = 8301
+
+
+def test_stale_version_is_rejected():
+    version = get_document_version(GUILD_ID, "votes")
+    assert save_votes({"831": UserVotes("1")}, GUILD_ID, expected_version=version)
+    # Saved since that version: rejected, nothing written
+    assert not save_votes({"832": UserVotes("1")}, GUILD_ID, expected_version=version)
+    assert set(load_votes(GUILD_ID)) == {"831"}
+    
+    version = get_document_version(GUILD_ID, "games")
+    assert save_server_game_list(["one"], GUILD_ID, expected_version=version)
+    version = get_document_version(GUILD_ID, "games")
+    # Another process replaces the file: its version changes too
+    get_games_file(GUILD_ID).write_text(json.dumps(["one", "two"]), encoding="utf-8")
+    assert not save_server_game_list(["three"], GUILD_ID, expected_version=version)
+    assert load_server_game_list(GUILD_ID) == ["one", "two"]
+
+
+def concurrent_save(user_id: str):
+    """Save another user's vote, as a concurrent update would."""
+    votes = load_votes(GUILD_ID)
+    votes[user_id] = UserVotes("2")
+    save_votes(votes, GUILD_ID)
+
+
+def test_update_is_applied_again_after_a_concurrent_save():
+    calls = []
+    
+    def mutate(votes):
+        calls.append(len(calls))
+        if len(calls) == 1:
+            concurrent_save("833")
+        votes.setdefault("834", UserVotes()).unavailable = True
+        return len(calls)
+    
+    assert update_votes(GUILD_ID, mutate) == 2
+    votes = load_votes(GUILD_ID)
+    assert votes["833"].ratings == "2"
+    assert votes["834"].unavailable
+
+
+def test_update_still_conflicting_is_applied_with_the_guild_locked():
+    calls = []
+    
+    def mutate(votes):
+        calls.append(len(calls))
+        if len(calls) <= UPDATE_RETRIES:
+            concurrent_save(f"84{len(calls)}")
+        votes.setdefault("840", UserVotes()).unavailable = True
+    
+    update_votes(GUILD_ID, mutate)
+    assert len(calls) == UPDATE_RETRIES + 1
+    votes = load_votes(GUILD_ID)
+    assert votes["840"].unavailable
+    # None of the concurrent saves is overwritten
+    assert all(f"84{call}" in votes for call in range(1, UPDATE_RETRIES + 1))
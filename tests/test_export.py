@@ -0,0 +1,43 @@
+"""/exportdata: the voters' profiles are read once each and the export imports back."""
+import asyncio
+import io
+import json
+from core import data_manager
+from core.data_manager import upsert_shared_game, get_shared_game, save_server_game_list, write_guild_export, load_votes
+from core.data_import import import_guild_data
+from core.guild_actors import set_user_vote
+from core.user_profiles import get_user_profile
+
+GUILD_ID = 8001
+RESTORED_GUILD_ID = 8002
+
+
+def test_export_reads_each_profile_once_and_imports_back(monkeypatch):
+    upsert_shared_game("exported", {"name": "Exported", "min_players": 1, "max_players": 4})
+    save_server_game_list(["exported"], GUILD_ID)
+    game_id = get_shared_game("exported").id
+
+    async def vote():
+        for user_id in ("801", "802", "803"):
+            await set_user_vote(GUILD_ID, user_id, f"user {user_id}", game_id, 3)
+    asyncio.run(vote())
+
+    reads = []
+
+    def counted_get_user_profile(user_id):
+        reads.append(user_id)
+        return get_user_profile(user_id)
+
+    monkeypatch.setattr(data_manager, "get_user_profile", counted_get_user_profile)
+    fp = io.BytesIO()
+    write_guild_export(GUILD_ID, fp)
+    monkeypatch.undo()
+
+    assert sorted(reads) == ["801", "802", "803"]
+    export = json.loads(fp.getvalue())
+    assert export["users"]["802"] == {"username": "user 802"}
+
+    fp.seek(0)
+    import_guild_data(RESTORED_GUILD_ID, fp)
+    assert load_votes(RESTORED_GUILD_ID) == load_votes(GUILD_ID)
+    assert load_votes(RESTORED_GUILD_ID)["801"].get_rating(game_id) == 3
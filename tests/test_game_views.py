@@ -0,0 +1,75 @@
+"""Drive the add, update (rename) and remove game modals against a temporary data folder."""
+import asyncio
+from core.data_manager import load_games, load_server_game_list, get_shared_game
+from views.game_views import AddGameModal, UpdateGameModal, RemoveGameConfirmationModal
+
+GUILD_ID = 1234
+USER_ID = 42
+
+
+class FakeResponse:
+    def __init__(self):
+        self.messages = []
+    
+    async def send_message(self, content=None, **kwargs):
+        self.messages.append(content)
+
+
+class FakeUser:
+    id = USER_ID
+    
+    def __str__(self):
+        return "tester"
+
+
+class FakeInteraction:
+    def __init__(self):
+        self.user = FakeUser()
+        self.response = FakeResponse()
+
+
+def submit(make_modal, **values):
+    """Build a modal, fill in its text inputs and submit it.
+    
+    Returns:
+        Messages sent in response
+    """
+    async def run():
+        modal = make_modal()
+        for name, value in values.items():
+            getattr(modal, name)._value = value
+        interaction = FakeInteraction()
+        await modal.on_submit(interaction)
+        return interaction.response.messages
+    
+    return asyncio.run(run())
+
+
+def test_game_modals():
+    messages = submit(
+        lambda: AddGameModal(GUILD_ID, USER_ID),
+        name_input="Test Game", min_players_input="2", max_players_input="4"
+    )
+    assert len(messages) == 1
+    assert load_server_game_list(GUILD_ID) == ["test game"]
+    assert get_shared_game("test game").id
+    
+    game = load_games(GUILD_ID)["test game"]
+    messages = submit(lambda: UpdateGameModal("test game", game, GUILD_ID, USER_ID), name_input="Renamed Game")
+    # The game has no emoji of its own: the default one is shown
+    assert messages[0].startswith("✅ Updated 🎮 **Renamed Game**")
+    assert load_server_game_list(GUILD_ID) == ["renamed game"]
+    assert load_games(GUILD_ID)["renamed game"].id == game.id
+    
+    game = load_games(GUILD_ID)["renamed game"]
+    messages = submit(lambda: UpdateGameModal("renamed game", game, GUILD_ID, USER_ID), emoji_input="🎲")
+    assert messages[0].startswith("✅ Updated 🎲 **Renamed Game**")
+    assert "Emoji: 🎮 → 🎲" in messages[0]
+    assert load_games(GUILD_ID)["renamed game"].emoji == "🎲"
+    
+    game = load_games(GUILD_ID)["renamed game"]
+    messages = submit(lambda: RemoveGameConfirmationModal("renamed game", game, GUILD_ID, USER_ID))
+    assert len(messages) == 1
+    assert load_server_game_list(GUILD_ID) == []
+    # Removing a game from a server keeps it in the shared catalog
+    assert get_shared_game("renamed game") is not None
@@ -0,0 +1,41 @@
+"""Group commit of the votes files: a failed commit is reported to its writers and retried."""
+import pytest
+from core import atomic_io
+from core.config import get_votes_file
+from core.data_manager import save_votes, load_votes, get_current_period
+from core.models import UserVotes
+
+GUILD_ID = 8101
+
+
+def test_failed_commit_is_reported_and_retried(monkeypatch):
+    monkeypatch.setenv("TATIBOT_COMMIT_WINDOW_MS", "10")
+    save_votes({"811": UserVotes("1")}, GUILD_ID)
+    votes_file = get_votes_file(GUILD_ID, get_current_period(GUILD_ID))
+    committed = votes_file.read_bytes()
+    
+    write_file = atomic_io._write_file
+    failures = []
+    
+    def fail_once(path, data):
+        if path == votes_file and not failures:
+            failures.append(path)
+            raise OSError("No space left on device")
+        return write_file(path, data)
+    
+    monkeypatch.setattr(atomic_io, "_write_file", fail_once)
+    # Not acknowledged: the commit failed
+    with pytest.raises(OSError):
+        save_votes({"811": UserVotes("2")}, GUILD_ID)
+    assert failures
+    
+    # Still staged (served to this process) and written by the next commit
+    assert load_votes(GUILD_ID)["811"].ratings == "2"
+    atomic_io.flush_staged_writes()
+    assert not atomic_io.has_staged_write(votes_file)
+    assert votes_file.read_bytes() != committed
+    assert load_votes(GUILD_ID)["811"].ratings == "2"
+    
+    # The error is cleared once the file is written
+    assert save_votes({"811": UserVotes("3")}, GUILD_ID)
+    assert load_votes(GUILD_ID)["811"].ratings == "3"
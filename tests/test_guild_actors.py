@@ -0,0 +1,26 @@
+"""Guild actors: concurrent votes are batched into a few writes and none is lost."""
+import asyncio
+from core.data_manager import upsert_shared_game, save_server_game_list, get_shared_game, load_votes
+from core.guild_actors import set_user_vote, get_mailbox_stats
+
+GUILD_ID = 8401
+VOTERS = 50
+
+
+def test_concurrent_votes_are_batched():
+    upsert_shared_game("batched", {"name": "Batched", "min_players": 1, "max_players": 4})
+    save_server_game_list(["batched"], GUILD_ID)
+    game_id = get_shared_game("batched").id
+    
+    async def vote_together():
+        await asyncio.gather(*(
+            set_user_vote(GUILD_ID, str(9000 + voter), f"voter {voter}", game_id, 1 + voter % 5)
+            for voter in range(VOTERS)
+        ))
+    
+    asyncio.run(vote_together())
+    votes = load_votes(GUILD_ID)
+    assert all(votes[str(9000 + voter)].get_rating(game_id) == 1 + voter % 5 for voter in range(VOTERS))
+    stats = get_mailbox_stats(reset=True)[GUILD_ID]
+    assert stats["messages"] == VOTERS
+    assert stats["writes"] < VOTERS
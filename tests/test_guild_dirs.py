@@ -0,0 +1,26 @@
+"""Guild directory checks: folders created or moved by another process are picked up."""
+from core.config import guild_dir_exists, ensure_guild_dir, get_guild_path, get_games_file
+
+GUILD_ID = 3456
+
+
+def test_folder_created_by_another_process_is_found():
+    assert not guild_dir_exists(GUILD_ID)
+    # e.g. a cli.py restore running next to the bot
+    get_guild_path(GUILD_ID, "flat").mkdir(parents=True)
+    assert guild_dir_exists(GUILD_ID)
+
+
+def test_folder_moved_by_another_process_is_followed():
+    flat_dir = get_guild_path(GUILD_ID, "flat")
+    sharded_dir = get_guild_path(GUILD_ID, "sharded")
+    assert ensure_guild_dir(GUILD_ID) == flat_dir
+    assert get_games_file(GUILD_ID).parent == flat_dir
+
+    # e.g. cli.py migrate --layout sharded
+    sharded_dir.parent.mkdir(parents=True)
+    flat_dir.rename(sharded_dir)
+
+    assert ensure_guild_dir(GUILD_ID) == sharded_dir
+    assert get_games_file(GUILD_ID).parent == sharded_dir
+    assert not flat_dir.exists()
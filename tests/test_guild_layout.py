@@ -0,0 +1,52 @@
+"""Moving guild folders to another layout: votes saved meanwhile and the guild index."""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from core import config
+from core.config import GUILD_INDEX_FILE, ensure_guild_dir, get_guild_dir, get_guild_path, list_guild_ids, rebuild_guild_index
+from core.data_manager import load_votes
+from core.guild_actors import set_user_vote
+from core.migrations import migrate_guild_layout
+
+GUILD_IDS = range(4501, 4505)
+
+
+def test_votes_saved_during_the_move_are_kept():
+    async def run():
+        votes = [
+            set_user_vote(guild_id, str(user_id), f"user {user_id}", 1, 4)
+            for guild_id in GUILD_IDS for user_id in range(20)
+        ]
+        # Every server already has a folder, the moves are queued between the votes
+        await asyncio.gather(*(set_user_vote(guild_id, "0", "user 0", 1, 4) for guild_id in GUILD_IDS))
+        await asyncio.gather(*votes[:40], migrate_guild_layout("sharded", batch_size=2), *votes[40:])
+
+    asyncio.run(run())
+    for guild_id in GUILD_IDS:
+        assert get_guild_dir(guild_id) == get_guild_path(guild_id, "sharded")
+        assert not get_guild_path(guild_id, "flat").exists()
+        assert len(load_votes(guild_id)) == 20
+
+
+def create_guilds(first_id: int) -> list:
+    # A worker process starting without the index rebuilds it, then creates its guilds
+    config._guild_index = None
+    for guild_id in range(first_id, first_id + 25):
+        ensure_guild_dir(guild_id)
+    return list(range(first_id, first_id + 25))
+
+
+def test_parallel_workers_keep_every_guild_in_the_index():
+    GUILD_INDEX_FILE.unlink()
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        created = [guild_id for guild_ids in executor.map(create_guilds, range(5000, 5200, 25)) for guild_id in guild_ids]
+    config._guild_index = None
+    assert set(created) <= set(list_guild_ids())
+    assert set(list_guild_ids()) == set(rebuild_guild_index())
+
+
+def test_append_after_a_torn_line():
+    with open(GUILD_INDEX_FILE, "a", encoding="utf-8") as f:
+        f.write("12")
+    ensure_guild_dir(4600)
+    config._guild_index = None
+    assert 4600 in list_guild_ids()
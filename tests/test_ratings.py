@@ -0,0 +1,69 @@
+"""Sparse ratings strings: one digit per game ID, in segments starting at their first game's ID."""
+import random
+import pytest
+from core.models import UserVotes, iter_ratings, encode_ratings, decode_ratings, set_rating
+
+
+@pytest.mark.parametrize("ratings, encoded", [
+    ({}, ""),
+    ({1: 5}, "5"),
+    ({1: 5, 3: 3}, "503"),
+    ({2: 4}, "04"),
+    ({40000: 5}, "40000:5"),
+    ({1: 2, 40000: 5, 40002: 1}, "2,40000:501"),
+    # A short gap costs zeros, a long one a new segment
+    ({10: 1, 13: 2}, "10:1002"),
+    ({100: 1, 200: 2}, "100:1,200:2"),
+])
+def test_encode_and_decode(ratings, encoded):
+    assert encode_ratings(ratings) == encoded
+    assert decode_ratings(encoded) == ratings
+
+
+def test_random_round_trips():
+    rng = random.Random(0)
+    for _ in range(200):
+        ratings = {rng.randint(1, 100000): rng.randint(1, 5) for _ in range(rng.randint(0, 30))}
+        encoded = encode_ratings(ratings)
+        assert decode_ratings(encoded) == ratings
+        # Grows with the rated games, not with the highest ID
+        assert len(encoded) <= 8 * len(ratings)
+
+
+def test_dense_strings_from_before_the_segments_still_decode():
+    assert dict(iter_ratings("0503")) == {2: "5", 4: "3"}
+    assert decode_ratings("0" * 499 + "5") == {500: 5}
+
+
+@pytest.mark.parametrize("ratings", ["5a", "x:5", "0:5", "5,3", "12:", "12:5,:3", "٣"])
+def test_malformed_strings_are_rejected(ratings):
+    with pytest.raises(ValueError):
+        decode_ratings(ratings)
+
+
+def test_set_rating():
+    ratings = set_rating("", 3, 4)
+    assert ratings == "004"
+    ratings = set_rating(ratings, 50000, 2)
+    assert decode_ratings(ratings) == {3: 4, 50000: 2}
+    assert set_rating(ratings, 50000, 0) == "004"
+    assert set_rating("004", 3, 0) == ""
+    for game_id, rating in ((0, 3), (None, 3), (True, 3), (2, 10), (2, -1)):
+        with pytest.raises(ValueError):
+            set_rating("", game_id, rating)
+
+
+def test_user_votes_lookups():
+    user_votes = UserVotes("0503")
+    assert [user_votes.get_rating(game_id) for game_id in range(6)] == [0, 0, 5, 0, 3, 0]
+    assert user_votes.get_rating("2") == 0
+    user_votes.set_rating(40000, 4)
+    assert user_votes.ratings == "0503,40000:4"
+    assert user_votes.get_rating(40000) == 4
+    assert user_votes.get_rating(4) == 3
+    # The decoded lookup is dropped when the string changes
+    user_votes.ratings = "40001:2"
+    assert user_votes.get_rating(40000) == 0
+    assert user_votes.get_rating(40001) == 2
+    assert user_votes.rated_games() == {40001: 2}
+    assert UserVotes.from_dict(user_votes.to_dict()) == user_votes
@@ -0,0 +1,57 @@
+"""Weekly vote reset: each server is told about its own closed period, servers without votes aren't."""
+import asyncio
+from core.data_manager import get_current_period, advance_vote_period
+from core.guild_actors import set_user_vote, run_task
+from scheduler import reset_votes_wednesday
+
+
+class FakePermissions:
+    send_messages = True
+
+
+class FakeChannel:
+    name = "general"
+    
+    def __init__(self):
+        self.embeds = []
+    
+    def permissions_for(self, member):
+        return FakePermissions()
+    
+    async def send(self, embed=None):
+        self.embeds.append(embed)
+
+
+class FakeGuild:
+    me = None
+    
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.name = f"guild {guild_id}"
+        self.text_channels = [FakeChannel()]
+
+
+class FakeBot:
+    def __init__(self, guild_ids):
+        self.guilds = [FakeGuild(guild_id) for guild_id in guild_ids]
+
+
+def test_reset_notifies_each_guild_of_its_period():
+    bot = FakeBot([6001, 6002, 6003])
+    
+    async def run():
+        await set_user_vote(6001, "1", "one", 1, 5)
+        # The last guild already closed a period today: its current one has another ID
+        await set_user_vote(6003, "1", "one", 1, 5)
+        await run_task(6003, advance_vote_period, 6003)
+        await set_user_vote(6003, "1", "one", 1, 5)
+        periods = [get_current_period(guild.id) for guild in bot.guilds]
+        await reset_votes_wednesday(bot)
+        return periods
+    
+    first_period, _, last_period = asyncio.run(run())
+    assert first_period != last_period
+    first, idle, last = (guild.text_channels[0].embeds for guild in bot.guilds)
+    assert not idle
+    assert [embed.footer.text for embed in first] == [f"Previous votes kept as period {first_period}"]
+    assert [embed.footer.text for embed in last] == [f"Previous votes kept as period {last_period}"]
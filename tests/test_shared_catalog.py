@@ -0,0 +1,76 @@
+"""Shared catalog journal: patches, version checks, replay in a new process and compaction."""
+import json
+from core import data_manager
+from core.config import get_shared_games_file, get_shared_games_journal_file
+from core.data_manager import (
+    upsert_shared_game, update_shared_game, rename_shared_game, delete_shared_game,
+    get_shared_game, get_shared_game_version, get_game_key_by_id, compact_shared_games
+)
+
+KEYS = ("catalog one", "catalog two", "catalog three")
+
+
+def game(name: str, **fields) -> dict:
+    return {"name": name, "min_players": 1, "max_players": 4, **fields}
+
+
+def reload_catalog() -> dict:
+    """Read the catalog back from disk, as a newly started process would."""
+    data_manager._shared_games = None
+    return {game_key: dict(game) for game_key, game in data_manager._get_shared_catalog().items() if game_key.startswith("catalog ")}
+
+
+def test_patches_are_journaled_and_replayed():
+    assert upsert_shared_game("catalog one", game("Catalog One"))
+    assert upsert_shared_game("catalog two", game("Catalog Two"))
+    assert update_shared_game("catalog one", {"emoji": "🎲"})
+    assert rename_shared_game("catalog two", "catalog three", game("Catalog Three", id=get_shared_game("catalog two").id))
+
+    entries = [json.loads(line) for line in get_shared_games_journal_file().read_text(encoding="utf-8").splitlines()]
+    assert [entry["key"] for entry in entries[-5:]] == ["catalog one", "catalog two", "catalog one", "catalog two", "catalog three"]
+    assert entries[-2]["game"] is None
+
+    before = reload_catalog()
+    assert set(before) == {"catalog one", "catalog three"}
+    assert before["catalog one"]["emoji"] == "🎲"
+    # The renamed game keeps its ID, and the ID lookup follows the rename
+    assert get_game_key_by_id(before["catalog three"]["id"]) == "catalog three"
+
+
+def test_stale_versions_are_rejected():
+    version = get_shared_game_version("catalog one")
+    assert update_shared_game("catalog one", {"max_players": 6}, expected_version=version)
+    # Based on the version before that change: rejected, nothing written
+    assert not upsert_shared_game("catalog one", game("Catalog One"), expected_version=version)
+    assert not delete_shared_game("catalog one", expected_version=version)
+    # A new game must not exist yet
+    assert not upsert_shared_game("catalog one", game("Catalog One"), expected_version=None)
+    assert not rename_shared_game("catalog one", "catalog three", game("Catalog Three"))
+    assert get_shared_game("catalog one")["max_players"] == 6
+
+
+def test_torn_journal_line_is_ignored():
+    expected = reload_catalog()
+    with open(get_shared_games_journal_file(), "a", encoding="utf-8") as f:
+        f.write('{"key": "catalog two", "game": {"na')
+    assert reload_catalog() == expected
+    # The next patch doesn't land on the torn line
+    assert update_shared_game("catalog three", {"emoji": "🃏"})
+    assert reload_catalog()["catalog three"]["emoji"] == "🃏"
+
+
+def test_compaction_folds_the_journal_into_the_snapshot():
+    assert delete_shared_game("catalog three")
+    expected = reload_catalog()
+    assert compact_shared_games() > 0
+    assert not get_shared_games_journal_file().exists()
+    snapshot = json.loads(get_shared_games_file().read_text(encoding="utf-8"))
+    assert {game_key: snapshot[game_key] for game_key in expected} == expected
+    assert "catalog three" not in snapshot
+    assert reload_catalog() == expected
+    assert compact_shared_games() == 0
+
+    # The journal starts over after a compaction
+    assert upsert_shared_game("catalog two", game("Catalog Two"))
+    assert get_shared_games_journal_file().exists()
+    assert set(reload_catalog()) == {"catalog one", "catalog two"}
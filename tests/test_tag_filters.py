@@ -0,0 +1,57 @@
+"""Tag filters: the cached per-server bitmask and the tag IDs of the pagination buttons."""
+import asyncio
+import json
+from core.config import get_games_file
+from core.data_manager import upsert_shared_game, save_server_game_list, load_games, get_sorted_games, filter_games
+from views.game_views import GameListPageButton
+from views.results_view import ResultsPageButton
+
+GUILD_ID = 2345
+LONG_TAG = "A tag written by hand that is much longer than what a custom_id has room for, " * 2
+
+
+def add_game(game_key: str, tags: list):
+    upsert_shared_game(game_key, {"name": game_key.title(), "min_players": 1, "max_players": 4, "tags": tags})
+
+
+def test_mask_follows_game_list_changed_on_disk():
+    add_game("alpha", ["coop"])
+    add_game("beta", ["coop"])
+    add_game("gamma", ["solo"])
+    save_server_game_list(["alpha", "gamma"], GUILD_ID)
+    get_sorted_games(GUILD_ID)  # builds the order index the mask is cached next to
+    assert list(filter_games(load_games(GUILD_ID), tag="coop", guild_id=GUILD_ID)) == ["alpha"]
+
+    # Another process enables one game and disables another: same number of games
+    get_games_file(GUILD_ID).write_text(json.dumps(["beta", "gamma"]), encoding="utf-8")
+    assert list(filter_games(load_games(GUILD_ID), tag="coop", guild_id=GUILD_ID)) == ["beta"]
+
+
+def resolve(button):
+    """Rebuild a button from its custom_id, as discord.py does on click."""
+    match = button.template.fullmatch(button.item.custom_id)
+    assert match is not None
+    return asyncio.run(type(button).from_custom_id(None, button.item, match))
+
+
+def test_long_tag_fits_in_custom_id():
+    add_game("delta", [LONG_TAG])
+    buttons = [
+        GameListPageButton(GUILD_ID, "name", "next", 0, tag=LONG_TAG.upper(), remote_play=True),
+        ResultsPageButton(GUILD_ID, "next", 0, tag=LONG_TAG, remote_play=True, period="2026-10-19-2"),
+    ]
+    for button in buttons:
+        assert len(button.item.custom_id) <= 100
+        clicked = resolve(button)
+        assert clicked.tag == LONG_TAG
+        assert clicked.remote_play
+
+
+def test_vanished_tag_matches_no_game():
+    add_game("epsilon", ["short-lived"])
+    save_server_game_list(["epsilon"], GUILD_ID)
+    button = GameListPageButton(GUILD_ID, "id", "next", 0, tag="short-lived")
+    add_game("epsilon", [])
+    clicked = resolve(button)
+    assert clicked.tag
+    assert not filter_games(load_games(GUILD_ID), tag=clicked.tag)
@@ -0,0 +1,85 @@
+"""Votes are acknowledged before they are saved (a save waits for its group commit)."""
+import asyncio
+import discord
+from discord.ext import commands
+from commands import voting_commands
+from commands.voting_commands import setup_voting_commands
+from core.data_manager import upsert_shared_game, save_server_game_list, load_games, load_votes, get_shared_game
+from views import voting_view
+from views.voting_view import VoteRatingModal
+
+GUILD_ID = 8201
+USER_ID = 82
+
+
+class FakeResponse:
+    def __init__(self):
+        self.deferred = False
+    
+    async def defer(self, **kwargs):
+        self.deferred = True
+
+
+class FakeFollowup:
+    def __init__(self):
+        self.messages = []
+    
+    async def send(self, content=None, **kwargs):
+        self.messages.append(content)
+
+
+class FakeUser:
+    id = USER_ID
+    
+    def __str__(self):
+        return "voter"
+
+
+class FakeGuild:
+    id = GUILD_ID
+
+
+class FakeInteraction:
+    guild = FakeGuild()
+    guild_id = GUILD_ID
+    
+    def __init__(self):
+        self.user = FakeUser()
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+    
+    async def edit_original_response(self, **kwargs):
+        pass
+
+
+def checking_set_user_vote(module, interaction, monkeypatch):
+    """Replace a module's set_user_vote with one checking that the interaction was acknowledged."""
+    set_user_vote = module.set_user_vote
+    
+    async def set_user_vote_after_defer(*args):
+        assert interaction.response.deferred
+        return await set_user_vote(*args)
+    
+    monkeypatch.setattr(module, "set_user_vote", set_user_vote_after_defer)
+
+
+def test_votes_are_deferred_before_they_are_saved(monkeypatch):
+    upsert_shared_game("deferred", {"name": "Deferred", "min_players": 1, "max_players": 4})
+    save_server_game_list(["deferred"], GUILD_ID)
+    game_id = get_shared_game("deferred").id
+    
+    interaction = FakeInteraction()
+    checking_set_user_vote(voting_view, interaction, monkeypatch)
+    modal = VoteRatingModal("deferred", load_games(GUILD_ID)["deferred"], GUILD_ID, str(USER_ID))
+    modal.rating_input._value = "4"
+    asyncio.run(modal.on_submit(interaction))
+    assert load_votes(GUILD_ID)[str(USER_ID)].get_rating(game_id) == 4
+    assert len(interaction.followup.messages) == 1
+    
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.none())
+    setup_voting_commands(bot)
+    interaction = FakeInteraction()
+    checking_set_user_vote(voting_commands, interaction, monkeypatch)
+    asyncio.run(bot.tree.get_command("rate").callback(interaction, game="deferred", stars=2))
+    assert load_votes(GUILD_ID)[str(USER_ID)].get_rating(game_id) == 2
+    assert len(interaction.followup.messages) == 1
@@ -1,94 +1,132 @@
 """Views and modals for game management (add, update, remove, list)."""
+import asyncio
 import discord
 import logging
-from core.data_manager import load_games, load_shared_games, add_game_to_shared, add_game_to_server, remove_game_from_server, get_next_game_id
+from core.data_manager import load_games, get_sorted_games, filter_games, load_server_game_list, upsert_shared_game, rename_shared_game, get_shared_game_version, get_game_key_by_name, get_shared_game
+from core.data_manager import get_tag_token, get_tag_by_token
+from core.models import Game, DEFAULT_EMOJI
+from core.guild_actors import add_game_to_server, remove_game_from_server, rename_game_on_server
 from core.translations import get_translation
+from core.permissions import can_manage_games
 
 logger = logging.getLogger(__name__)
 
 
 # ========== Game List Pagination ==========
 
-class GameListPaginationView(discord.ui.View):
-    """View for paginating through game list."""
+GAMES_PER_PAGE = 15  # Show 15 games per page
+
+
+class GameListPageButton(discord.ui.DynamicItem[discord.ui.Button], template=r"tati:games:(?P<guild_id>\d+):(?P<order>id|name|players):(?P<action>prev|next):(?P<page>\d+):(?P<remote_play>[01]):(?P<tag>[0-9a-f]*)"):
+    """Previous/next button of the game list pagination.
     
-    def __init__(self, games_data, guild_id: int, user_id: str):
-        super().__init__(timeout=300)
-        self.games_data = games_data  # List of (game_key, game_data) tuples
+    The guild, the sort order, the filters (the tag as its get_tag_token ID, since
+    a free-text tag could exceed the 100 characters of a custom_id), the action
+    and the page it was rendered on are encoded in the custom_id, the game list
+    is reloaded on click.
+    """
+    
+    def __init__(self, guild_id: int, order: str, action: str, page: int, disabled: bool = False, tag: str = None, remote_play: bool = False):
         self.guild_id = guild_id
-        self.user_id = user_id
-        self.current_page = 0
-        self.items_per_page = 15  # Show 15 games per page
+        self.order = order
+        self.action = action
+        self.page = page
+        self.tag = tag or None
+        self.remote_play = remote_play
+        super().__init__(
+            discord.ui.Button(
+                label="◀ Previous" if action == "prev" else "Next ▶",
+                style=discord.ButtonStyle.secondary,
+                disabled=disabled,
+                custom_id=f"tati:games:{guild_id}:{order}:{action}:{page}:{int(remote_play)}:{get_tag_token(tag) if tag else ''}"
+            )
+        )
     
-    def get_total_pages(self) -> int:
-        """Calculate total number of pages."""
-        return max(1, (len(self.games_data) + self.items_per_page - 1) // self.items_per_page)
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        # A tag no game has anymore is kept as its ID, which then matches no game
+        tag = match["tag"] and (get_tag_by_token(match["tag"]) or match["tag"])
+        return cls(
+            int(match["guild_id"]), match["order"], match["action"], int(match["page"]),
+            tag=tag, remote_play=match["remote_play"] == "1"
+        )
     
-    def get_current_page_data(self):
-        """Get games for current page."""
-        start = self.current_page * self.items_per_page
-        end = start + self.items_per_page
-        return self.games_data[start:end]
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.guild_id == self.guild_id
     
-    def create_embed(self) -> discord.Embed:
-        """Create embed for current page."""
-        from core.translations import get_translation
-        t = lambda k, **kw: get_translation(k, user_id=self.user_id, guild_id=self.guild_id, **kw)
-        
-        current_data = self.get_current_page_data()
-        game_list = []
-        
-        for game_key, game_data in current_data:
-            emoji = game_data.get("emoji", "🎮")
-            line = f"{emoji} **{game_data['name']}** - Players: {game_data['min_players']}-{game_data['max_players']}"
-            store_links = game_data.get("store_links", "")
-            if store_links:
-                # Truncate long store links
-                if len(store_links) > 50:
-                    store_links = store_links[:47] + "..."
-                line += f"\n   🔗 {store_links}"
-            game_list.append(line)
-        
-        total_pages = self.get_total_pages()
-        title = t("game_list_title")
-        if total_pages > 1:
-            title = f"{title} (Page {self.current_page + 1}/{total_pages})"
-        
-        embed = discord.Embed(
-            title=title,
-            description="\n".join(game_list) if game_list else t("error_no_games"),
-            color=discord.Color.green()
-        )
+    async def callback(self, interaction: discord.Interaction):
+        """Go to the previous or next page."""
+        games = filter_games(load_games(self.guild_id), tag=self.tag, remote_play=self.remote_play, guild_id=self.guild_id)
+        if not games:
+            await interaction.response.send_message(get_translation("error_no_games_filter", user_id=str(interaction.user.id), guild_id=self.guild_id), ephemeral=True)
+            return
+        games_data = get_sorted_games(self.guild_id, order=self.order, games=games)
         
-        embed.set_footer(text=f"Total games: {len(self.games_data)}")
+        total_pages = get_game_list_total_pages(games_data)
+        page = self.page - 1 if self.action == "prev" else self.page + 1
+        page = max(0, min(page, total_pages - 1))
         
-        return embed
+        embed = create_game_list_embed(games_data, page, self.guild_id, str(interaction.user.id))
+        view = GameListPaginationView(self.guild_id, page, total_pages, order=self.order, tag=self.tag, remote_play=self.remote_play)
+        await interaction.response.edit_message(embed=embed, view=view)
+
+
+class GameListPaginationView(discord.ui.View):
+    """View for paginating through game list (holds only its two buttons)."""
     
-    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary, disabled=True)
-    async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Go to previous page."""
-        if self.current_page > 0:
-            self.current_page -= 1
-            await self.update_message(interaction)
+    def __init__(self, guild_id: int, page: int, total_pages: int, order: str = "id", tag: str = None, remote_play: bool = False):
+        super().__init__(timeout=None)
+        self.add_item(GameListPageButton(guild_id, order, "prev", page, disabled=(page == 0), tag=tag, remote_play=remote_play))
+        self.add_item(GameListPageButton(guild_id, order, "next", page, disabled=(page >= total_pages - 1), tag=tag, remote_play=remote_play))
+
+
+def get_game_list_total_pages(games_data) -> int:
+    """Calculate total number of pages."""
+    return max(1, (len(games_data) + GAMES_PER_PAGE - 1) // GAMES_PER_PAGE)
+
+
+def create_game_list_embed(games_data, page: int, guild_id: int, user_id: str) -> discord.Embed:
+    """Create the game list embed for a page.
     
-    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
-    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Go to next page."""
-        total_pages = self.get_total_pages()
-        if self.current_page < total_pages - 1:
-            self.current_page += 1
-            await self.update_message(interaction)
+    Args:
+        games_data: List of (game_key, game_data) tuples in display order
+        page: Zero-based page index
+        guild_id: The Discord guild (server) ID
+        user_id: The user's ID as a string
     
-    async def update_message(self, interaction: discord.Interaction):
-        """Update the message with current page."""
-        total_pages = self.get_total_pages()
-        
-        # Update button states
-        self.previous_button.disabled = (self.current_page == 0)
-        self.next_button.disabled = (self.current_page >= total_pages - 1)
-        
-        embed = self.create_embed()
-        await interaction.response.edit_message(embed=embed, view=self)
+    Returns:
+        The embed for this page
+    """
+    t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=guild_id, **kw)
+    
+    start = page * GAMES_PER_PAGE
+    game_list = []
+    
+    for game_key, game_data in games_data[start:start + GAMES_PER_PAGE]:
+        emoji = game_data.emoji
+        line = f"{emoji} **{game_data['name']}** - Players: {game_data['min_players']}-{game_data['max_players']}"
+        store_links = game_data.store_links
+        if store_links:
+            # Truncate long store links
+            if len(store_links) > 50:
+                store_links = store_links[:47] + "..."
+            line += f"\n   🔗 {store_links}"
+        game_list.append(line)
+    
+    total_pages = get_game_list_total_pages(games_data)
+    title = t("game_list_title")
+    if total_pages > 1:
+        title = f"{title} (Page {page + 1}/{total_pages})"
+    
+    embed = discord.Embed(
+        title=title,
+        description="\n".join(game_list) if game_list else t("error_no_games"),
+        color=discord.Color.green()
+    )
+    
+    embed.set_footer(text=f"Total games: {len(games_data)}")
+    
+    return embed
 
 
 # ========== Game Update Modal and View ==========
@@ -103,6 +141,8 @@ class UpdateGameModal(discord.ui.Modal):
         self.game_data = game_data
         self.guild_id = guild_id
         self.user_id = user_id
+        # Version the form is based on: saving fails if someone else changed the game meanwhile
+        self.game_version = get_shared_game_version(game_key)
         
         # Pre-fill with current values
         self.name_input = discord.ui.TextInput(
@@ -135,7 +175,7 @@ class UpdateGameModal(discord.ui.Modal):
         self.emoji_input = discord.ui.TextInput(
             label=t("game_update_emoji_label"),
             placeholder=t("game_update_emoji_placeholder"),
-            default=game_data.get("emoji", "🎮"),
+            default=game_data.emoji,
             max_length=10,
             required=False
         )
@@ -145,7 +185,7 @@ class UpdateGameModal(discord.ui.Modal):
         self.store_links_input = discord.ui.TextInput(
             label=t("game_update_store_links_label"),
             placeholder=t("game_update_store_links_placeholder"),
-            default=game_data.get("store_links", ""),
+            default=game_data.store_links,
             max_length=500,
             required=False
         )
@@ -153,8 +193,15 @@ class UpdateGameModal(discord.ui.Modal):
     
     async def on_submit(self, interaction: discord.Interaction):
         """Handle modal submission."""
+        t = lambda k, **kw: get_translation(k, user_id=self.user_id, guild_id=self.guild_id, **kw)
         games = load_games(self.guild_id)
-        game = games[self.game_key]
+        if self.game_key not in games:
+            await interaction.response.send_message(t("error_game_not_found", game=self.game_data["name"]), ephemeral=True)
+            return
+        old_key = self.game_key
+        current = games[old_key]
+        # Editable copy of the shared record, saved below with upsert/rename
+        game = dict(current)
         changes = []
         
         # Update name if changed
@@ -162,7 +209,8 @@ class UpdateGameModal(discord.ui.Modal):
         new_key = None
         if new_name and new_name != game["name"]:
             new_key = new_name.lower()
-            if new_key != self.game_key and new_key in games:
+            existing_key = get_game_key_by_name(new_name)
+            if existing_key is not None and existing_key != self.game_key:
                 await interaction.response.send_message(
                     f"❌ A game with name '{new_name}' already exists!",
                     ephemeral=True
@@ -170,13 +218,6 @@ class UpdateGameModal(discord.ui.Modal):
                 return
             
             old_name = game["name"]
-            # If key changes, move the entry
-            if new_key != self.game_key:
-                games[new_key] = games[self.game_key].copy()
-                del games[self.game_key]
-                game = games[new_key]
-                self.game_key = new_key
-            
             game["name"] = new_name
             changes.append(f"Name: {old_name} → {new_name}")
         
@@ -229,14 +270,13 @@ class UpdateGameModal(discord.ui.Modal):
         
         # Update emoji if changed
         emoji = self.emoji_input.value.strip() if self.emoji_input.value else None
-        if emoji and emoji != game.get("emoji", "🎮"):
-            old_emoji = game.get("emoji", "🎮")
+        if emoji and emoji != current.emoji:
             game["emoji"] = emoji
-            changes.append(f"Emoji: {old_emoji} → {emoji}")
+            changes.append(f"Emoji: {current.emoji} → {emoji}")
         
         # Update store links if changed
         store_links = self.store_links_input.value.strip() if self.store_links_input.value else ""
-        old_store_links = game.get("store_links", "")
+        old_store_links = current.store_links
         if store_links != old_store_links:
             if store_links:
                 game["store_links"] = store_links
@@ -257,67 +297,90 @@ class UpdateGameModal(discord.ui.Modal):
             )
             return
         
-        # Update shared games with the changes
-        # Handle name/key change (new_key was defined earlier if name changed)
-        if new_name and new_name != game["name"] and new_key != self.game_key:
-            # Remove old key from server list, add new key
-            from core.data_manager import remove_game_from_server, add_game_to_server, save_shared_games
-            remove_game_from_server(self.game_key, self.guild_id)
-            add_game_to_server(new_key, self.guild_id)
-            # Update shared games: remove old, add new
-            shared_games = load_shared_games()
-            if self.game_key in shared_games:
-                del shared_games[self.game_key]
-            shared_games[new_key] = game.copy()
-            save_shared_games(shared_games)
+        # Save the game as a single patch, checked against the version the form was opened with
+        if new_key is not None and new_key != old_key:
+            saved = await asyncio.to_thread(rename_shared_game, old_key, new_key, game, expected_version=self.game_version)
+            if saved:
+                # Move the server list entry to the new key
+                await rename_game_on_server(old_key, new_key, self.guild_id)
+                self.game_key = new_key
         else:
-            # Just update the shared game definition
-            add_game_to_shared(self.game_key, game)
+            saved = await asyncio.to_thread(upsert_shared_game, old_key, game, expected_version=self.game_version)
+        
+        if not saved:
+            await interaction.response.send_message(t("game_edit_conflict"), ephemeral=True)
+            return
         
         logger.info(f"Game updated: '{game['name']}' by {interaction.user} (ID: {interaction.user.id}) in guild {self.guild_id} - Changes: {', '.join(changes)}")
         
-        game_emoji = game.get("emoji", "🎮")
-        response = f"✅ Updated {game_emoji} **{game['name']}**\n"
+        response = f"✅ Updated {Game.from_dict(game).emoji} **{game['name']}**\n"
         response += "\n".join([f"• {change}" for change in changes])
         
         await interaction.response.send_message(response, ephemeral=True)
 
 
+class UpdateGameSelect(discord.ui.DynamicItem[discord.ui.Select], template=r"tati:game_update:(?P<guild_id>\d+)"):
+    """Game select menu that opens the update modal."""
+    
+    def __init__(self, guild_id: int, select: discord.ui.Select = None, placeholder: str = None, options=None):
+        self.guild_id = guild_id
+        if select is None:
+            select = discord.ui.Select(
+                placeholder=placeholder,
+                options=options,
+                custom_id=f"tati:game_update:{guild_id}"
+            )
+        super().__init__(select)
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls(int(match["guild_id"]), select=item)
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.guild_id == self.guild_id and can_manage_games(interaction.user, interaction.guild)
+    
+    async def callback(self, interaction: discord.Interaction):
+        """Handle game selection - show modal to update."""
+        user_id = str(interaction.user.id)
+        game_key = self.item.values[0]
+        games = load_games(self.guild_id)
+        
+        if game_key not in games:
+            t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=self.guild_id, **kw)
+            await interaction.response.send_message(t("error_game_not_found", game=game_key), ephemeral=True)
+            return
+        
+        modal = UpdateGameModal(game_key, games[game_key], self.guild_id, user_id)
+        await interaction.response.send_modal(modal)
+
+
 class UpdateGameView(discord.ui.View):
     """View for selecting a game to update."""
     
     def __init__(self, games, guild_id, user_id):
-        super().__init__(timeout=300)
-        self.games = games
-        self.guild_id = guild_id
-        self.user_id = user_id
+        super().__init__(timeout=None)
         
         t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=guild_id, **kw)
         
         # Create select menu with games (showing name only)
-        self.game_select = discord.ui.Select(
+        self.add_item(UpdateGameSelect(
+            guild_id,
             placeholder=t("game_update_select"),
-            options=[
-                discord.SelectOption(
-                    label=game_data['name'],
-                    description=t("vote_players_desc", min=game_data['min_players'], max=game_data['max_players']),
-                    value=game_key,
-                    emoji=game_data.get("emoji", "🎮")
-                )
-                for game_key, game_data in sorted(games.items(), key=lambda x: (x[1].get("id", 9999), x[1]["name"]))
-            ]
+            options=_game_select_options(get_sorted_games(guild_id, games=games), t)
+        ))
+
+
+def _game_select_options(sorted_games, t):
+    """Build select options (name, player range, emoji) for games in display order."""
+    return [
+        discord.SelectOption(
+            label=game_data['name'],
+            description=t("vote_players_desc", min=game_data['min_players'], max=game_data['max_players']),
+            value=game_key,
+            emoji=game_data.emoji
         )
-        self.game_select.callback = self.on_game_selected
-        self.add_item(self.game_select)
-    
-    async def on_game_selected(self, interaction: discord.Interaction):
-        """Handle game selection - show modal to update."""
-        game_key = self.game_select.values[0]
-        game_data = self.games[game_key]
-        
-        user_id = str(interaction.user.id)
-        modal = UpdateGameModal(game_key, game_data, self.guild_id, user_id)
-        await interaction.response.send_modal(modal)
+        for game_key, game_data in sorted_games
+    ]
 
 
 # ========== Game Removal Modal and View ==========
@@ -359,10 +422,10 @@ class RemoveGameConfirmationModal(discord.ui.Modal):
         
         t = lambda k, **kw: get_translation(k, user_id=self.user_id, guild_id=self.guild_id, **kw)
         game_name = self.game_data["name"]
-        game_id = self.game_data.get("id", "?")
+        game_id = self.game_data.id or "?"
         
         # Remove from server's game list (but keep in shared games)
-        remove_game_from_server(self.game_key, self.guild_id)
+        await remove_game_from_server(self.game_key, self.guild_id)
         
         logger.info(f"Game removed from server: '{game_name}' (ID: {game_id}) by {interaction.user} (ID: {interaction.user.id}) in guild {self.guild_id}")
         
@@ -372,41 +435,56 @@ class RemoveGameConfirmationModal(discord.ui.Modal):
         )
 
 
+class RemoveGameSelect(discord.ui.DynamicItem[discord.ui.Select], template=r"tati:game_remove:(?P<guild_id>\d+)"):
+    """Game select menu that opens the removal confirmation modal."""
+    
+    def __init__(self, guild_id: int, select: discord.ui.Select = None, placeholder: str = None, options=None):
+        self.guild_id = guild_id
+        if select is None:
+            select = discord.ui.Select(
+                placeholder=placeholder,
+                options=options,
+                custom_id=f"tati:game_remove:{guild_id}"
+            )
+        super().__init__(select)
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls(int(match["guild_id"]), select=item)
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.guild_id == self.guild_id and can_manage_games(interaction.user, interaction.guild)
+    
+    async def callback(self, interaction: discord.Interaction):
+        """Handle game selection - show confirmation modal."""
+        user_id = str(interaction.user.id)
+        game_key = self.item.values[0]
+        games = load_games(self.guild_id)
+        
+        if game_key not in games:
+            t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=self.guild_id, **kw)
+            await interaction.response.send_message(t("error_game_not_found", game=game_key), ephemeral=True)
+            return
+        
+        # Show confirmation modal
+        modal = RemoveGameConfirmationModal(game_key, games[game_key], self.guild_id, user_id)
+        await interaction.response.send_modal(modal)
+
+
 class RemoveGameView(discord.ui.View):
     """View for selecting a game to remove."""
     
     def __init__(self, games, guild_id, user_id):
-        super().__init__(timeout=300)
-        self.games = games
-        self.guild_id = guild_id
-        self.user_id = user_id
+        super().__init__(timeout=None)
         
         t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=guild_id, **kw)
         
         # Create select menu with games (showing name only)
-        self.game_select = discord.ui.Select(
+        self.add_item(RemoveGameSelect(
+            guild_id,
             placeholder=t("game_remove_select"),
-            options=[
-                discord.SelectOption(
-                    label=game_data['name'],
-                    description=t("vote_players_desc", min=game_data['min_players'], max=game_data['max_players']),
-                    value=game_key,
-                    emoji=game_data.get("emoji", "🎮")
-                )
-                for game_key, game_data in sorted(games.items(), key=lambda x: (x[1].get("id", 9999), x[1]["name"]))
-            ]
-        )
-        self.game_select.callback = self.on_game_selected
-        self.add_item(self.game_select)
-    
-    async def on_game_selected(self, interaction: discord.Interaction):
-        """Handle game selection - show confirmation modal."""
-        game_key = self.game_select.values[0]
-        game_data = self.games[game_key]
-        
-        # Show confirmation modal
-        modal = RemoveGameConfirmationModal(game_key, game_data, self.guild_id, self.user_id)
-        await interaction.response.send_modal(modal)
+            options=_game_select_options(get_sorted_games(guild_id, games=games), t)
+        ))
 
 
 # ========== Add Game Modal ==========
@@ -453,7 +531,7 @@ class AddGameModal(discord.ui.Modal):
         self.emoji_input = discord.ui.TextInput(
             label=t("game_add_emoji_label"),
             placeholder=t("game_add_emoji_placeholder"),
-            default="🎮",
+            default=DEFAULT_EMOJI,
             max_length=10,
             required=False
         )
@@ -497,7 +575,7 @@ class AddGameModal(discord.ui.Modal):
             max_players = 10
         
         # Get emoji (default 🎮)
-        emoji = self.emoji_input.value.strip() if self.emoji_input.value else "🎮"
+        emoji = self.emoji_input.value.strip() if self.emoji_input.value else DEFAULT_EMOJI
         
         # Get store links (optional)
         store_links = self.store_links_input.value.strip() if self.store_links_input.value else ""
@@ -518,23 +596,23 @@ class AddGameModal(discord.ui.Modal):
             return
         
         # Check if game already exists in this server
-        games = load_games(self.guild_id)
-        game_key = name.lower()
+        game_key = get_game_key_by_name(name) or name.lower()
         
-        if game_key in games:
+        if game_key in load_server_game_list(self.guild_id):
             await interaction.response.send_message(
                 t("game_exists", name=name),
                 ephemeral=True
             )
             return
         
-        # Get next ID from shared games
-        shared_games = load_shared_games()
-        game_id = get_next_game_id(shared_games)
+        # Keep the ID of a shared game with the same name, otherwise the catalog
+        # gives the game the next free ID when it is saved
+        existing_game = get_shared_game(game_key)
+        existing_version = get_shared_game_version(game_key)
         
         # Create game data
         game_data = {
-            "id": game_id,
+            "id": existing_game.id if existing_game else None,
             "name": name,
             "min_players": min_players,
             "max_players": max_players,
@@ -543,11 +621,13 @@ class AddGameModal(discord.ui.Modal):
         if store_links:
             game_data["store_links"] = store_links
         
-        # Add to shared games database
-        add_game_to_shared(game_key, game_data)
+        # Add to shared games database (fails if the game was created or changed meanwhile)
+        if not await asyncio.to_thread(upsert_shared_game, game_key, game_data, expected_version=existing_version):
+            await interaction.response.send_message(t("game_edit_conflict"), ephemeral=True)
+            return
         
         # Add to server's game list
-        add_game_to_server(game_key, self.guild_id)
+        await add_game_to_server(game_key, self.guild_id)
         
         logger.info(f"Game added: '{name}' (Players: {min_players}-{max_players}, Emoji: {emoji}) by {interaction.user} (ID: {interaction.user.id}) in guild {self.guild_id}")
         
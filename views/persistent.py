@@ -0,0 +1,17 @@
+"""Registration of the persistent (stateless) UI components."""
+import discord
+from .voting_view import VoteRestoreButton, VoteGameSelect
+from .results_view import ResultsPageButton
+from .game_views import GameListPageButton, UpdateGameSelect, RemoveGameSelect
+
+
+def setup_persistent_views(bot: discord.ext.commands.Bot):
+    """Register the dynamic components once so their custom_ids are routed after restarts."""
+    bot.add_dynamic_items(
+        VoteRestoreButton,
+        VoteGameSelect,
+        ResultsPageButton,
+        GameListPageButton,
+        UpdateGameSelect,
+        RemoveGameSelect
+    )
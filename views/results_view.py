@@ -1,112 +1,189 @@
 """Pagination view for results."""
 import discord
-from typing import List, Tuple
+from core.data_manager import load_votes_in_period, load_games, filter_games, get_tag_token, get_tag_by_token
+from core.user_profiles import get_display_name
+from core.translations import get_translation
 
+RESULTS_PER_PAGE = 10
 
-class ResultsPaginationView(discord.ui.View):
-    """View for paginating through results."""
+
+def compute_results(games: dict, votes: dict) -> dict:
+    """Score games from the votes of available players.
+    
+    Args:
+        games: Dictionary of games enabled on the server
+        votes: Dictionary of user ID -> UserVotes for the server
+    
+    Returns:
+        Dictionary with available_players, voters, game_scores and games_data
+        (list of (game_key, game, score) tuples for compatible games, best first)
+    """
+    # Count available players
+    available_users = {
+        uid: user_votes for uid, user_votes in votes.items()
+        if not user_votes.unavailable
+    }
+    available_players = len(available_users)
+    
+    # Calculate game scores (ratings are indexed by game ID)
+    game_ids = [(game_key, game.id) for game_key, game in games.items()]
+    game_scores = {game_key: 0 for game_key in games.keys()}
+    for user_votes in available_users.values():
+        for game_key, game_id in game_ids:
+            game_scores[game_key] += user_votes.get_rating(game_id)
+    
+    # Filter games by player count compatibility, sorted by score
+    compatible_games = [
+        (game_key, score) for game_key, score in game_scores.items()
+        if games[game_key].min_players <= available_players <= games[game_key].max_players
+    ]
+    compatible_games.sort(key=lambda x: x[1], reverse=True)
     
-    def __init__(self, games_data: List[Tuple], available_players: int, guild_id: int, user_id: str, best_game_key: str = None, best_game_data: dict = None, best_score: int = None, voters: list = None):
-        super().__init__(timeout=300)
-        self.games_data = games_data  # List of (game_key, game, score) tuples
-        self.available_players = available_players
+    return {
+        "available_players": available_players,
+        "voters": [get_display_name(uid) for uid in available_users],
+        "game_scores": game_scores,
+        "games_data": [(game_key, games[game_key], score) for game_key, score in compatible_games]
+    }
+
+
+class ResultsPageButton(discord.ui.DynamicItem[discord.ui.Button], template=r"tati:results:(?P<guild_id>\d+):(?P<action>prev|next):(?P<page>\d+):(?P<remote_play>[01]):(?P<period>[0-9-]*):(?P<tag>[0-9a-f]*)"):
+    """Previous/next button of the results pagination.
+    
+    The guild, the filters (the tag as its get_tag_token ID, since a free-text
+    tag could exceed the 100 characters of a custom_id), the voting period
+    (empty for the current one), the action and the page it was rendered on are
+    encoded in the custom_id, results are recomputed from the stored votes on click.
+    """
+    
+    def __init__(self, guild_id: int, action: str, page: int, disabled: bool = False, tag: str = None, remote_play: bool = False, period: str = None):
         self.guild_id = guild_id
-        self.user_id = user_id
-        self.current_page = 0
-        self.items_per_page = 10
-        self.best_game_key = best_game_key
-        self.best_game_data = best_game_data
-        self.best_score = best_score
-        self.voters = voters
-        
-    def get_total_pages(self) -> int:
-        """Calculate total number of pages."""
-        return max(1, (len(self.games_data) + self.items_per_page - 1) // self.items_per_page)
-    
-    def get_current_page_data(self) -> List[Tuple]:
-        """Get games for current page."""
-        start = self.current_page * self.items_per_page
-        end = start + self.items_per_page
-        return self.games_data[start:end]
-    
-    def create_embed(self, best_game_key: str = None, best_game_data: dict = None, best_score: int = None, voters: list = None) -> discord.Embed:
-        """Create embed for current page."""
-        from core.translations import get_translation
-        t = lambda k, **kw: get_translation(k, user_id=self.user_id, guild_id=self.guild_id, **kw)
-        
-        embed = discord.Embed(
-            title=t("results_title"),
-            description=t("results_available_players", count=self.available_players),
-            color=discord.Color.gold()
-        )
-        
-        # Show recommended game on first page
-        if self.current_page == 0 and best_game_data and best_game_key:
-            best_emoji = best_game_data.get('emoji', '🎮')
-            embed.add_field(
-                name=t("results_recommended"),
-                value=f"{best_emoji} **{best_game_data['name']}**\n"
-                      f"{t('results_recommended_score', score=best_score)}\n"
-                      f"{t('results_recommended_players', min=best_game_data['min_players'], max=best_game_data['max_players'])}",
-                inline=False
+        self.action = action
+        self.page = page
+        self.tag = tag or None
+        self.remote_play = remote_play
+        self.period = period or None
+        super().__init__(
+            discord.ui.Button(
+                label="◀ Previous" if action == "prev" else "Next ▶",
+                style=discord.ButtonStyle.secondary,
+                disabled=disabled,
+                custom_id=f"tati:results:{guild_id}:{action}:{page}:{int(remote_play)}:{period or ''}:{get_tag_token(tag) if tag else ''}"
             )
+        )
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        # A tag no game has anymore is kept as its ID, which then matches no game
+        tag = match["tag"] and (get_tag_by_token(match["tag"]) or match["tag"])
+        return cls(
+            int(match["guild_id"]), match["action"], int(match["page"]),
+            tag=tag, remote_play=match["remote_play"] == "1", period=match["period"]
+        )
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.guild_id == self.guild_id
+    
+    async def callback(self, interaction: discord.Interaction):
+        """Go to the previous or next page."""
+        user_id = str(interaction.user.id)
+        votes = load_votes_in_period(self.guild_id, self.period)
+        games = filter_games(load_games(self.guild_id), tag=self.tag, remote_play=self.remote_play, guild_id=self.guild_id)
+        if not games:
+            await interaction.response.send_message(get_translation("error_no_games_filter", user_id=user_id, guild_id=self.guild_id), ephemeral=True)
+            return
+        results = compute_results(games, votes)
         
-        current_data = self.get_current_page_data()
-        game_list = []
-        
-        for game_key, game, score in current_data:
-            game_emoji = game.get('emoji', '🎮')
-                marker = "•"
-            line = f"{marker} {game_emoji} **{game['name']}** - {score} points (Players: {game['min_players']}-{game['max_players']})"
-            # Add store links if available
-            store_links = game.get("store_links", "")
-            if store_links:
-                line += f"\n   🔗 {store_links}"
-            game_list.append(line)
-        
-        total_pages = self.get_total_pages()
-        field_name = t("results_all_games")
-        if total_pages > 1:
-            field_name = f"{field_name} (Page {self.current_page + 1}/{total_pages})"
+        total_pages = get_total_pages(results["games_data"])
+        page = self.page - 1 if self.action == "prev" else self.page + 1
+        page = max(0, min(page, total_pages - 1))
         
+        embed = create_results_embed(results, page, self.guild_id, user_id, period=self.period)
+        view = ResultsPaginationView(self.guild_id, page, total_pages, tag=self.tag, remote_play=self.remote_play, period=self.period)
+        await interaction.response.edit_message(embed=embed, view=view)
+
+
+class ResultsPaginationView(discord.ui.View):
+    """View for paginating through results (holds only its two buttons)."""
+    
+    def __init__(self, guild_id: int, page: int, total_pages: int, tag: str = None, remote_play: bool = False, period: str = None):
+        super().__init__(timeout=None)
+        for action, disabled in (("prev", page == 0), ("next", page >= total_pages - 1)):
+            self.add_item(ResultsPageButton(guild_id, action, page, disabled=disabled, tag=tag, remote_play=remote_play, period=period))
+
+
+def get_total_pages(games_data) -> int:
+    """Calculate total number of pages."""
+    return max(1, (len(games_data) + RESULTS_PER_PAGE - 1) // RESULTS_PER_PAGE)
+
+
+def create_results_embed(results: dict, page: int, guild_id: int, user_id: str, period: str = None) -> discord.Embed:
+    """Create the results embed for a page.
+    
+    Args:
+        results: Results from compute_results (with at least one compatible game)
+        page: Zero-based page index
+        guild_id: The Discord guild (server) ID
+        user_id: The user's ID as a string
+        period: Voting period shown in the footer (for results of a past date)
+    
+    Returns:
+        The embed for this page
+    """
+    t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=guild_id, **kw)
+    games_data = results["games_data"]
+    
+    embed = discord.Embed(
+        title=t("results_title"),
+        description=t("results_available_players", count=results["available_players"]),
+        color=discord.Color.gold()
+    )
+    
+    # Show recommended game on first page
+    if page == 0 and games_data:
+        best_game_key, best_game_data, best_score = games_data[0]
+        best_emoji = best_game_data.emoji
         embed.add_field(
-            name=field_name,
-            value="\n".join(game_list) if game_list else "None",
+            name=t("results_recommended"),
+            value=f"{best_emoji} **{best_game_data['name']}**\n"
+                  f"{t('results_recommended_score', score=best_score)}\n"
+                  f"{t('results_recommended_players', min=best_game_data['min_players'], max=best_game_data['max_players'])}",
             inline=False
         )
-        
-        # Show voters on first page
-        if self.current_page == 0 and voters:
-            embed.add_field(
-                name=t("results_voters"),
-                value=", ".join(voters) if voters else "None",
-                inline=False
-            )
-        
-        return embed
-    
-    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary, disabled=True)
-    async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Go to previous page."""
-        if self.current_page > 0:
-            self.current_page -= 1
-            await self.update_message(interaction)
-    
-    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
-    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Go to next page."""
-        total_pages = self.get_total_pages()
-        if self.current_page < total_pages - 1:
-            self.current_page += 1
-            await self.update_message(interaction)
-    
-    async def update_message(self, interaction: discord.Interaction):
-        """Update the message with current page."""
-        total_pages = self.get_total_pages()
-        
-        # Update button states
-        self.previous_button.disabled = (self.current_page == 0)
-        self.next_button.disabled = (self.current_page >= total_pages - 1)
-        
-        embed = self.create_embed(self.best_game_key, self.best_game_data, self.best_score, self.voters)
-        await interaction.response.edit_message(embed=embed, view=self)
+    
+    start = page * RESULTS_PER_PAGE
+    game_list = []
+    for game_key, game, score in games_data[start:start + RESULTS_PER_PAGE]:
+        game_emoji = game.emoji
+        marker = "•"
+        line = f"{marker} {game_emoji} **{game['name']}** - {score} points (Players: {game['min_players']}-{game['max_players']})"
+        # Add store links if available
+        store_links = game.store_links
+        if store_links:
+            line += f"\n   🔗 {store_links}"
+        game_list.append(line)
+    
+    total_pages = get_total_pages(games_data)
+    field_name = t("results_all_games")
+    if total_pages > 1:
+        field_name = f"{field_name} (Page {page + 1}/{total_pages})"
+    
+    embed.add_field(
+        name=field_name,
+        value="\n".join(game_list) if game_list else "None",
+        inline=False
+    )
+    
+    # Show voters on first page
+    voters = results["voters"]
+    if page == 0:
+        embed.add_field(
+            name=t("results_voters"),
+            value=", ".join(voters) if voters else "None",
+            inline=False
+        )
+    
+    if period:
+        embed.set_footer(text=t("history_period", period=period))
+    
+    return embed
@@ -1,20 +1,33 @@
-"""Voting view for interactive game voting."""
-import discord
+"""Voting view for interactive game voting.
+
+The voting components are stateless: every button and select encodes the guild
+in its ``custom_id`` and reloads games and votes from ``core.data_manager`` when
+it is used. They are registered once at startup (see ``views.persistent``), so
+an open voting menu costs no memory on the bot and keeps working after restarts.
+"""
 import asyncio
+import discord
 import logging
-from core.data_manager import load_votes, save_votes, find_user_votes_in_old_files
+from core.data_manager import load_games, load_votes, find_user_votes_in_archive, get_sorted_games
+from core.data_manager import get_game_key_by_id, assign_game_id
+from core.guild_actors import set_user_vote, mutate_votes
+from core.models import UserVotes
+from core.user_profiles import update_user_profile
 from core.translations import get_translation
 
 logger = logging.getLogger(__name__)
 
+MAX_OPTIONS_PER_MENU = 25
+MAX_ACTION_ROWS = 5  # Discord limit: 5 action rows per message
+
 
 class VoteRatingModal(discord.ui.Modal):
     """Modal for entering a rating for a selected game."""
     
-    def __init__(self, game_key, game_data, games, guild_id, user_id, embed, view):
+    def __init__(self, game_key, game_data, guild_id, user_id):
         t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=guild_id, **kw)
         game_name = game_data["name"]
-        game_emoji = game_data.get("emoji", "🎮")
+        game_emoji = game_data.emoji
         
         # Modal title with game name (truncate if too long for Discord's 45 char limit)
         title_text = f"{game_emoji} {game_name}"
@@ -23,17 +36,12 @@ class VoteRatingModal(discord.ui.Modal):
         super().__init__(title=t("vote_modal_title", game=title_text))
         self.game_key = game_key
         self.game_data = game_data
-        self.games = games
         self.guild_id = guild_id
         self.user_id = user_id
-        self.embed = embed
-        self.view = view
         
         # Check for existing rating
         votes = load_votes(guild_id)
-        existing_rating = None
-        if user_id in votes:
-            existing_rating = votes[user_id].get("votes", {}).get(game_key)
+        existing_rating = votes[user_id].get_rating(game_data.id) if user_id in votes else 0
         
         # Rating input (1-5)
         self.rating_input = discord.ui.TextInput(
@@ -63,34 +71,17 @@ class VoteRatingModal(discord.ui.Modal):
             )
             return
         
-        # Save the vote
-        votes = load_votes(self.guild_id)
-        
-        from core.translations import get_user_language
-        
-        if user_id not in votes:
-            votes[user_id] = {
-                "username": str(interaction.user),
-                "votes": {},
-                "language": get_user_language(user_id, self.guild_id)
-            }
+        # Acknowledge first: the vote is only saved once its group commit is on disk
+        await interaction.response.defer(ephemeral=True)
         
-        votes[user_id]["votes"][self.game_key] = rating
-        votes[user_id]["username"] = str(interaction.user)
-        # Mark as available when voting (remove unavailable flag)
-        votes[user_id]["unavailable"] = False
-        save_votes(votes, self.guild_id)
+        # Save the vote (a game added without an ID gets one first)
+        game_id = self.game_data.id or await asyncio.to_thread(assign_game_id, self.game_key)
+        await set_user_vote(self.guild_id, user_id, str(interaction.user), game_id, rating)
         
         logger.info(f"Vote saved: {interaction.user} (ID: {user_id}) voted {rating}/5 for '{self.game_data['name']}' in guild {self.guild_id}")
         
         # Update the embed table
-        await interaction.response.defer(ephemeral=True)
-        
-        # Update the view's user_votes to reflect the change
-        self.view.user_votes[user_id] = votes[user_id]
-        
-        # Update embed table
-        await self.view._update_embed_table(interaction, user_id)
+        await _update_voting_message(interaction, self.guild_id, user_id)
         
         # Send confirmation (ephemeral message - user will see it briefly)
         await interaction.followup.send(
@@ -99,17 +90,16 @@ class VoteRatingModal(discord.ui.Modal):
         )
 
 
-def _generate_vote_table_fields(games, user_votes_data):
+def _generate_vote_table_fields(sorted_games, user_votes):
     """Generate embed table fields for the voting table.
     
     Args:
-        games: Dictionary of games
-        user_votes_data: Dictionary of user's votes {game_key: rating}
+        sorted_games: List of (game_key, game_data) tuples in display order
+        user_votes: The user's UserVotes
     
     Returns:
         List of tuples (field_name, field_value) for embed.add_field()
     """
-    sorted_games = sorted(games.items(), key=lambda x: (x[1].get("id", 9999), x[1]["name"]))
     MAX_FIELD_LENGTH = 1000  # Leave some buffer under 1024
     
     # Build compact table format
@@ -124,9 +114,8 @@ def _generate_vote_table_fields(games, user_votes_data):
     
     for game_key, game_data in sorted_games:
         game_name = game_data["name"]
-        game_id = game_data.get("id", "?")
-        emoji = game_data.get("emoji", "🎮")
-        rating = user_votes_data.get(game_key, 0)
+        emoji = game_data.emoji
+        rating = user_votes.get_rating(game_data.id)
         players = f"{game_data['min_players']}-{game_data['max_players']}"
         
         # More compact format - shorter game names, simpler rating
@@ -167,106 +156,77 @@ def _generate_vote_table_fields(games, user_votes_data):
     return fields
 
 
-class VotingView(discord.ui.View):
-    """Interactive voting view with dropdown for game selection (opens modal for rating)."""
+def build_voting_message(guild_id: int, user_id: str, games=None, votes=None):
+    """Build the voting embed and view for a user from the current guild data.
+    
+    Args:
+        guild_id: The Discord guild (server) ID
+        user_id: The user's ID as a string
+        games: Optional games dict from load_games (will load if not provided)
+        votes: Optional votes dict (will load if not provided)
+    
+    Returns:
+        Tuple of (embed, view)
+    """
+    t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=guild_id, **kw)
+    sorted_games = get_sorted_games(guild_id, games=games)
+    if votes is None:
+        votes = load_votes(guild_id)
+    user_votes = votes.get(user_id) or UserVotes()
+    
+    # Create embed with table of games and ratings
+    embed = discord.Embed(
+        title=t("vote_title"),
+        description=t("vote_description"),
+        color=discord.Color.blue()
+    )
+    
+    # Generate table fields using helper function
+    for field_name, field_value in _generate_vote_table_fields(sorted_games, user_votes):
+        embed.add_field(name=field_name, value=field_value, inline=False)
+    
+    view = VotingView(sorted_games, guild_id, user_id)
+    return embed, view
+
+
+async def _update_voting_message(interaction: discord.Interaction, guild_id: int, user_id: str):
+    """Rebuild the voting message the interaction came from with the user's current votes."""
+    try:
+        embed, view = build_voting_message(guild_id, user_id)
+        await interaction.edit_original_response(embed=embed, view=view)
+    except Exception as e:
+        logger.warning(f"Failed to update embed table: {e}")
+
+
+class VoteRestoreButton(discord.ui.DynamicItem[discord.ui.Button], template=r"tati:vote_restore:(?P<guild_id>\d+)"):
+    """Button restoring the user's votes from the last voting period."""
     
-    def __init__(self, games, user_votes, guild_id, user_id):
-        super().__init__(timeout=300)  # 5 minute timeout
-        self.games = games
-        self.user_votes = user_votes
+    def __init__(self, guild_id: int, label: str = None):
         self.guild_id = guild_id
-        self.user_id = user_id
-        self.embed = None  # Will store the embed reference for updates
-        
-        # Get translation function for this user
-        t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=guild_id, **kw)
-        
-        # Add restore previous votes button FIRST (above dropdowns)
-        self.restore_button = discord.ui.Button(
-            label=t("vote_restore_button"),
-            style=discord.ButtonStyle.secondary
-        )
-        self.restore_button.callback = self.on_restore_clicked
-        self.add_item(self.restore_button)
-        
-        # Create select menus with games (Discord limits: 25 options per menu, 5 action rows per message)
-        # Split games into chunks of 25
-        sorted_games = sorted(games.items(), key=lambda x: (x[1].get("id", 9999), x[1]["name"]))
-        MAX_OPTIONS_PER_MENU = 25
-        MAX_ACTION_ROWS = 5  # Discord limit: 5 action rows per message
-        
-        # Calculate chunks
-        game_chunks = [sorted_games[i:i + MAX_OPTIONS_PER_MENU] for i in range(0, len(sorted_games), MAX_OPTIONS_PER_MENU)]
-        
-        # Filter out empty chunks (shouldn't happen, but safety check)
-        game_chunks = [chunk for chunk in game_chunks if chunk]
-        
-        # Limit to MAX_ACTION_ROWS - 1 (reserve 1 for the restore button)
-        # If we have more chunks than allowed, we'll only show the first N chunks
-        max_chunks = MAX_ACTION_ROWS - 1
-        if len(game_chunks) > max_chunks:
-            logger.warning(f"Too many games ({len(sorted_games)}) for voting view. Showing first {max_chunks * MAX_OPTIONS_PER_MENU} games.")
-            game_chunks = game_chunks[:max_chunks]
-        
-        logger.debug(f"Creating {len(game_chunks)} select menus for {len(sorted_games)} games. Chunk sizes: {[len(c) for c in game_chunks]}")
-        
-        # Store select menus for callback handling
-        self.game_selects = []
-        
-        for chunk_idx, chunk in enumerate(game_chunks):
-            # Skip empty chunks
-            if not chunk:
-                continue
-            
-            # Ensure chunk doesn't exceed limit (safety check)
-            chunk = chunk[:MAX_OPTIONS_PER_MENU]
-            
-            # Create placeholder text
-            if len(game_chunks) > 1:
-                placeholder = t('vote_select_game')
-            else:
-                placeholder = t("vote_select_game")
-            
-            # Create options list
-            options = []
-            for game_key, game_data in chunk:
-                options.append(
-                    discord.SelectOption(
-                        label=game_data['name'],
-                        description=t("vote_players_desc", min=game_data['min_players'], max=game_data['max_players']),
-                        value=game_key,
-                        emoji=game_data.get("emoji", "🎮")
-                    )
-                )
-            
-            # Safety check: ensure we have at least 1 option and at most 25
-            if not options:
-                continue
-            if len(options) > MAX_OPTIONS_PER_MENU:
-                options = options[:MAX_OPTIONS_PER_MENU]
-            
-            game_select = discord.ui.Select(
-                placeholder=placeholder,
-                options=options
+        super().__init__(
+            discord.ui.Button(
+                label=label,
+                style=discord.ButtonStyle.secondary,
+                custom_id=f"tati:vote_restore:{guild_id}"
             )
-            # Create a callback that captures this specific select
-            def make_callback(select_menu):
-                async def callback(interaction: discord.Interaction):
-                    await self.on_game_selected(interaction, select_menu)
-                return callback
-            game_select.callback = make_callback(game_select)
-            self.game_selects.append(game_select)
-            self.add_item(game_select)
+        )
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["guild_id"]), label=item.label)
     
-    async def on_restore_clicked(self, interaction: discord.Interaction):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.guild_id == self.guild_id
+    
+    async def callback(self, interaction: discord.Interaction):
         """Restore votes from the last voting period - PERSONAL ONLY (doesn't affect others).
         Searches through all old vote files to find user's most recent votes."""
         # Get the current user's ID - this ensures only this user's votes are restored
         user_id = str(interaction.user.id)
-        t = lambda k, **kw: get_translation(k, user_id=user_id, **kw)
+        t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=self.guild_id, **kw)
         
-        # Search through all old vote files to find this user's votes
-        old_votes, found_file = find_user_votes_in_old_files(user_id, self.guild_id)
+        # Search the archived periods (newest first) for this user's votes
+        old_votes, period = find_user_votes_in_archive(user_id, self.guild_id)
         
         if not old_votes or user_id not in old_votes:
             await interaction.response.send_message(
@@ -275,8 +235,8 @@ class VotingView(discord.ui.View):
             )
             return
         
-        # Get only this user's votes from the old file
-        old_user_votes = old_votes[user_id].get("votes", {})
+        # Get only this user's votes from the archived period
+        old_user_votes = old_votes[user_id].rated_games()
         if not old_user_votes:
             await interaction.response.send_message(
                 t("vote_restore_no_user"),
@@ -285,117 +245,125 @@ class VotingView(discord.ui.View):
             return
         
         # Restore only this user's votes - doesn't touch other users' votes
-        votes = load_votes(self.guild_id)
-        if user_id not in votes:
-            votes[user_id] = {
-                "username": str(interaction.user),
-                "votes": {}
-            }
-        
-        # Only restore votes for games that still exist
-        # Only modifies votes[user_id] - this user's personal entry
-        restored_count = 0
-        for game_key, rating in old_user_votes.items():
-            if game_key in self.games:
-                votes[user_id]["votes"][game_key] = rating
-                restored_count += 1
-        
-        votes[user_id]["username"] = str(interaction.user)
-        save_votes(votes, self.guild_id)
-        self.user_votes[user_id] = votes[user_id]
+        games = load_games(self.guild_id)
+        
+        def restore(votes):
+            user_votes = votes.setdefault(user_id, UserVotes())
+            # Only restore votes for games that are still enabled (renamed games keep their ID)
+            # Only modifies votes[user_id] - this user's personal entry
+            restored_count = 0
+            for game_id, rating in old_user_votes.items():
+                if get_game_key_by_id(game_id) in games:
+                    user_votes.set_rating(game_id, rating)
+                    restored_count += 1
+            return restored_count
+        
+        # Acknowledge first: the votes are only saved once their group commit is on disk
+        await interaction.response.defer(ephemeral=True)
+        restored_count = await mutate_votes(self.guild_id, restore)
+        await asyncio.to_thread(update_user_profile, user_id, username=str(interaction.user))
         
         if restored_count > 0:
-            # Extract date from filename for display
-            file_date = found_file.split('.')[-2] if found_file else "previous period"
-            
             # Update the embed table to show restored votes
-            await interaction.response.defer(ephemeral=True)
-            try:
-                await self._update_embed_table(interaction, user_id)
-            except Exception as e:
-                logger.warning(f"Failed to update embed after restoring votes: {e}")
+            await _update_voting_message(interaction, self.guild_id, user_id)
             
             await interaction.followup.send(
-                t("vote_restore_success", count=restored_count, date=file_date),
+                t("vote_restore_success", count=restored_count, date=period),
                 ephemeral=True
             )
         else:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 t("vote_restore_no_match"),
                 ephemeral=True
             )
+
+
+class VoteGameSelect(discord.ui.DynamicItem[discord.ui.Select], template=r"tati:vote:(?P<guild_id>\d+):(?P<chunk>\d+)"):
+    """Game select menu (one per chunk of 25 games) that opens the rating modal."""
     
-    async def _delete_after_delay(self, interaction: discord.Interaction, delay: int):
-        """Delete the interaction response after a delay."""
-        await asyncio.sleep(delay)
-        try:
-            await interaction.delete_original_response()
-        except:
-            pass  # Message might already be deleted or interaction expired
-    
+    def __init__(self, guild_id: int, chunk: int, select: discord.ui.Select = None, placeholder: str = None, options=None):
+        self.guild_id = guild_id
+        self.chunk = chunk
+        if select is None:
+            select = discord.ui.Select(
+                placeholder=placeholder,
+                options=options,
+                custom_id=f"tati:vote:{guild_id}:{chunk}"
+            )
+        super().__init__(select)
     
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        # Reuse the select rebuilt from the message, its options are already there
+        return cls(int(match["guild_id"]), int(match["chunk"]), select=item)
     
-    async def _update_embed_table(self, interaction: discord.Interaction, user_id: str):
-        """Helper method to update the embed table with current votes."""
-        if self.embed is None:
-            return
-        
-        try:
-            # Load fresh votes to ensure we have the latest data
-            votes = load_votes(self.guild_id)
-            updated_user_votes = votes.get(user_id, {}).get("votes", {})
-            
-            # Regenerate table fields with updated votes
-            table_fields = _generate_vote_table_fields(self.games, updated_user_votes)
-            
-            # Clear existing table fields (remove fields that start with "📊 Your Votes")
-            fields_to_remove = [i for i, field in enumerate(self.embed.fields) if field.name.startswith("📊 Your Votes")]
-            for i in reversed(fields_to_remove):
-                self.embed.remove_field(i)
-            
-            # Add updated fields
-            for field_name, field_value in table_fields:
-                self.embed.add_field(name=field_name, value=field_value, inline=False)
-            
-            # Edit the original message with updated embed
-            await interaction.edit_original_response(embed=self.embed, view=self)
-        except Exception as e:
-            logger.warning(f"Failed to update embed table: {e}")
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.guild_id == self.guild_id
     
-    async def on_game_selected(self, interaction: discord.Interaction, select: discord.ui.Select = None):
+    async def callback(self, interaction: discord.Interaction):
         """Handle game selection - open modal for rating."""
-        # Get the selected game key from the select menu
-        if select is None:
-            # Fallback: find the select that has values
-            for s in self.game_selects:
-                if s.values:
-                    select = s
-                    break
+        user_id = str(interaction.user.id)
+        t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=self.guild_id, **kw)
         
-        if not select or not select.values:
-            t = lambda k, **kw: get_translation(k, user_id=str(interaction.user.id), guild_id=self.guild_id, **kw)
+        if not self.item.values:
             await interaction.response.send_message(
                 "❌ Could not determine selected game. Please try again.",
                 ephemeral=True
             )
             return
         
-        game_key = select.values[0]
+        game_key = self.item.values[0]
+        games = load_games(self.guild_id)
         
-        if game_key not in self.games:
-            t = lambda k, **kw: get_translation(k, user_id=str(interaction.user.id), guild_id=self.guild_id, **kw)
+        if game_key not in games:
             await interaction.response.send_message(
                 t("error_game_not_found", game=game_key),
                 ephemeral=True
             )
             return
         
-        game_data = self.games[game_key]
-        user_id = str(interaction.user.id)
-        self.user_id = user_id
-        
         # Open modal for rating
-        modal = VoteRatingModal(game_key, game_data, self.games, self.guild_id, user_id, self.embed, self)
+        modal = VoteRatingModal(game_key, games[game_key], self.guild_id, user_id)
         await interaction.response.send_modal(modal)
+
+
+class VotingView(discord.ui.View):
+    """Interactive voting view with dropdown for game selection (opens modal for rating).
     
+    Only holds its components: state is reloaded by each component on use.
+    """
+    
+    def __init__(self, sorted_games, guild_id, user_id):
+        super().__init__(timeout=None)
+        
+        # Get translation function for this user
+        t = lambda k, **kw: get_translation(k, user_id=user_id, guild_id=guild_id, **kw)
+        
+        # Add restore previous votes button FIRST (above dropdowns)
+        self.add_item(VoteRestoreButton(guild_id, label=t("vote_restore_button")))
+        
+        # Create select menus with games (Discord limits: 25 options per menu, 5 action rows per message)
+        # Split games into chunks of 25
+        game_chunks = [sorted_games[i:i + MAX_OPTIONS_PER_MENU] for i in range(0, len(sorted_games), MAX_OPTIONS_PER_MENU)]
+        
+        # Limit to MAX_ACTION_ROWS - 1 (reserve 1 for the restore button)
+        # If we have more chunks than allowed, we'll only show the first N chunks
+        max_chunks = MAX_ACTION_ROWS - 1
+        if len(game_chunks) > max_chunks:
+            logger.warning(f"Too many games ({len(sorted_games)}) for voting view. Showing first {max_chunks * MAX_OPTIONS_PER_MENU} games.")
+            game_chunks = game_chunks[:max_chunks]
+        
+        logger.debug(f"Creating {len(game_chunks)} select menus for {len(sorted_games)} games. Chunk sizes: {[len(c) for c in game_chunks]}")
+        
+        for chunk_idx, chunk in enumerate(game_chunks):
+            options = [
+                discord.SelectOption(
+                    label=game_data['name'],
+                    description=t("vote_players_desc", min=game_data['min_players'], max=game_data['max_players']),
+                    value=game_key,
+                    emoji=game_data.emoji
+                )
+                for game_key, game_data in chunk
+            ]
+            self.add_item(VoteGameSelect(guild_id, chunk_idx, placeholder=t("vote_select_game"), options=options))
 